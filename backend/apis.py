@@ -1,12 +1,28 @@
-from datetime import datetime, date, timedelta
-from typing import Any
-from sqlmodel import select, and_, or_, func
-from backend.storage.database import get_session
+import codecs
+import csv
+import os
+from datetime import datetime, date, time, timedelta
+from typing import Any, Callable, Dict, Iterator
+from sqlmodel import select, and_, or_, func, case
+from backend.storage.database import get_session, retry_on_locked
 from backend.auth import hash_password, verify_password
-from backend.schemas import AccountRead, EmployeeRead, StockRead, ExpenditureRead
 from enum import Enum
-from sqlalchemy import Column, TEXT
-from typing import Dict, Any
+from sqlalchemy import (
+    Column,
+    Integer,
+    TEXT,
+    bindparam,
+    cast,
+    delete,
+    insert,
+    literal,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from pydantic import ValidationError
 
 from backend.storage.models import (
     Account,
@@ -25,14 +41,25 @@ from backend.storage.models import (
     ExpenditureCategory,
     ReturnReason,
     ExpenditureTotal,
+    SalesDaily,
+    StockLot,
+    StockMovement,
+    MovementReason,
+    Stocktake,
+    StocktakeLine,
+    StocktakeStatus,
+    StockTombstone,
 )
-from backend.storage.models import Account, UserRole, Sale
-
-
+from backend.storage.migrations import rebuild_sales_daily
+from config import get_settings
 from backend.schemas import (
     AccountRead,
     EmployeeRead,
     StockRead,
+    StockUpdate,
+    StockLotRead,
+    StockMovementRead,
+    StocktakeRead,
     ExpenditureRead,
     SaleRead,
     SaleItemRead,
@@ -51,6 +78,7 @@ class AccountAPI:
     """CRUD operations for Account management with authentication logic"""
 
     @staticmethod
+    @retry_on_locked
     def create_account(
         name: str, phone: str, email: str, password: str, role: str = "admin"
     ) -> dict[str, Any]:
@@ -155,6 +183,7 @@ class AccountAPI:
             return {"success": False, "error": str(e)}
 
     @staticmethod
+    @retry_on_locked
     def update_account(
         account_id: int,
         name: str | None = None,
@@ -218,6 +247,7 @@ class AccountAPI:
             return {"success": False, "error": str(e)}
 
     @staticmethod
+    @retry_on_locked
     def delete_account(account_id: int) -> dict[str, Any]:
         """Delete an account if it has no linked sales"""
         try:
@@ -248,6 +278,7 @@ class EmployeeAPI:
     # ------------------- CREATE -------------------
 
     @staticmethod
+    @retry_on_locked
     def create_employee(
         name: str,
         phone: str,
@@ -339,6 +370,7 @@ class EmployeeAPI:
     # ------------------- UPDATE (Inline Field) -------------------
 
     @staticmethod
+    @retry_on_locked
     def update_employee_field(
         employee_id: int, field: str, value: Any
     ) -> dict[str, Any]:
@@ -413,6 +445,7 @@ class EmployeeAPI:
     # ------------------- UPDATE (Full Update) -------------------
 
     @staticmethod
+    @retry_on_locked
     def update_employee(
         employee_id: int,
         name: str | None = None,
@@ -488,6 +521,7 @@ class EmployeeAPI:
     # ------------------- DELETE -------------------
 
     @staticmethod
+    @retry_on_locked
     def delete_employee(employee_id: int) -> dict[str, Any]:
         """Delete an employee by ID"""
         try:
@@ -508,6 +542,165 @@ class EmployeeAPI:
 # ==========================
 # STOCK API
 # ==========================
+def _post_stock_movements(
+    session,
+    reason: MovementReason,
+    changes: dict[int, int],
+    ref_id: int | None = None,
+    balances: dict[int, int] | None = None,
+) -> None:
+    """
+    Append one ledger row per item in `changes` (stock_id -> signed units).
+    Call after the quantities themselves were written in the same
+    transaction: each row snapshots the item's resulting quantity, taken
+    from `balances` when the write returned it and read back otherwise.
+    """
+    changes = {stock_id: delta for stock_id, delta in changes.items() if delta}
+    if not changes:
+        return
+    session.flush()
+    movements_table = StockMovement.__table__
+    stocks_table = Stock.__table__
+    if balances is None:
+        balance = (
+            select(stocks_table.c.quantity)
+            .where(stocks_table.c.id == bindparam("stock_id_"))
+            .scalar_subquery()
+        )
+    else:
+        balance = bindparam("balance_")
+    session.connection().execute(
+        insert(movements_table).values(
+            stock_id=bindparam("stock_id_"),
+            ts=datetime.now(),
+            change=bindparam("change_"),
+            balance=balance,
+            reason=reason,
+            ref_id=ref_id,
+        ),
+        [
+            {"stock_id_": stock_id, "change_": delta}
+            | ({} if balances is None else {"balance_": balances[stock_id]})
+            for stock_id, delta in changes.items()
+        ],
+    )
+
+
+def _change_stock(session, changes: dict[int, int]) -> dict[int, int]:
+    """
+    Add signed `changes` (stock_id -> units) to item quantities in SQL, so
+    concurrent writers never overwrite each other's units. A decrease only
+    applies while it leaves the quantity non-negative. Returns the new
+    quantity of every item that changed; a missing id means the item is
+    gone or the decrease was refused.
+    """
+    stocks_table = Stock.__table__
+    now = datetime.now()
+    balances = {}
+    for stock_id, delta in changes.items():
+        if not delta:
+            continue
+        condition = stocks_table.c.id == stock_id
+        if delta < 0:
+            condition = and_(condition, stocks_table.c.quantity >= -delta)
+        row = session.connection().execute(
+            update(stocks_table)
+            .where(condition)
+            .values(quantity=stocks_table.c.quantity + delta, updated_at=now)
+            .returning(stocks_table.c.quantity)
+        ).first()
+        if row is not None:
+            balances[stock_id] = row.quantity
+    return balances
+
+
+def _deplete_lots(session, quantities: dict[int, int]) -> None:
+    """
+    Take `quantities` (stock_id -> units) out of open lots, earliest expiry
+    first and undated lots last. Lots always sum to stocks.quantity, so
+    running short means they drifted: raise rather than deepen the drift.
+    """
+    lots = session.exec(
+        select(StockLot.id, StockLot.stock_id, StockLot.quantity)
+        .where(StockLot.stock_id.in_(quantities), StockLot.quantity > 0)
+        .order_by(
+            StockLot.stock_id,
+            StockLot.expiry_date.is_(None),
+            StockLot.expiry_date,
+            StockLot.id,
+        )
+    ).all()
+
+    remaining = dict(quantities)
+    params = []
+    for lot_id, stock_id, lot_qty in lots:
+        take = min(remaining[stock_id], lot_qty)
+        if take:
+            remaining[stock_id] -= take
+            params.append({"id_": lot_id, "quantity_": lot_qty - take})
+    short = sorted(stock_id for stock_id, qty in remaining.items() if qty > 0)
+    if short:
+        raise ValueError(f"Stock lots are out of step with quantity for items {short}")
+    if params:
+        lots_table = StockLot.__table__
+        session.connection().execute(
+            update(lots_table)
+            .where(lots_table.c.id == bindparam("id_"))
+            .values(quantity=bindparam("quantity_")),
+            params,
+        )
+
+
+def _restock_lots(session, quantities: dict[int, int]) -> None:
+    """
+    Open one lot per item for units that come back without a delivery
+    (returns, voided sales and damages, upward edits). The lot the units
+    originally left is not recorded, so the new lot carries the item's
+    current cost and expiry.
+    """
+    quantities = {stock_id: qty for stock_id, qty in quantities.items() if qty > 0}
+    if not quantities:
+        return
+    now = datetime.now()
+    items = session.exec(
+        select(Stock.id, Stock.cost_price, Stock.expiry_date).where(
+            Stock.id.in_(quantities)
+        )
+    ).all()
+    session.connection().execute(
+        insert(StockLot.__table__),
+        [
+            {
+                "stock_id": stock_id,
+                "quantity": quantities[stock_id],
+                "cost_price": cost_price,
+                "expiry_date": expiry_date,
+                "received_at": now,
+            }
+            for stock_id, cost_price, expiry_date in items
+        ],
+    )
+
+
+# Items per IN (...) list when adjusting lots for many items at once
+LOT_CHUNK = 500
+
+
+def _adjust_lots(session, changes: dict[int, int]) -> None:
+    """
+    Keep lots in step with signed quantity edits (stock_id -> units) so their
+    sum stays equal to stocks.quantity: decreases deplete lots FEFO and
+    increases open an adjustment lot.
+    """
+    items = [(stock_id, delta) for stock_id, delta in changes.items() if delta]
+    for start in range(0, len(items), LOT_CHUNK):
+        chunk = items[start : start + LOT_CHUNK]
+        shortfalls = {stock_id: -delta for stock_id, delta in chunk if delta < 0}
+        if shortfalls:
+            _deplete_lots(session, shortfalls)
+        _restock_lots(session, {stock_id: delta for stock_id, delta in chunk})
+
+
 class StockAPI:
 
     @staticmethod
@@ -523,6 +716,216 @@ class StockAPI:
             return {"success": False, "error": str(e)}
 
     @staticmethod
+    def get_by_ids(stock_ids: list[int]) -> dict:
+        """Fetch specific stock rows, archived ones included."""
+        try:
+            with get_session() as session:
+                items = session.exec(
+                    select(Stock).where(Stock.id.in_(set(stock_ids)))
+                ).all()
+                return {
+                    "success": True,
+                    "items": [StockRead.model_validate(i).model_dump() for i in items],
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_by_code(code: str) -> dict:
+        """Look up an active item by its barcode/SKU (unique index probe)."""
+        try:
+            code = code.strip()
+            if not code:
+                return {"success": False, "error": "Barcode is required"}
+            with get_session() as session:
+                stock = session.exec(
+                    select(Stock).where(Stock.barcode == code, Stock.is_active == True)
+                ).first()
+                if not stock:
+                    return {"success": False, "error": "No item with this barcode"}
+                return {
+                    "success": True,
+                    "item": StockRead.model_validate(stock).model_dump(),
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _name_match(session, query: str) -> tuple[str, dict]:
+        """SQL condition (and params) matching stocks.item_name like search()."""
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params = {"prefix": f"{escaped}%"}
+        has_fts = session.exec(
+            text(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = 'stocks_fts'"
+            )
+        ).first()
+        if has_fts and len(query) >= 3:
+            params["match"] = '"' + query.replace('"', '""') + '"'
+            return (
+                "stocks.id IN (SELECT rowid FROM stocks_fts "
+                "WHERE stocks_fts MATCH :match)",
+                params,
+            )
+        if has_fts:
+            params["word"] = f"% {escaped}%"
+            return (
+                "(stocks.item_name LIKE :prefix ESCAPE '\\' "
+                "OR stocks.item_name LIKE :word ESCAPE '\\')",
+                params,
+            )
+        params["pattern"] = f"%{escaped}%"
+        return "stocks.item_name LIKE :pattern ESCAPE '\\'", params
+
+    @staticmethod
+    def search(query: str, limit: int = 50) -> dict:
+        """
+        Ranked item-name search over active stock: names starting with the
+        query first, then the FTS5 trigram rank. One or two characters are too
+        short for trigrams and only match the start of a word; SQLite builds
+        without FTS5 fall back to a LIKE substring scan.
+        """
+        try:
+            query = query.strip()
+            if not query:
+                return {"success": True, "items": []}
+            with get_session() as session:
+                condition, params = StockAPI._name_match(session, query)
+                params["limit"] = limit
+                if "match" in params:
+                    statement = text(
+                        "SELECT stocks.* FROM stocks_fts "
+                        "JOIN stocks ON stocks.id = stocks_fts.rowid "
+                        "WHERE stocks_fts MATCH :match AND stocks.is_active = 1 "
+                        "ORDER BY stocks.item_name LIKE :prefix ESCAPE '\\' DESC, "
+                        "stocks_fts.rank "
+                        "LIMIT :limit"
+                    )
+                else:
+                    # Walks ix_stocks_item_name in order and stops at the limit
+                    statement = text(
+                        f"SELECT * FROM stocks WHERE {condition} AND is_active = 1 "
+                        "ORDER BY item_name "
+                        "LIMIT :limit"
+                    )
+                items = session.scalars(
+                    select(Stock).from_statement(statement), params
+                ).all()
+                return {
+                    "success": True,
+                    "items": [StockRead.model_validate(i).model_dump() for i in items],
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_valuation_summary(filter: str | None = None) -> dict:
+        """
+        Quantity, cost, value and profit of active stock per category from a
+        single GROUP BY, optionally limited to items matching `filter` the
+        way search() matches names.
+        """
+        try:
+            with get_session() as session:
+                condition, params = "1 = 1", {}
+                if filter and filter.strip():
+                    condition, params = StockAPI._name_match(session, filter.strip())
+                rows = session.exec(
+                    text(
+                        "SELECT category, SUM(quantity) AS items, "
+                        "SUM(quantity * cost_price) AS cost, "
+                        "SUM(quantity * selling_price) AS value "
+                        f"FROM stocks WHERE is_active = 1 AND {condition} "
+                        "GROUP BY category"
+                    ),
+                    params=params,
+                ).all()
+
+                summary = {}
+                for stock_type in StockType:
+                    summary.update(
+                        {
+                            f"{stock_type.value}_items": 0,
+                            f"{stock_type.value}_cost": 0.0,
+                            f"{stock_type.value}_value": 0.0,
+                            f"{stock_type.value}_profit": 0.0,
+                        }
+                    )
+                for category, items, cost, value in rows:
+                    # Enum columns are stored by member name (RETAIL / WHOLESALE)
+                    key = StockType[category].value
+                    summary[f"{key}_items"] = items or 0
+                    summary[f"{key}_cost"] = cost or 0.0
+                    summary[f"{key}_value"] = value or 0.0
+                    summary[f"{key}_profit"] = (value or 0.0) - (cost or 0.0)
+                return {"success": True, **summary}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_changed_since(watermark: datetime | str | None = None) -> dict:
+        """
+        Change feed for the stock catalog.
+
+        Returns active rows created or updated at/after `watermark`, the ids
+        archived or permanently deleted since then, and the watermark to pass
+        next time. Without a watermark every active row is returned. Rows
+        stamped exactly at the watermark are sent again, so apply the feed
+        idempotently, and apply deleted_ids before items: SQLite can hand a
+        deleted id to a new row.
+        """
+        try:
+            if isinstance(watermark, str):
+                watermark = datetime.fromisoformat(watermark)
+            with get_session() as session:
+                query = select(Stock)
+                if watermark:
+                    query = query.where(Stock.updated_at >= watermark)
+                else:
+                    query = query.where(Stock.is_active == True)
+                rows = session.exec(query.order_by(Stock.updated_at)).all()
+
+                deleted = []
+                if watermark:
+                    deleted = session.exec(
+                        select(StockTombstone.stock_id, StockTombstone.deleted_at)
+                        .where(StockTombstone.deleted_at >= watermark)
+                        .order_by(StockTombstone.deleted_at)
+                    ).all()
+
+                stamps = [s.updated_at for s in rows] + [d for _, d in deleted]
+                if not watermark:
+                    stamps.append(
+                        session.exec(select(func.max(Stock.updated_at))).one()
+                        or datetime.min
+                    )
+                    stamps.append(
+                        session.exec(select(func.max(StockTombstone.deleted_at))).one()
+                        or datetime.min
+                    )
+                new_watermark = max(stamps, default=watermark)
+                if new_watermark == datetime.min:
+                    new_watermark = None
+
+                return {
+                    "success": True,
+                    "items": [
+                        StockRead.model_validate(s).model_dump()
+                        for s in rows
+                        if s.is_active
+                    ],
+                    "archived_ids": [s.id for s in rows if not s.is_active],
+                    "deleted_ids": [stock_id for stock_id, _ in deleted],
+                    "watermark": new_watermark,
+                }
+        except ValueError:
+            return {"success": False, "error": "Invalid watermark format"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    @retry_on_locked
     def create_stock(
         name: str,
         quantity: int,
@@ -530,6 +933,8 @@ class StockAPI:
         selling_price: float,
         category: str,
         expiry_date: str | None = None,
+        barcode: str | None = None,
+        reorder_level: int | None = None,
     ) -> dict:
         try:
             expiry = (
@@ -540,6 +945,7 @@ class StockAPI:
             with get_session() as session:
                 stock = Stock(
                     item_name=name,
+                    barcode=(barcode or "").strip() or None,
                     quantity=quantity,
                     cost_price=cost_price,
                     selling_price=selling_price,
@@ -547,7 +953,22 @@ class StockAPI:
                     expiry_date=expiry,
                     is_active=True,
                 )
+                if reorder_level is not None:
+                    stock.reorder_level = reorder_level
                 session.add(stock)
+                session.flush()
+                if quantity > 0:
+                    session.add(
+                        StockLot(
+                            stock_id=stock.id,
+                            quantity=quantity,
+                            cost_price=cost_price,
+                            expiry_date=expiry,
+                        )
+                    )
+                _post_stock_movements(
+                    session, MovementReason.RECEIPT, {stock.id: quantity}
+                )
                 session.commit()
                 session.refresh(stock)
                 return {
@@ -556,10 +977,13 @@ class StockAPI:
                 }
         except ValueError:
             return {"success": False, "error": "Invalid expiry date format or category"}
+        except IntegrityError:
+            return {"success": False, "error": "Barcode already assigned to another item"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
     @staticmethod
+    @retry_on_locked
     def update_stock(
         stock_id: int,
         name: str,
@@ -568,6 +992,8 @@ class StockAPI:
         selling_price: float,
         category: str,
         expiry_date: str | None = None,
+        barcode: str | None = None,
+        reorder_level: int | None = None,
     ) -> dict:
         try:
             expiry = (
@@ -581,219 +1007,1389 @@ class StockAPI:
                     return {"success": False, "error": "Stock not found"}
                 if not stock.is_active:
                     return {"success": False, "error": "Cannot update archived stock"}
+                # The quantity moves by the edit's delta in SQL (see
+                # _change_stock), so a sale committed meanwhile is kept
+                change = quantity - stock.quantity
                 stock.item_name = name
-                stock.quantity = quantity
                 stock.cost_price = cost_price
                 stock.selling_price = selling_price
                 stock.category = StockType(category.lower())
                 stock.expiry_date = expiry
+                stock.barcode = (barcode or "").strip() or None
+                if reorder_level is not None:
+                    stock.reorder_level = reorder_level
                 stock.updated_at = datetime.now()
                 session.add(stock)
+                balances = _change_stock(session, {stock_id: change})
+                if change and not balances:
+                    session.rollback()
+                    return {
+                        "success": False,
+                        "error": "Quantity changed since it was loaded; reload it",
+                    }
+                _adjust_lots(session, {stock_id: change})
+                _post_stock_movements(
+                    session,
+                    MovementReason.ADJUSTMENT,
+                    {stock_id: change},
+                    balances=balances,
+                )
                 session.commit()
                 return {"success": True}
         except ValueError:
             return {"success": False, "error": "Invalid expiry date format or category"}
+        except IntegrityError:
+            return {"success": False, "error": "Barcode already assigned to another item"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
     @staticmethod
+    @retry_on_locked
     def delete_stock(stock_id: int) -> dict:
         """
         Delete stock if unused, otherwise archive it to preserve history.
-        - If stock has sales, damages, or returns → archive.
+        - If stock has sales, damages, returns or ledger movements → archive.
         - If stock has no history → permanently delete.
         """
         try:
             with get_session() as session:
-                stock = session.get(Stock, stock_id)
-                if not stock:
+                if not session.get(Stock, stock_id):
                     return {"success": False, "error": "Stock not found"}
 
-                # Check usage
-                has_sales = bool(stock.sale_items)
-                has_damages = bool(stock.damaged_items)
-                has_returns = bool(stock.returned_items)
-
-                if has_sales or has_damages or has_returns:
-                    # Archive instead of delete
-                    stock.is_active = False  # new field in Stock model
-                    stock.updated_at = datetime.utcnow()
-                    session.add(stock)
-                    session.commit()
+                archived, _ = StockAPI._archive_or_delete(session, [stock_id])
+                session.commit()
+                if archived:
                     return {
                         "success": True,
                         "message": f"Stock {stock_id} archived (linked to history)",
                         "archived": True,
                     }
-                else:
-                    # No history → safe to permanently delete
-                    session.delete(stock)
-                    session.commit()
-                    return {
-                        "success": True,
-                        "message": f"Stock {stock_id} permanently deleted",
-                        "archived": False,
-                    }
+                return {
+                    "success": True,
+                    "message": f"Stock {stock_id} permanently deleted",
+                    "archived": False,
+                }
 
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-
-# ==========================
-# SALE API
-# ==========================
-
-
-class SaleAPI:
-    """Sales management API aligned with Sales UI."""
-
     @staticmethod
-    def create_sale(
-        cashier_id: int,
-        sale_items: list[dict],
-        amount_paid: float,
-        discount_amount: float = 0,
-        payment_method: str = "cash",
-        sale_date: str | None = None,
-    ) -> dict[str, Any]:
+    @retry_on_locked
+    def delete_stocks(stock_ids: list[int]) -> dict:
+        """
+        delete_stock for many items in one transaction: items with history
+        are archived, the rest permanently deleted.
+        """
         try:
+            ids = sorted(set(stock_ids))
+            if not ids:
+                return {"success": False, "error": "No stock selected"}
             with get_session() as session:
-                parsed_date = date.today()
-                if sale_date:
-                    parsed_date = datetime.strptime(sale_date, "%Y-%m-%d").date()
+                found = set(
+                    session.exec(select(Stock.id).where(Stock.id.in_(ids))).all()
+                )
+                missing = [i for i in ids if i not in found]
+                if missing:
+                    return {"success": False, "error": f"Stock not found: {missing}"}
 
-                gross_total, items_sold, profit_total = 0, 0, 0
+                archived, deleted = StockAPI._archive_or_delete(session, ids)
+                session.commit()
+                return {
+                    "success": True,
+                    "message": f"{len(archived)} archived, {len(deleted)} deleted",
+                    "archived_ids": archived,
+                    "deleted_ids": deleted,
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
 
-                sale = Sale(
-                    sale_date=parsed_date,
-                    discount_amount=discount_amount,
-                    amount_paid=amount_paid,
-                    payment_method=PaymentMethod(payment_method),
-                    cashier_id=cashier_id,
+    @staticmethod
+    def _archive_or_delete(session, ids: list[int]) -> tuple[list[int], list[int]]:
+        """
+        Archive the items in `ids` that have sales, damages, returns or ledger
+        movements and delete the others along with their lots. Only items that
+        never held stock are deleted, so the movement ledger is never pruned.
+        History is probed with EXISTS on the stock_id indexes, one row at most
+        per table.
+        """
+        has_history = or_(
+            select(SaleItem.id).where(SaleItem.stock_id == Stock.id).exists(),
+            select(Damage.id).where(Damage.stock_id == Stock.id).exists(),
+            select(Return.id).where(Return.stock_id == Stock.id).exists(),
+            select(StockMovement.id)
+            .where(StockMovement.stock_id == Stock.id)
+            .exists(),
+        )
+        archived = sorted(
+            session.exec(select(Stock.id).where(Stock.id.in_(ids), has_history)).all()
+        )
+        deleted = sorted(set(ids) - set(archived))
+
+        stocks_table = Stock.__table__
+        if archived:
+            # Archiving frees the barcode for a replacement item
+            session.connection().execute(
+                update(stocks_table)
+                .where(stocks_table.c.id.in_(archived))
+                .values(is_active=False, barcode=None, updated_at=datetime.now())
+            )
+        if deleted:
+            for table in (StockLot.__table__, StocktakeLine.__table__):
+                session.connection().execute(
+                    delete(table).where(table.c.stock_id.in_(deleted))
                 )
-                session.add(sale)
-                session.flush()
+            session.connection().execute(
+                delete(stocks_table).where(stocks_table.c.id.in_(deleted))
+            )
+        return archived, deleted
 
-                sale_items_models = []
-                for item in sale_items:
-                    stock = session.get(Stock, item["stock_id"])
-                    qty = item["quantity_sold"]
+    # ---------- Bulk Update ----------
+    BULK_FIELDS = {"quantity", "cost_price", "selling_price"}
 
-                    if not stock:
+    @staticmethod
+    @retry_on_locked
+    def bulk_update(
+        patches: list[dict] | None = None, rule: dict | None = None
+    ) -> dict:
+        """
+        Update many active items in one transaction.
+
+        patches: [{"id": 1, "selling_price": 9.5, "quantity": 20}, ...]; each
+            distinct set of fields is written with one executemany UPDATE.
+        rule: {"field": "selling_price", "op": "percent", "value": 5,
+            "category": "wholesale", "ids": [...]} becomes a single set-based
+            UPDATE; op is "percent", "add" or "set", and category/ids are
+            optional filters. Results are clamped at zero and prices rounded
+            to 2 decimals.
+
+        Returns the ids that changed so callers can publish one change event.
+        """
+        try:
+            if not patches and not rule:
+                return {"success": False, "error": "Provide patches or a rule"}
+            stocks_table = Stock.__table__
+            now = datetime.now()
+
+            with get_session() as session:
+                changed: list[int] = []
+                quantity_changes: dict[int, int] = {}
+
+                if patches:
+                    for patch in patches:
+                        fields = set(patch) - {"id"}
+                        if not fields or not fields <= StockAPI.BULK_FIELDS:
+                            return {
+                                "success": False,
+                                "error": "Patches may only set quantity, cost_price "
+                                "and selling_price",
+                            }
+                        if any(patch[f] is None for f in fields):
+                            return {
+                                "success": False,
+                                "error": "Patch values cannot be empty",
+                            }
+                    # Types and ranges go through the schema, so a fractional
+                    # quantity or a non-numeric price never reaches the UPDATE
+                    try:
+                        patches = [
+                            StockUpdate.model_validate(patch).model_dump(
+                                exclude_unset=True
+                            )
+                            for patch in patches
+                        ]
+                    except ValidationError as e:
+                        error = e.errors()[0]
+                        field = ".".join(str(part) for part in error["loc"])
                         return {
                             "success": False,
-                            "error": f"Stock {item['stock_id']} not found",
+                            "error": f"Invalid {field}: {error['msg']}",
                         }
-                    if stock.quantity < qty:
+
+                    ids = {p["id"] for p in patches}
+                    active = set(
+                        session.exec(
+                            select(Stock.id).where(
+                                Stock.id.in_(ids), Stock.is_active == True
+                            )
+                        ).all()
+                    )
+                    missing = sorted(ids - active)
+                    if missing:
                         return {
                             "success": False,
-                            "error": f"Insufficient stock for {stock.item_name}",
+                            "error": f"Stock not found or archived: {missing}",
                         }
 
-                    gross_total += stock.selling_price * qty
-                    items_sold += qty
-                    profit_total += (stock.selling_price - stock.cost_price) * qty
-
-                    sale_item = SaleItem(
-                        sale_id=sale.id, stock_id=stock.id, quantity_sold=qty
+                    # Later patches win, as they do in the UPDATEs below
+                    new_quantities = {
+                        p["id"]: p["quantity"] for p in patches if "quantity" in p
+                    }
+                    if new_quantities:
+                        old_quantities = dict(
+                            session.exec(
+                                select(Stock.id, Stock.quantity).where(
+                                    Stock.id.in_(new_quantities)
+                                )
+                            ).all()
+                        )
+                        for stock_id, qty in new_quantities.items():
+                            quantity_changes[stock_id] = qty - old_quantities[stock_id]
+
+                    groups: dict[tuple, list[dict]] = {}
+                    for patch in patches:
+                        fields = tuple(sorted(set(patch) - {"id"}))
+                        groups.setdefault(fields, []).append(
+                            {"id_": patch["id"]} | {f"{f}_": patch[f] for f in fields}
+                        )
+                    for fields, params in groups.items():
+                        session.connection().execute(
+                            update(stocks_table)
+                            .where(stocks_table.c.id == bindparam("id_"))
+                            .values(
+                                {f: bindparam(f"{f}_") for f in fields}
+                                | {"updated_at": now}
+                            ),
+                            params,
+                        )
+                    changed.extend(sorted(ids))
+
+                if rule:
+                    field = rule.get("field")
+                    op = rule.get("op")
+                    value = rule.get("value")
+                    if field not in StockAPI.BULK_FIELDS:
+                        return {"success": False, "error": f"Cannot bulk update {field}"}
+                    if (
+                        op not in ("percent", "add", "set")
+                        or not isinstance(value, (int, float))
+                        or isinstance(value, bool)
+                    ):
+                        return {"success": False, "error": "Invalid bulk update rule"}
+                    category = rule.get("category")
+                    if category and category.lower() not in {t.value for t in StockType}:
+                        return {"success": False, "error": "Invalid category"}
+
+                    column = stocks_table.c[field]
+                    if op == "percent":
+                        expr = column * (1 + float(value) / 100)
+                    elif op == "add":
+                        expr = column + value
+                    else:
+                        expr = literal(value)
+                    expr = func.max(expr, 0)
+                    expr = (
+                        cast(func.round(expr), Integer)
+                        if field == "quantity"
+                        else func.round(expr, 2)
                     )
-                    session.add(sale_item)
-                    sale_items_models.append(sale_item)
-
-                    stock.quantity -= qty
-                    stock.updated_at = datetime.now()
-
-                total = gross_total - discount_amount
-                if amount_paid < total:
-                    return {"success": False, "error": "Insufficient payment"}
-                sale.change_given = amount_paid - total
 
+                    conditions = [stocks_table.c.is_active == True]
+                    if category:
+                        conditions.append(
+                            stocks_table.c.category == StockType(category.lower())
+                        )
+                    if rule.get("ids"):
+                        conditions.append(stocks_table.c.id.in_(rule["ids"]))
+
+                    old_quantities = {}
+                    if field == "quantity":
+                        # Includes any quantity patched above
+                        old_quantities = dict(
+                            session.connection().execute(
+                                select(stocks_table.c.id, stocks_table.c.quantity).where(
+                                    *conditions
+                                )
+                            ).all()
+                        )
+                    statement = (
+                        update(stocks_table)
+                        .where(*conditions)
+                        .values({field: expr, "updated_at": now})
+                        .returning(stocks_table.c.id, stocks_table.c.quantity)
+                    )
+                    for stock_id, qty in session.connection().execute(statement):
+                        changed.append(stock_id)
+                        if field == "quantity":
+                            quantity_changes[stock_id] = quantity_changes.get(
+                                stock_id, 0
+                            ) + (qty - old_quantities[stock_id])
+
+                _adjust_lots(session, quantity_changes)
+                _post_stock_movements(
+                    session, MovementReason.ADJUSTMENT, quantity_changes
+                )
                 session.commit()
-
+                stock_ids = sorted(set(changed))
                 return {
                     "success": True,
-                    "sale": SaleRead.model_validate(sale).model_dump(),
-                    "items": [
-                        SaleItemRead.model_validate(si).model_dump()
-                        for si in sale_items_models
-                    ],
+                    "updated": len(stock_ids),
+                    "stock_ids": stock_ids,
                 }
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    # ---------- Bulk Import ----------
+    IMPORT_COLUMNS = [
+        "item_name",
+        "quantity",
+        "cost_price",
+        "selling_price",
+        "category",
+        "expiry_date",
+        "barcode",
+        "reorder_level",
+    ]
+    IMPORT_REQUIRED = {"item_name", "quantity", "cost_price", "selling_price"}
+
     @staticmethod
-    def get_today_totals() -> dict[str, Any]:
-        """Return cumulative daily sales and profit for today."""
-        try:
-            with get_session() as session:
-                today = date.today()
-                sales_today = session.exec(
-                    select(Sale).where(Sale.sale_date == today)
-                ).all()
+    def _parse_import_row(row: dict) -> dict:
+        """Validate one CSV row into stock column values; raises ValueError."""
+        name = (row.get("item_name") or "").strip()
+        if not name:
+            raise ValueError("item_name is required")
 
-                gross_total = 0.0
-                profit_total = 0.0
-                for s in sales_today:
-                    for si in s.items:  # assuming relationship Sale -> SaleItem
-                        stock = session.get(Stock, si.stock_id)
-                        if stock:
-                            gross_total += stock.selling_price * si.quantity_sold
-                            profit_total += (
-                                stock.selling_price - stock.cost_price
-                            ) * si.quantity_sold
+        try:
+            quantity = int((row.get("quantity") or "").strip())
+        except ValueError:
+            raise ValueError("quantity must be a whole number")
+        try:
+            cost_price = float((row.get("cost_price") or "").strip())
+            selling_price = float((row.get("selling_price") or "").strip())
+        except ValueError:
+            raise ValueError("cost_price and selling_price must be numbers")
+        if quantity < 0 or cost_price < 0 or selling_price < 0:
+            raise ValueError("quantity and prices cannot be negative")
 
-                return {
-                    "success": True,
-                    "gross": gross_total,
-                    "profit": profit_total,
-                }
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        category = (row.get("category") or "").strip().lower() or "retail"
+        try:
+            category = StockType(category)
+        except ValueError:
+            allowed = ", ".join(t.value for t in StockType)
+            raise ValueError(f"category must be one of: {allowed}")
 
-    @staticmethod
-    def get_all_sales() -> dict[str, Any]:
+        expiry = (row.get("expiry_date") or "").strip()
         try:
-            with get_session() as session:
-                sales = session.exec(select(Sale)).all()
-                return {
-                    "success": True,
-                    "sales": [SaleRead.model_validate(s).model_dump() for s in sales],
-                }
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+            expiry = datetime.strptime(expiry, "%Y-%m-%d").date() if expiry else None
+        except ValueError:
+            raise ValueError("expiry_date must be YYYY-MM-DD")
 
-    @staticmethod
-    def get_sale_by_id(sale_id: int) -> dict[str, Any]:
+        reorder_level = (row.get("reorder_level") or "").strip()
         try:
-            with get_session() as session:
-                sale = session.get(Sale, sale_id)
-                if not sale:
-                    return {"success": False, "error": "Sale not found"}
+            reorder_level = int(reorder_level) if reorder_level else None
+        except ValueError:
+            raise ValueError("reorder_level must be a whole number")
+        if reorder_level is not None and reorder_level < 0:
+            raise ValueError("reorder_level cannot be negative")
 
-                sale_items = session.exec(
-                    select(SaleItem).where(SaleItem.sale_id == sale_id)
+        return {
+            "item_name": name,
+            "quantity": quantity,
+            "cost_price": cost_price,
+            "selling_price": selling_price,
+            "category": category,
+            "expiry_date": expiry,
+            "barcode": (row.get("barcode") or "").strip() or None,
+            "reorder_level": reorder_level,
+        }
+
+    @staticmethod
+    @retry_on_locked
+    def _import_chunk(chunk: list[tuple[int, dict]]) -> tuple[int, int, list[dict]]:
+        """
+        Upsert one chunk of parsed rows in a single transaction. Returns the
+        created and updated counts and the rows rejected for reusing a
+        barcode that an earlier line in the chunk gives to another item.
+        """
+        stocks_table = Stock.__table__
+        with get_session() as session:
+            codes = {v["barcode"] for _, v in chunk if v["barcode"]}
+            names = {v["item_name"] for _, v in chunk}
+            by_code = (
+                dict(
+                    session.exec(
+                        select(Stock.barcode, Stock.id).where(Stock.barcode.in_(codes))
+                    ).all()
+                )
+                if codes
+                else {}
+            )
+            by_name = dict(
+                session.exec(
+                    select(Stock.item_name, Stock.id).where(
+                        Stock.item_name.in_(names), Stock.is_active == True
+                    )
                 ).all()
+            )
 
-                # --- Join with Stock to get item_name and price ---
-                items_data = []
-                for si in sale_items:
-                    stock = session.get(Stock, si.stock_id)
-                    items_data.append({
-                        "item_name": stock.item_name if stock else f"Item-{si.stock_id}",
-                        "quantity_sold": si.quantity_sold,
-                        "price": stock.selling_price if stock else 0.0
-                    })
+            # Match by barcode, then by exact name; later rows win within a chunk
+            now = datetime.now()
+            default_reorder_level = get_settings().default_min_quantity_alert
+            updates: dict[int, dict] = {}
+            inserts: dict[str, dict] = {}
+            winning_lines: dict[tuple, int] = {}
+            for line, values in chunk:
+                stock_id = by_code.get(values["barcode"]) or by_name.get(
+                    values["item_name"]
+                )
+                if stock_id:
+                    if not values["barcode"] and stock_id in updates:
+                        values = values | {"barcode": updates[stock_id]["barcode_"]}
+                    winning_lines[("update", stock_id)] = line
+                    updates[stock_id] = {
+                        f"{key}_": value for key, value in values.items()
+                    } | {"id_": stock_id}
+                else:
+                    # New items are keyed by name too, so a file listing one
+                    # with and without its barcode creates it once; a blank
+                    # barcode on a later line keeps the earlier one
+                    key = values["item_name"]
+                    if not values["barcode"] and key in inserts:
+                        values = values | {"barcode": inserts[key]["barcode"]}
+                    winning_lines[("insert", key)] = line
+                    inserts[key] = values | {
+                        "reorder_level": (
+                            values["reorder_level"]
+                            if values["reorder_level"] is not None
+                            else default_reorder_level
+                        ),
+                        "is_active": True,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
 
-                return {
-                    "success": True,
-                    "sale": SaleRead.model_validate(sale).model_dump(),
-                    "items": items_data,
+            # Barcodes already stored were matched above, so the only clash
+            # left is two items in this chunk taking the same new barcode;
+            # the earliest line keeps it and the others are reported
+            errors: list[dict] = []
+            claimed: dict[str, int] = {}
+            for (kind, key), line in sorted(
+                winning_lines.items(), key=lambda item: item[1]
+            ):
+                rows = updates if kind == "update" else inserts
+                barcode = rows[key]["barcode_" if kind == "update" else "barcode"]
+                if not barcode:
+                    continue
+                if barcode in claimed:
+                    del rows[key]
+                    errors.append(
+                        {
+                            "line": line,
+                            "error": f"Barcode {barcode} is already used "
+                            f"on line {claimed[barcode]}",
+                        }
+                    )
+                else:
+                    claimed[barcode] = line
+
+            quantity_changes: dict[int, int] = {}
+            if updates:
+                old_quantities = dict(
+                    session.exec(
+                        select(Stock.id, Stock.quantity).where(Stock.id.in_(updates))
+                    ).all()
+                )
+                quantity_changes = {
+                    stock_id: params["quantity_"] - old_quantities[stock_id]
+                    for stock_id, params in updates.items()
                 }
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+                session.connection().execute(
+                    update(stocks_table)
+                    .where(stocks_table.c.id == bindparam("id_"))
+                    .values(
+                        item_name=bindparam("item_name_"),
+                        quantity=bindparam("quantity_"),
+                        cost_price=bindparam("cost_price_"),
+                        selling_price=bindparam("selling_price_"),
+                        category=bindparam(
+                            "category_", type_=stocks_table.c.category.type
+                        ),
+                        expiry_date=bindparam(
+                            "expiry_date_", type_=stocks_table.c.expiry_date.type
+                        ),
+                        # A blank barcode in the file keeps the existing one
+                        barcode=func.coalesce(
+                            bindparam("barcode_", type_=stocks_table.c.barcode.type),
+                            stocks_table.c.barcode,
+                        ),
+                        reorder_level=func.coalesce(
+                            bindparam("reorder_level_", type_=Integer),
+                            stocks_table.c.reorder_level,
+                        ),
+                        updated_at=now,
+                    ),
+                    list(updates.values()),
+                )
+                _adjust_lots(session, quantity_changes)
+            if inserts:
+                created = session.connection().execute(
+                    insert(stocks_table).returning(
+                        stocks_table.c.id,
+                        stocks_table.c.quantity,
+                        stocks_table.c.cost_price,
+                        stocks_table.c.expiry_date,
+                    ),
+                    list(inserts.values()),
+                ).all()
+                # New items arrive as one opening lot each
+                lots = [
+                    {
+                        "stock_id": row.id,
+                        "quantity": row.quantity,
+                        "cost_price": row.cost_price,
+                        "expiry_date": row.expiry_date,
+                        "received_at": now,
+                    }
+                    for row in created
+                    if row.quantity > 0
+                ]
+                if lots:
+                    session.connection().execute(insert(StockLot.__table__), lots)
+                quantity_changes.update({row.id: row.quantity for row in created})
+            _post_stock_movements(session, MovementReason.IMPORT, quantity_changes)
+            session.commit()
+            return len(inserts), len(updates), errors
+
+    @staticmethod
+    def import_csv(
+        path: str,
+        chunk_size: int = 500,
+        progress: Callable[[int, int], None] | None = None,
+        is_cancelled: Callable[[], bool] | None = None,
+    ) -> dict:
+        """
+        Create or update stock from a CSV file with a header row naming
+        IMPORT_COLUMNS (category, expiry_date, barcode and reorder_level may be
+        left out).
+
+        Rows match existing active items by barcode, else by exact item name.
+        Valid rows are upserted in chunked executemany transactions; invalid
+        rows are listed in `errors` by file line instead of failing the import.
+        `progress(done, total)` is called after each chunk with the bytes read
+        so far and the file size, and `is_cancelled()` is polled between
+        chunks; chunks already written stay committed.
+        """
+        try:
+            total = os.path.getsize(path)
+            created = updated = done = 0
+            errors: list[dict] = []
+            cancelled = False
+
+            def flush(chunk):
+                nonlocal created, updated
+                try:
+                    results = [StockAPI._import_chunk(chunk)]
+                except IntegrityError:
+                    # Another writer took a barcode after the chunk was
+                    # checked; retry row by row so only that line fails
+                    results = []
+                    for line, values in chunk:
+                        try:
+                            results.append(StockAPI._import_chunk([(line, values)]))
+                        except IntegrityError:
+                            errors.append(
+                                {"line": line, "error": "Barcode is already in use"}
+                            )
+                for added, changed, rejected in results:
+                    created += added
+                    updated += changed
+                    errors.extend(rejected)
+                if progress:
+                    progress(done, total)
+
+            # Read bytes and decode line by line: a text file's tell() is
+            # unavailable while csv iterates it
+            with open(path, "rb") as f:
+                decoder = codecs.getincrementaldecoder("utf-8-sig")()
+                reader = csv.DictReader(decoder.decode(line) for line in f)
+                headers = {(h or "").strip().lower() for h in reader.fieldnames or []}
+                missing = StockAPI.IMPORT_REQUIRED - headers
+                if missing:
+                    return {
+                        "success": False,
+                        "error": f"Missing columns: {', '.join(sorted(missing))}",
+                    }
+
+                chunk: list[tuple[int, dict]] = []
+                for row in reader:
+                    row = {(k or "").strip().lower(): v for k, v in row.items()}
+                    try:
+                        chunk.append(
+                            (reader.line_num, StockAPI._parse_import_row(row))
+                        )
+                    except ValueError as e:
+                        errors.append({"line": reader.line_num, "error": str(e)})
+                    if len(chunk) >= chunk_size:
+                        done = f.tell()
+                        flush(chunk)
+                        chunk = []
+                        if is_cancelled and is_cancelled():
+                            cancelled = True
+                            break
+                if not cancelled:
+                    done = total
+                if chunk and not cancelled:
+                    flush(chunk)
+                elif progress:
+                    progress(done, total)
+
+            return {
+                "success": True,
+                "created": created,
+                "updated": updated,
+                "errors": errors,
+                "cancelled": cancelled,
+            }
+        except UnicodeDecodeError:
+            return {"success": False, "error": "CSV file must be UTF-8 encoded"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    # ---------- Lots ----------
+    @staticmethod
+    @retry_on_locked
+    def receive_lot(
+        stock_id: int,
+        quantity: int,
+        cost_price: float | None = None,
+        expiry_date: str | None = None,
+    ) -> dict:
+        """Book a delivery as a new lot and add its units to the item."""
+        try:
+            if quantity < 1:
+                return {"success": False, "error": "Quantity must be at least 1"}
+            expiry = (
+                datetime.strptime(expiry_date, "%Y-%m-%d").date()
+                if expiry_date
+                else None
+            )
+            with get_session() as session:
+                stock = session.get(Stock, stock_id)
+                if not stock or not stock.is_active:
+                    return {"success": False, "error": "Stock not found"}
+                lot = StockLot(
+                    stock_id=stock_id,
+                    quantity=quantity,
+                    cost_price=stock.cost_price if cost_price is None else cost_price,
+                    expiry_date=expiry,
+                )
+                session.add(lot)
+                session.flush()
+                balances = _change_stock(session, {stock_id: quantity})
+                _post_stock_movements(
+                    session,
+                    MovementReason.RECEIPT,
+                    {stock_id: quantity},
+                    lot.id,
+                    balances,
+                )
+                session.commit()
+                session.refresh(lot)
+                return {
+                    "success": True,
+                    "lot": StockLotRead.model_validate(lot).model_dump(),
+                }
+        except ValueError:
+            return {"success": False, "error": "Invalid expiry date format"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_lots(stock_id: int) -> dict:
+        """Open lots of one item in the order sales deplete them."""
+        try:
+            with get_session() as session:
+                lots = session.exec(
+                    select(StockLot)
+                    .where(StockLot.stock_id == stock_id, StockLot.quantity > 0)
+                    .order_by(
+                        StockLot.expiry_date.is_(None),
+                        StockLot.expiry_date,
+                        StockLot.id,
+                    )
+                ).all()
+                return {
+                    "success": True,
+                    "lots": [StockLotRead.model_validate(l).model_dump() for l in lots],
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_expiring(
+        days: int = 30,
+        after: tuple[str | date, int] | None = None,
+        limit: int = 100,
+    ) -> dict:
+        """
+        Open lots of active items expiring within `days` (already expired
+        ones included), soonest first. Pages are keyed on (expiry_date, id)
+        like get_invoice_history; the range is read from the
+        ix_stock_lots_open_expiry partial index.
+        """
+        try:
+            until = date.today() + timedelta(days=days)
+            with get_session() as session:
+                base = (
+                    select(StockLot.id)
+                    .join(Stock, Stock.id == StockLot.stock_id)
+                    .where(
+                        StockLot.quantity > 0,
+                        StockLot.expiry_date <= until,
+                        Stock.is_active == True,
+                    )
+                )
+                total = session.exec(
+                    select(func.count()).select_from(base.subquery())
+                ).one()
+
+                query = (
+                    select(
+                        StockLot.id,
+                        StockLot.stock_id,
+                        Stock.item_name,
+                        StockLot.quantity,
+                        StockLot.expiry_date,
+                    )
+                    .join(Stock, Stock.id == StockLot.stock_id)
+                    .where(
+                        StockLot.quantity > 0,
+                        StockLot.expiry_date <= until,
+                        Stock.is_active == True,
+                    )
+                )
+                if after:
+                    after_date, after_id = after
+                    if isinstance(after_date, str):
+                        after_date = datetime.strptime(after_date, "%Y-%m-%d").date()
+                    query = query.where(
+                        tuple_(StockLot.expiry_date, StockLot.id)
+                        > tuple_(after_date, after_id)
+                    )
+                rows = session.exec(
+                    query.order_by(StockLot.expiry_date, StockLot.id).limit(limit + 1)
+                ).all()
+
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = (rows[-1].expiry_date, rows[-1].id)
+                return {
+                    "success": True,
+                    "lots": [
+                        {
+                            "lot_id": row.id,
+                            "stock_id": row.stock_id,
+                            "item_name": row.item_name,
+                            "quantity": row.quantity,
+                            "expiry_date": row.expiry_date,
+                        }
+                        for row in rows
+                    ],
+                    "total": total,
+                    "next_cursor": next_cursor,
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    # ---------- Movements ----------
+    @staticmethod
+    def _parse_moment(value: str | date | datetime, end_of_day: bool) -> datetime:
+        if isinstance(value, str):
+            value = datetime.strptime(value, "%Y-%m-%d").date()
+        if isinstance(value, datetime):
+            return value
+        return datetime.combine(value, time.max if end_of_day else time.min)
+
+    @staticmethod
+    def get_quantity_as_of(
+        as_of: str | date | datetime, stock_ids: list[int] | None = None
+    ) -> dict:
+        """
+        On-hand quantity of each item at `as_of` (a date means its end), read
+        from the balance of the item's last movement up to then: one
+        (stock_id, ts) index seek per item. Items with no movement yet are 0.
+        """
+        try:
+            moment = StockAPI._parse_moment(as_of, end_of_day=True)
+            with get_session() as session:
+                last_balance = (
+                    select(StockMovement.balance)
+                    .where(
+                        StockMovement.stock_id == Stock.id,
+                        StockMovement.ts <= moment,
+                    )
+                    .order_by(StockMovement.ts.desc(), StockMovement.id.desc())
+                    .limit(1)
+                    .scalar_subquery()
+                )
+                query = select(Stock.id, func.coalesce(last_balance, 0))
+                if stock_ids is not None:
+                    query = query.where(Stock.id.in_(stock_ids))
+                return {
+                    "success": True,
+                    "as_of": moment,
+                    "quantities": dict(session.exec(query).all()),
+                }
+        except ValueError:
+            return {"success": False, "error": "Invalid date format"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_movements(
+        start: str | date | datetime | None = None,
+        end: str | date | datetime | None = None,
+        stock_id: int | None = None,
+        after: tuple[datetime, int] | None = None,
+        limit: int = 500,
+    ) -> dict:
+        """
+        Ledger rows in [start, end] oldest first, for one item or all items;
+        a range scan on (stock_id, ts) or ts. Pages are keyed on (ts, id):
+        pass `next_cursor` back as `after`.
+        """
+        try:
+            query = select(StockMovement)
+            if stock_id is not None:
+                query = query.where(StockMovement.stock_id == stock_id)
+            if start:
+                query = query.where(
+                    StockMovement.ts >= StockAPI._parse_moment(start, end_of_day=False)
+                )
+            if end:
+                query = query.where(
+                    StockMovement.ts <= StockAPI._parse_moment(end, end_of_day=True)
+                )
+            if after:
+                query = query.where(
+                    tuple_(StockMovement.ts, StockMovement.id) > tuple_(*after)
+                )
+            with get_session() as session:
+                rows = session.exec(
+                    query.order_by(StockMovement.ts, StockMovement.id).limit(limit + 1)
+                ).all()
+
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = (rows[-1].ts, rows[-1].id)
+                return {
+                    "success": True,
+                    "movements": [
+                        StockMovementRead.model_validate(m).model_dump() for m in rows
+                    ],
+                    "next_cursor": next_cursor,
+                }
+        except ValueError:
+            return {"success": False, "error": "Invalid date format"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+
+# ==========================
+# STOCKTAKE API
+# ==========================
+class StocktakeAPI:
+    """
+    Physical inventory counts. Counted quantities are staged in
+    stocktake_lines; variance is one join against stocks and approval writes
+    every adjustment in a single transaction.
+    """
+
+    IN_CHUNK = 500  # ids per IN list; counts may cover the whole catalog
+
+    @staticmethod
+    @retry_on_locked
+    def start(note: str | None = None) -> dict:
+        try:
+            with get_session() as session:
+                stocktake = Stocktake(note=(note or "").strip() or None)
+                session.add(stocktake)
+                session.commit()
+                session.refresh(stocktake)
+                return {
+                    "success": True,
+                    "stocktake": StocktakeRead.model_validate(stocktake).model_dump(),
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_stocktakes(status: str | None = None) -> dict:
+        try:
+            with get_session() as session:
+                query = select(Stocktake).order_by(Stocktake.id.desc())
+                if status:
+                    query = query.where(Stocktake.status == StocktakeStatus(status))
+                return {
+                    "success": True,
+                    "stocktakes": [
+                        StocktakeRead.model_validate(st).model_dump()
+                        for st in session.exec(query).all()
+                    ],
+                }
+        except ValueError:
+            return {"success": False, "error": "Invalid stocktake status"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _open_stocktake(session, stocktake_id: int) -> Stocktake:
+        stocktake = session.get(Stocktake, stocktake_id)
+        if not stocktake:
+            raise ValueError("Stocktake not found")
+        if stocktake.status != StocktakeStatus.OPEN:
+            raise ValueError(f"Stocktake is already {stocktake.status.value}")
+        return stocktake
+
+    @staticmethod
+    @retry_on_locked
+    def record_counts(
+        stocktake_id: int, counts: list[dict], mode: str = "set"
+    ) -> dict:
+        """
+        Stage counted quantities: counts is [{"stock_id": 1, "counted": 12}, ...].
+        mode "set" replaces an item's count, "add" adds to it (one scan = 1).
+        All rows are upserted with one executemany.
+        """
+        try:
+            if mode not in ("set", "add"):
+                return {"success": False, "error": "mode must be 'set' or 'add'"}
+            if any(c["counted"] < 0 for c in counts):
+                return {"success": False, "error": "Counts cannot be negative"}
+            with get_session() as session:
+                StocktakeAPI._open_stocktake(session, stocktake_id)
+
+                # Merge repeated items so each line is written once
+                merged: dict[int, int] = {}
+                for c in counts:
+                    base = merged.get(c["stock_id"], 0) if mode == "add" else 0
+                    merged[c["stock_id"]] = base + c["counted"]
+                if not merged:
+                    return {"success": True, "recorded": 0}
+
+                ids = list(merged)
+                found: set[int] = set()
+                for start in range(0, len(ids), StocktakeAPI.IN_CHUNK):
+                    found.update(
+                        session.exec(
+                            select(Stock.id).where(
+                                Stock.id.in_(ids[start : start + StocktakeAPI.IN_CHUNK]),
+                                Stock.is_active == True,
+                            )
+                        ).all()
+                    )
+                missing = sorted(set(merged) - found)
+                if missing:
+                    return {
+                        "success": False,
+                        "error": f"Stock not found or archived: {missing}",
+                    }
+
+                stmt = sqlite_insert(StocktakeLine).values(
+                    stocktake_id=stocktake_id,
+                    stock_id=bindparam("stock_id_"),
+                    counted=bindparam("counted_"),
+                    counted_at=datetime.now(),
+                )
+                counted = stmt.excluded.counted
+                if mode == "add":
+                    counted = StocktakeLine.counted + stmt.excluded.counted
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["stocktake_id", "stock_id"],
+                    set_={"counted": counted, "counted_at": stmt.excluded.counted_at},
+                )
+                session.connection().execute(
+                    stmt,
+                    [
+                        {"stock_id_": stock_id, "counted_": qty}
+                        for stock_id, qty in merged.items()
+                    ],
+                )
+                session.commit()
+                return {"success": True, "recorded": len(merged)}
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_variance(
+        stocktake_id: int,
+        differences_only: bool = True,
+        after: int | None = None,
+        limit: int = 500,
+    ) -> dict:
+        """
+        Counted vs on-hand quantity for the session's lines (active items
+        only), paged by stock id, plus totals over the whole session. Both
+        come from one stocktake_lines ⋈ stocks join.
+        """
+        try:
+            variance = StocktakeLine.counted - Stock.quantity
+            conditions = [
+                StocktakeLine.stocktake_id == stocktake_id,
+                Stock.is_active == True,
+            ]
+            with get_session() as session:
+                stocktake = session.get(Stocktake, stocktake_id)
+                if not stocktake:
+                    return {"success": False, "error": "Stocktake not found"}
+
+                counted, differing, net_units, net_cost = session.exec(
+                    select(
+                        func.count(),
+                        func.coalesce(func.sum(case((variance != 0, 1), else_=0)), 0),
+                        func.coalesce(func.sum(variance), 0),
+                        func.coalesce(func.sum(variance * Stock.cost_price), 0),
+                    )
+                    .select_from(StocktakeLine)
+                    .join(Stock, Stock.id == StocktakeLine.stock_id)
+                    .where(*conditions)
+                ).one()
+
+                query = (
+                    select(
+                        StocktakeLine.stock_id,
+                        Stock.item_name,
+                        Stock.quantity,
+                        StocktakeLine.counted,
+                        variance,
+                        variance * Stock.cost_price,
+                    )
+                    .join(Stock, Stock.id == StocktakeLine.stock_id)
+                    .where(*conditions)
+                )
+                if differences_only:
+                    query = query.where(variance != 0)
+                if after is not None:
+                    query = query.where(StocktakeLine.stock_id > after)
+                rows = session.exec(
+                    query.order_by(StocktakeLine.stock_id).limit(limit + 1)
+                ).all()
+
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = rows[-1][0]
+                return {
+                    "success": True,
+                    "stocktake": StocktakeRead.model_validate(stocktake).model_dump(),
+                    "lines": [
+                        {
+                            "stock_id": stock_id,
+                            "item_name": item_name,
+                            "expected": expected,
+                            "counted": counted_qty,
+                            "variance": diff,
+                            "variance_cost": diff_cost,
+                        }
+                        for (
+                            stock_id,
+                            item_name,
+                            expected,
+                            counted_qty,
+                            diff,
+                            diff_cost,
+                        ) in rows
+                    ],
+                    "summary": {
+                        "counted_items": counted,
+                        "differing_items": differing,
+                        "net_units": net_units,
+                        "net_cost": float(net_cost),
+                    },
+                    "next_cursor": next_cursor,
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    @retry_on_locked
+    def approve(stocktake_id: int) -> dict:
+        """
+        Set every counted active item to its counted quantity in one
+        transaction: an executemany UPDATE, FEFO lot depletion for shortfalls,
+        an adjustment lot per surplus and one ledger row per adjusted item.
+        Uncounted items are untouched.
+        """
+        try:
+            with get_session() as session:
+                stocktake = StocktakeAPI._open_stocktake(session, stocktake_id)
+                rows = session.exec(
+                    select(
+                        StocktakeLine.stock_id, StocktakeLine.counted, Stock.quantity
+                    )
+                    .join(Stock, Stock.id == StocktakeLine.stock_id)
+                    .where(
+                        StocktakeLine.stocktake_id == stocktake_id,
+                        Stock.is_active == True,
+                        StocktakeLine.counted != Stock.quantity,
+                    )
+                ).all()
+
+                now = datetime.now()
+                if rows:
+                    stocks_table = Stock.__table__
+                    session.connection().execute(
+                        update(stocks_table)
+                        .where(stocks_table.c.id == bindparam("id_"))
+                        .values(quantity=bindparam("quantity_"), updated_at=now),
+                        [{"id_": sid, "quantity_": counted} for sid, counted, _ in rows],
+                    )
+                    variances = {sid: counted - qty for sid, counted, qty in rows}
+                    _adjust_lots(session, variances)
+                    _post_stock_movements(
+                        session, MovementReason.STOCKTAKE, variances, stocktake_id
+                    )
+
+                stocktake.status = StocktakeStatus.APPROVED
+                stocktake.closed_at = now
+                session.add(stocktake)
+                session.commit()
+                return {
+                    "success": True,
+                    "adjusted": len(rows),
+                    "stock_ids": sorted(sid for sid, _, _ in rows),
+                }
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    @retry_on_locked
+    def cancel(stocktake_id: int) -> dict:
+        """Close the session without touching stock; its lines are kept."""
+        try:
+            with get_session() as session:
+                stocktake = StocktakeAPI._open_stocktake(session, stocktake_id)
+                stocktake.status = StocktakeStatus.CANCELLED
+                stocktake.closed_at = datetime.now()
+                session.add(stocktake)
+                session.commit()
+                return {"success": True}
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+
+# ==========================
+# SALE API
+# ==========================
+def _bump_sales_daily(
+    session,
+    day: date,
+    payment_method: PaymentMethod,
+    cashier_id: int,
+    **deltas: float,
+) -> None:
+    """Add `deltas` to one sales_daily row, creating it on first use."""
+    stmt = sqlite_insert(SalesDaily).values(
+        day=day, payment_method=payment_method, cashier_id=cashier_id, **deltas
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "payment_method", "cashier_id"],
+        set_={
+            name: getattr(SalesDaily, name) + stmt.excluded[name] for name in deltas
+        },
+    )
+    session.exec(stmt)
+
+
+class SaleAPI:
+    """Sales management API aligned with Sales UI."""
+
+    @staticmethod
+    @retry_on_locked
+    def create_sale(
+        cashier_id: int,
+        sale_items: list[dict],
+        amount_paid: float,
+        discount_amount: float = 0,
+        payment_method: str = "cash",
+        sale_date: str | None = None,
+    ) -> dict[str, Any]:
+        try:
+            parsed_date = date.today()
+            if sale_date:
+                parsed_date = datetime.strptime(sale_date, "%Y-%m-%d").date()
+
+            # Merge repeated cart lines so each stock row is decremented once
+            quantities: dict[int, int] = {}
+            for item in sale_items:
+                if item["quantity_sold"] < 1:
+                    return {"success": False, "error": "Quantity must be at least 1"}
+                quantities[item["stock_id"]] = (
+                    quantities.get(item["stock_id"], 0) + item["quantity_sold"]
+                )
+            if not quantities:
+                return {"success": False, "error": "No items in sale"}
+
+            with get_session() as session:
+                stocks = {
+                    s.id: s
+                    for s in session.exec(
+                        select(Stock).where(Stock.id.in_(quantities))
+                    ).all()
+                }
+                for stock_id, qty in quantities.items():
+                    stock = stocks.get(stock_id)
+                    if not stock:
+                        return {
+                            "success": False,
+                            "error": f"Stock {stock_id} not found",
+                        }
+                    if stock.quantity < qty:
+                        return {
+                            "success": False,
+                            "error": f"Insufficient stock for {stock.item_name}",
+                        }
+
+                gross_total = sum(
+                    stocks[i["stock_id"]].selling_price * i["quantity_sold"]
+                    for i in sale_items
+                )
+                cost_total = sum(
+                    stocks[i["stock_id"]].cost_price * i["quantity_sold"]
+                    for i in sale_items
+                )
+                total = gross_total - discount_amount
+                if amount_paid < total:
+                    return {"success": False, "error": "Insufficient payment"}
+
+                sale = Sale(
+                    sale_date=parsed_date,
+                    discount_amount=discount_amount,
+                    amount_paid=amount_paid,
+                    change_given=amount_paid - total,
+                    payment_method=PaymentMethod(payment_method),
+                    cashier_id=cashier_id,
+                    gross_total=gross_total,
+                    cost_total=cost_total,
+                    items_count=sum(quantities.values()),
+                )
+                session.add(sale)
+                session.flush()
+
+                # Conditional decrement: a concurrent till that sold the same
+                # units first makes the guard fail instead of going negative.
+                stocks_table = Stock.__table__
+                decremented = session.connection().execute(
+                    update(stocks_table)
+                    .where(
+                        stocks_table.c.id == bindparam("stock_id_"),
+                        stocks_table.c.quantity >= bindparam("qty_"),
+                    )
+                    .values(
+                        quantity=stocks_table.c.quantity - bindparam("qty_"),
+                        updated_at=datetime.now(),
+                    ),
+                    [
+                        {"stock_id_": stock_id, "qty_": qty}
+                        for stock_id, qty in quantities.items()
+                    ],
+                )
+                if decremented.rowcount != len(quantities):
+                    session.rollback()
+                    return {
+                        "success": False,
+                        "error": "Insufficient stock: quantities changed during checkout",
+                    }
+                _deplete_lots(session, quantities)
+                _post_stock_movements(
+                    session,
+                    MovementReason.SALE,
+                    {stock_id: -qty for stock_id, qty in quantities.items()},
+                    sale.id,
+                )
+
+                sale_items_models = session.scalars(
+                    insert(SaleItem).returning(SaleItem),
+                    [
+                        {
+                            "sale_id": sale.id,
+                            "stock_id": i["stock_id"],
+                            "quantity_sold": i["quantity_sold"],
+                            "unit_price": stocks[i["stock_id"]].selling_price,
+                            "unit_cost": stocks[i["stock_id"]].cost_price,
+                        }
+                        for i in sale_items
+                    ],
+                ).all()
+
+                _bump_sales_daily(
+                    session,
+                    sale.sale_date,
+                    sale.payment_method,
+                    sale.cashier_id,
+                    transactions=1,
+                    gross_total=gross_total,
+                    discount_total=discount_amount,
+                    cost_total=cost_total,
+                    items_sold=sale.items_count,
+                )
+
+                session.commit()
+
+                return {
+                    "success": True,
+                    "sale": SaleRead.model_validate(sale).model_dump(),
+                    "items": [
+                        SaleItemRead.model_validate(si).model_dump()
+                        for si in sale_items_models
+                    ],
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_all_sales() -> dict[str, Any]:
+        try:
+            with get_session() as session:
+                sales = session.exec(select(Sale)).all()
+                return {
+                    "success": True,
+                    "sales": [SaleRead.model_validate(s).model_dump() for s in sales],
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_sale_by_id(sale_id: int) -> dict[str, Any]:
+        try:
+            with get_session() as session:
+                sale = session.get(Sale, sale_id)
+                if not sale:
+                    return {"success": False, "error": "Sale not found"}
+
+                # Prices come from the checkout snapshot; only the name is joined
+                rows = session.exec(
+                    select(SaleItem, Stock.item_name)
+                    .join(Stock, Stock.id == SaleItem.stock_id, isouter=True)
+                    .where(SaleItem.sale_id == sale_id)
+                ).all()
+                items_data = [
+                    {
+                        "item_name": item_name or f"Item-{si.stock_id}",
+                        "quantity_sold": si.quantity_sold,
+                        "price": si.unit_price,
+                    }
+                    for si, item_name in rows
+                ]
+
+                return {
+                    "success": True,
+                    "sale": SaleRead.model_validate(sale).model_dump(),
+                    "items": items_data,
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
 
 
     @staticmethod
+    @retry_on_locked
     def delete_sale(sale_id: int, rollback_stock: bool = True) -> dict[str, Any]:
         try:
             with get_session() as session:
@@ -801,24 +2397,52 @@ class SaleAPI:
                 if not sale:
                     return {"success": False, "error": "Sale not found"}
 
+                has_returns = session.exec(
+                    select(Return.id).where(Return.sale_id == sale_id).limit(1)
+                ).first()
+                if has_returns:
+                    return {
+                        "success": False,
+                        "error": "Cannot delete sale with processed returns",
+                    }
+
                 sale_items = session.exec(
                     select(SaleItem).where(SaleItem.sale_id == sale_id)
                 ).all()
                 if rollback_stock:
+                    restored: dict[int, int] = {}
                     for item in sale_items:
-                        stock = session.get(Stock, item.stock_id)
-                        if stock:
-                            stock.quantity += item.quantity_sold
-                            stock.updated_at = datetime.now()
+                        restored[item.stock_id] = (
+                            restored.get(item.stock_id, 0) + item.quantity_sold
+                        )
+                    balances = _change_stock(session, restored)
+                    restored = {stock_id: restored[stock_id] for stock_id in balances}
+                    _restock_lots(session, restored)
+                    _post_stock_movements(
+                        session, MovementReason.SALE_VOID, restored, sale_id, balances
+                    )
 
                 for si in sale_items:
                     session.delete(si)
 
+                _bump_sales_daily(
+                    session,
+                    sale.sale_date,
+                    sale.payment_method,
+                    sale.cashier_id,
+                    transactions=-1,
+                    gross_total=-sale.gross_total,
+                    discount_total=-sale.discount_amount,
+                    cost_total=-sale.cost_total,
+                    items_sold=-sale.items_count,
+                )
+
                 session.delete(sale)
                 session.commit()
                 return {
                     "success": True,
                     "message": f"Sale {sale_id} deleted successfully",
+                    "stock_ids": sorted({si.stock_id for si in sale_items}),
                 }
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -826,47 +2450,8 @@ class SaleAPI:
     @staticmethod
     def get_today_totals() -> dict[str, float | bool]:
         """Return cumulative gross, profit, and items sold for today in a single query."""
-        try:
-            with get_session() as session:
-                today_str = date.today().strftime("%Y-%m-%d")
-
-                # Single query: join SaleItem -> Sale -> Stock and sum totals
-                result = session.exec(
-                    select(
-                        func.coalesce(
-                            func.sum(Stock.selling_price * SaleItem.quantity_sold), 0
-                        ),
-                        func.coalesce(
-                            func.sum(
-                                (Stock.selling_price - Stock.cost_price)
-                                * SaleItem.quantity_sold
-                            ),
-                            0,
-                        ),
-                        func.coalesce(func.sum(SaleItem.quantity_sold), 0),
-                    )
-                    .join(Sale, Sale.id == SaleItem.sale_id)
-                    .join(Stock, Stock.id == SaleItem.stock_id)
-                    .where(Sale.sale_date == today_str)
-                ).one()
-
-                gross_total, profit_total, items_sold_total = result
-
-                return {
-                    "success": True,
-                    "gross": gross_total,
-                    "profit": profit_total,
-                    "items_sold": items_sold_total,
-                }
-
-        except Exception as e:
-            return {
-                "success": False,
-                "gross": 0.0,
-                "profit": 0.0,
-                "items_sold": 0,
-                "error": str(e),
-            }
+        totals = SaleAPI.get_totals_by_date(date.today())
+        return {"success": "error" not in totals, **totals}
 
     @staticmethod
     def get_sales_history(
@@ -888,14 +2473,7 @@ class SaleAPI:
 
                 history = []
                 for s in sales:
-                    total_amount = (
-                        sum(
-                            si.quantity_sold
-                            * session.get(Stock, si.stock_id).selling_price
-                            for si in s.items
-                        )
-                        - s.discount_amount
-                    )
+                    total_amount = s.gross_total - s.discount_amount
                     history.append(
                         {
                             "invoice_no": s.id,  # or s.invoice_no if you store it
@@ -913,40 +2491,271 @@ class SaleAPI:
         except Exception as e:
             return []
 
+    @staticmethod
+    def get_invoice_history(
+        start_date: str | None = None,
+        end_date: str | None = None,
+        search: str | None = None,
+        after: tuple[str | date, int] | None = None,
+        limit: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Return per-invoice gross, profit and item count in a single query,
+        newest first, optionally filtered by an inclusive date range and a
+        search (see _invoice_search).
+
+        Pages are keyed on (sale_date, id): pass the `next_cursor` of one
+        page as `after` to fetch the next; it is None on the last page.
+        """
+        try:
+            with get_session() as session:
+                query = select(
+                    Sale.id,
+                    Sale.sale_date,
+                    Sale.amount_paid,
+                    Sale.discount_amount,
+                    Sale.payment_method,
+                    Sale.gross_total,
+                    (Sale.gross_total - Sale.cost_total).label("profit"),
+                    Sale.items_count,
+                )
+                if start_date:
+                    query = query.where(Sale.sale_date >= start_date)
+                if end_date:
+                    query = query.where(Sale.sale_date <= end_date)
+                if search and search.strip():
+                    query = query.where(SaleAPI._invoice_search(search.strip()))
+                if after:
+                    after_date, after_id = after
+                    if isinstance(after_date, str):
+                        after_date = datetime.strptime(after_date, "%Y-%m-%d").date()
+                    query = query.where(
+                        tuple_(Sale.sale_date, Sale.id) < tuple_(after_date, after_id)
+                    )
+                query = query.order_by(Sale.sale_date.desc(), Sale.id.desc())
+                if limit:
+                    # One extra row tells us whether another page exists
+                    query = query.limit(limit + 1)
+
+                rows = session.exec(query).all()
+                next_cursor = None
+                if limit and len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = (rows[-1].sale_date, rows[-1].id)
+
+                return {
+                    "success": True,
+                    "next_cursor": next_cursor,
+                    "sales": [
+                        {
+                            "id": row.id,
+                            "sale_date": row.sale_date,
+                            "amount_paid": row.amount_paid,
+                            "discount_amount": row.discount_amount,
+                            "payment_method": row.payment_method.value,
+                            "gross": row.gross_total,
+                            "profit": row.profit,
+                            "items_sold": row.items_count,
+                        }
+                        for row in rows
+                    ],
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _invoice_search(term: str):
+        """
+        Filter for the history search box. A date ("2024-05-17") or month
+        ("2024-05") is a range seek on the (sale_date, id) index; anything
+        else matches part of the invoice number ("INV-00042", "0004", "42").
+        That filter is checked while walking the same index newest first, so
+        a page stops after `limit` hits instead of sorting every sale.
+        """
+        for fmt, span in (("%Y-%m-%d", "day"), ("%Y-%m", "month")):
+            try:
+                start = datetime.strptime(term, fmt).date()
+            except ValueError:
+                continue
+            if span == "day":
+                return Sale.sale_date == start
+            end = (start + timedelta(days=31)).replace(day=1)
+            return and_(Sale.sale_date >= start, Sale.sale_date < end)
+
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return func.printf("INV-%05d", Sale.id).like(f"%{escaped}%", escape="\\")
+
+    EXPORT_HEADERS = [
+        "Invoice",
+        "Date",
+        "Time",
+        "Pay Method",
+        "Cashier ID",
+        "Item",
+        "Quantity",
+        "Unit Price",
+        "Unit Cost",
+        "Line Total",
+        "Invoice Gross",
+        "Invoice Discount",
+        "Amount Paid",
+    ]
+
+    @staticmethod
+    def _export_lines_query(start_date: str | None, end_date: str | None):
+        query = (
+            select(
+                Sale.id,
+                Sale.sale_date,
+                Sale.sale_time,
+                Sale.payment_method,
+                Sale.cashier_id,
+                Stock.item_name,
+                SaleItem.stock_id,
+                SaleItem.quantity_sold,
+                SaleItem.unit_price,
+                SaleItem.unit_cost,
+                Sale.gross_total,
+                Sale.discount_amount,
+                Sale.amount_paid,
+            )
+            .select_from(Sale)
+            .join(SaleItem, SaleItem.sale_id == Sale.id)
+            .join(Stock, Stock.id == SaleItem.stock_id, isouter=True)
+        )
+        if start_date:
+            query = query.where(Sale.sale_date >= start_date)
+        if end_date:
+            query = query.where(Sale.sale_date <= end_date)
+        return query
+
+    @staticmethod
+    def count_export_lines(
+        start_date: str | None = None, end_date: str | None = None
+    ) -> dict[str, Any]:
+        """Count the line items an export of the date range would write."""
+        try:
+            with get_session() as session:
+                query = SaleAPI._export_lines_query(start_date, end_date)
+                count = session.exec(
+                    select(func.count()).select_from(query.subquery())
+                ).one()
+                return {"success": True, "count": count}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def iter_export_lines(
+        start_date: str | None = None,
+        end_date: str | None = None,
+        batch_size: int = 500,
+    ) -> Iterator[list]:
+        """
+        Yield one row per sale line item (matching EXPORT_HEADERS), oldest
+        first, streamed from the cursor in batches so memory use does not
+        grow with the date range. Errors propagate to the caller.
+        """
+        query = SaleAPI._export_lines_query(start_date, end_date).order_by(
+            Sale.sale_date, Sale.id, SaleItem.id
+        )
+        with get_session() as session:
+            result = session.exec(
+                query.execution_options(yield_per=batch_size, stream_results=True)
+            )
+            for row in result:
+                yield [
+                    f"INV-{row.id:05d}",
+                    row.sale_date.isoformat(),
+                    row.sale_time.strftime("%H:%M:%S") if row.sale_time else "",
+                    row.payment_method.value,
+                    row.cashier_id,
+                    row.item_name or f"Item-{row.stock_id}",
+                    row.quantity_sold,
+                    f"{row.unit_price:.2f}",
+                    f"{row.unit_cost:.2f}",
+                    f"{row.unit_price * row.quantity_sold:.2f}",
+                    f"{row.gross_total:.2f}",
+                    f"{row.discount_amount:.2f}",
+                    f"{row.amount_paid:.2f}",
+                ]
+
     @staticmethod
     def get_totals_by_date(sale_date: str | date) -> dict[str, float | int]:
         """
         Return cumulative gross, profit, and items sold for a given date.
         sale_date: either a date object or "YYYY-MM-DD" string
         """
+        return SaleAPI.get_totals_by_range(sale_date, sale_date)
+
+    @staticmethod
+    def get_totals_by_range(
+        start_date: str | date, end_date: str | date
+    ) -> dict[str, float | int]:
+        """
+        Return gross, profit, and items sold for an inclusive date range, read
+        from the sales_daily rollup. These are gross of returns, as the Sales
+        page LCDs always showed; returns in the range are reported separately
+        (returns, returns_profit, items_returned) so callers can net them.
+        """
         try:
-            if isinstance(sale_date, str):
-                sale_date = datetime.strptime(sale_date, "%Y-%m-%d").date()
+            if isinstance(start_date, str):
+                start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+            if isinstance(end_date, str):
+                end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
             with get_session() as session:
                 result = session.exec(
                     select(
-                        func.coalesce(func.sum(Stock.selling_price * SaleItem.quantity_sold), 0),
+                        func.coalesce(func.sum(SalesDaily.gross_total), 0),
                         func.coalesce(
-                            func.sum((Stock.selling_price - Stock.cost_price) * SaleItem.quantity_sold), 0
+                            func.sum(SalesDaily.gross_total - SalesDaily.cost_total),
+                            0,
                         ),
-                        func.coalesce(func.sum(SaleItem.quantity_sold), 0),
-                    )
-                    .join(Sale, Sale.id == SaleItem.sale_id)
-                    .join(Stock, Stock.id == SaleItem.stock_id)
-                    .where(Sale.sale_date == sale_date)
+                        func.coalesce(func.sum(SalesDaily.items_sold), 0),
+                        func.coalesce(func.sum(SalesDaily.returns_total), 0),
+                        func.coalesce(
+                            func.sum(
+                                SalesDaily.returns_total - SalesDaily.returns_cost
+                            ),
+                            0,
+                        ),
+                        func.coalesce(func.sum(SalesDaily.items_returned), 0),
+                    ).where(SalesDaily.day >= start_date, SalesDaily.day <= end_date)
                 ).one()
 
-                gross_total, profit_total, items_sold_total = result
+                (
+                    gross_total,
+                    profit_total,
+                    items_sold_total,
+                    returns_total,
+                    returns_profit,
+                    items_returned,
+                ) = result
 
                 return {
                     "gross": float(gross_total),
                     "profit": float(profit_total),
                     "items_sold": int(items_sold_total),
+                    "returns": float(returns_total),
+                    "returns_profit": float(returns_profit),
+                    "items_returned": int(items_returned),
                 }
         except Exception as e:
             return {"gross": 0.0, "profit": 0.0, "items_sold": 0, "error": str(e)}
 
+    @staticmethod
+    @retry_on_locked
+    def rebuild_sales_daily() -> dict[str, Any]:
+        """Regenerate the sales_daily rollup from raw sales and returns."""
+        try:
+            with get_session() as session:
+                rows = rebuild_sales_daily(session.connection())
+                session.commit()
+                return {"success": True, "rows": rows}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+
 # ==========================
 # DAMAGE API
 # ==========================
@@ -956,6 +2765,7 @@ class DamageAPI:
     """Damage management API with stock sync for production use."""
 
     @staticmethod
+    @retry_on_locked
     def record_damage(
         stock_id: int, quantity_damaged: int, status: str = "broken"
     ) -> Dict[str, Any]:
@@ -970,13 +2780,26 @@ class DamageAPI:
                 damage = Damage(
                     stock_id=stock_id,
                     quantity_damaged=quantity_damaged,
+                    unit_price=stock.selling_price,
+                    unit_cost=stock.cost_price,
                     damage_status=DamageStatus(status),
                 )
                 session.add(damage)
+                session.flush()
 
-                # Adjust stock
-                stock.quantity -= quantity_damaged
-                stock.updated_at = datetime.now()
+                # Adjust stock; the guard catches units sold since the check
+                balances = _change_stock(session, {stock_id: -quantity_damaged})
+                if not balances:
+                    session.rollback()
+                    return {"success": False, "error": "Insufficient stock to damage"}
+                _deplete_lots(session, {stock_id: quantity_damaged})
+                _post_stock_movements(
+                    session,
+                    MovementReason.DAMAGE,
+                    {stock_id: -quantity_damaged},
+                    damage.id,
+                    balances,
+                )
 
                 session.commit()
 
@@ -997,6 +2820,7 @@ class DamageAPI:
             return {"success": False, "error": str(e)}
 
     @staticmethod
+    @retry_on_locked
     def update_damage(
         damage_id: int, new_quantity: int, new_status: str
     ) -> Dict[str, Any]:
@@ -1023,9 +2847,26 @@ class DamageAPI:
                 damage.quantity_damaged = new_quantity
                 damage.damage_status = DamageStatus(new_status)
 
-                # Adjust stock
-                stock.quantity -= qty_diff
-                stock.updated_at = datetime.now()
+                # Adjust stock; the guard catches units sold since the check
+                balances = _change_stock(session, {stock.id: -qty_diff})
+                if qty_diff and not balances:
+                    session.rollback()
+                    return {
+                        "success": False,
+                        "error": "Insufficient stock to increase damage quantity",
+                    }
+                _adjust_lots(session, {stock.id: -qty_diff})
+                # Lowering a damage puts units back, like deleting it
+                reason = (
+                    MovementReason.DAMAGE_VOID if qty_diff < 0 else MovementReason.DAMAGE
+                )
+                _post_stock_movements(
+                    session,
+                    reason,
+                    {stock.id: -qty_diff},
+                    damage_id,
+                    balances,
+                )
 
                 session.commit()
 
@@ -1034,6 +2875,7 @@ class DamageAPI:
             return {"success": False, "error": str(e)}
 
     @staticmethod
+    @retry_on_locked
     def delete_damage(damage_id: int) -> Dict[str, Any]:
         try:
             with get_session() as session:
@@ -1041,16 +2883,28 @@ class DamageAPI:
                 if not damage:
                     return {"success": False, "error": "Damage record not found"}
 
-                stock = session.get(Stock, damage.stock_id)
-                if stock:
-                    # Restore stock quantity when damage deleted
-                    stock.quantity += damage.quantity_damaged
-                    stock.updated_at = datetime.now()
+                # Restore stock quantity when damage deleted
+                restored = {damage.stock_id: damage.quantity_damaged}
+                balances = _change_stock(session, restored)
+                if balances:
+                    _restock_lots(session, restored)
+                    _post_stock_movements(
+                        session,
+                        MovementReason.DAMAGE_VOID,
+                        restored,
+                        damage_id,
+                        balances,
+                    )
 
+                stock_id = damage.stock_id
                 session.delete(damage)
                 session.commit()
 
-                return {"success": True, "message": "Damage deleted and stock restored"}
+                return {
+                    "success": True,
+                    "message": "Damage deleted and stock restored",
+                    "stock_id": stock_id,
+                }
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -1068,7 +2922,7 @@ class DamageAPI:
                             "stock_id": d.stock_id,
                             "item_name": stock.item_name if stock else "Unknown",
                             "quantity_damaged": d.quantity_damaged,
-                            "price": stock.selling_price if stock else 0,
+                            "price": d.unit_price,
                             "damage_status": d.damage_status.value,
                             "created_at": d.created_at.strftime("%Y-%m-%d %H:%M:%S"),
                         }
@@ -1150,6 +3004,7 @@ class ExpenditureAPI:
 
     # ---------- Create ----------
     @staticmethod
+    @retry_on_locked
     def create_expenditure(
         description: str, amount: float, category: str, expense_date: str | None = None
     ) -> dict:
@@ -1192,6 +3047,7 @@ class ExpenditureAPI:
 
     # ---------- Update ----------
     @staticmethod
+    @retry_on_locked
     def update_expenditure(
         exp_id: int, description: str, amount: float, category: str, expense_date: str
     ) -> dict:
@@ -1242,6 +3098,7 @@ class ExpenditureAPI:
 
     # ---------- Delete ----------
     @staticmethod
+    @retry_on_locked
     def delete_expenditure(exp_id: int) -> dict:
         try:
             with get_session() as session:
@@ -1316,6 +3173,7 @@ class ReturnAPI:
     """Return management API aligned with Return UI."""
 
     @staticmethod
+    @retry_on_locked
     def process_return(
         sale_id: int, stock_id: int, quantity: int, reason: str = "defective"
     ) -> dict[str, Any]:
@@ -1329,6 +3187,15 @@ class ReturnAPI:
                 if not stock:
                     return {"success": False, "error": "Stock not found"}
 
+                line = session.exec(
+                    select(SaleItem.unit_price, SaleItem.unit_cost)
+                    .where(SaleItem.stock_id == stock_id, SaleItem.sale_id == sale_id)
+                    .limit(1)
+                ).first()
+                if not line:
+                    return {"success": False, "error": "Item not part of this sale"}
+                unit_price, unit_cost = line
+
                 ret = Return(
                     sale_id=sale_id,
                     stock_id=stock_id,
@@ -1336,9 +3203,27 @@ class ReturnAPI:
                     reason=ReturnReason(reason),
                 )
                 session.add(ret)
+                session.flush()
 
-                stock.quantity += quantity
-                stock.updated_at = datetime.now()
+                balances = _change_stock(session, {stock_id: quantity})
+                _restock_lots(session, {stock_id: quantity})
+                _post_stock_movements(
+                    session,
+                    MovementReason.RETURN,
+                    {stock_id: quantity},
+                    ret.id,
+                    balances,
+                )
+
+                _bump_sales_daily(
+                    session,
+                    ret.return_date,
+                    sale.payment_method,
+                    sale.cashier_id,
+                    returns_total=unit_price * quantity,
+                    returns_cost=unit_cost * quantity,
+                    items_returned=quantity,
+                )
 
                 session.commit()
                 return {
@@ -1369,109 +3254,442 @@ class ReturnAPI:
 class ReportAPI:
     """Report generation API aligned with Report UI."""
 
+    # Report page categories, in the order "all" lists them
+    CATEGORIES = ["sales", "expenditures", "damages", "returns", "stock"]
+
     @staticmethod
     def generate_report(
         start_date: str, end_date: str, category: str = "all", as_pdf: bool = False
     ):
+        """
+        Summarise each requested category over the date range as one grouped
+        aggregate: sales by payment method (from the sales_daily rollup),
+        expenditures by category, damages by status, returns by reason and
+        current stock valuation by stock type. Work done in Python is per
+        group, never per row.
+        """
         try:
             start = datetime.strptime(start_date, "%Y-%m-%d").date()
             end = datetime.strptime(end_date, "%Y-%m-%d").date()
+            category = category.lower()
+            if category == "all":
+                categories = ReportAPI.CATEGORIES
+            elif category in ReportAPI.CATEGORIES:
+                categories = [category]
+            else:
+                return {"success": False, "error": f"Unknown category: {category}"}
+
             with get_session() as session:
                 data: list[dict] = []
-
-                if category in ["all", "sales"]:
-                    sales = session.exec(
-                        select(Sale).where(
-                            and_(Sale.sale_date >= start, Sale.sale_date <= end)
-                        )
-                    ).all()
-                    total = sum(s.amount_paid - s.change_given for s in sales)
-                    data.append(
-                        ReportRead(
-                            category="sales", total=total, count=len(sales)
-                        ).model_dump()
-                    )
-
-                if category in ["all", "expenditures"]:
-                    exps = session.exec(
-                        select(Expenditure).where(
-                            and_(
-                                Expenditure.expense_date >= start,
-                                Expenditure.expense_date <= end,
-                            )
-                        )
-                    ).all()
-                    total = sum(e.amount for e in exps)
+                for name in categories:
+                    query = getattr(ReportAPI, f"_{name}_query")(start, end)
+                    breakdown = [
+                        {
+                            # Enum groups come back as members; report their values
+                            "group": getattr(group, "value", group),
+                            "total": float(total or 0),
+                            "cost": float(cost or 0),
+                            "count": int(count or 0),
+                        }
+                        for group, total, cost, count in session.exec(query).all()
+                    ]
                     data.append(
                         ReportRead(
-                            category="expenditures", total=total, count=len(exps)
+                            category=name,
+                            total=sum(g["total"] for g in breakdown),
+                            cost=sum(g["cost"] for g in breakdown),
+                            count=sum(g["count"] for g in breakdown),
+                            breakdown=breakdown,
                         ).model_dump()
                     )
 
-                if not as_pdf:
-                    return {"success": True, "report": data}
-
-                buffer = BytesIO()
-                c = canvas.Canvas(buffer, pagesize=A4)
-                c.setFont("Helvetica-Bold", 14)
-                c.drawString(200, 800, "Business Report")
-                y = 760
-                for entry in data:
-                    c.setFont("Helvetica-Bold", 12)
-                    c.drawString(50, y, entry["category"].upper())
-                    y -= 20
-                    c.setFont("Helvetica", 10)
-                    for k, v in entry.items():
-                        if k != "category":
-                            c.drawString(70, y, f"{k}: {v}")
-                            y -= 15
-                    y -= 10
-                c.save()
-                return buffer.getvalue()
+            if not as_pdf:
+                return {"success": True, "report": data}
+            return ReportAPI.render_report_pdf(data, start, end)
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    # ---------- Category aggregates: (group, total, cost, count) ----------
+    @staticmethod
+    def _sales_query(start: date, end: date):
+        # Net of discounts and returns; count is transactions
+        return (
+            select(
+                SalesDaily.payment_method,
+                func.sum(
+                    SalesDaily.gross_total
+                    - SalesDaily.discount_total
+                    - SalesDaily.returns_total
+                ),
+                func.sum(SalesDaily.cost_total - SalesDaily.returns_cost),
+                func.sum(SalesDaily.transactions),
+            )
+            .where(SalesDaily.day >= start, SalesDaily.day <= end)
+            .group_by(SalesDaily.payment_method)
+        )
+
+    @staticmethod
+    def _expenditures_query(start: date, end: date):
+        return (
+            select(
+                Expenditure.category,
+                func.sum(Expenditure.amount),
+                literal(0.0),
+                func.count(Expenditure.id),
+            )
+            .where(Expenditure.expense_date >= start, Expenditure.expense_date <= end)
+            .group_by(Expenditure.category)
+        )
+
+    @staticmethod
+    def _damages_query(start: date, end: date):
+        # Units lost, valued at the prices snapshotted when each was recorded
+        return (
+            select(
+                Damage.damage_status,
+                func.sum(Damage.quantity_damaged * Damage.unit_price),
+                func.sum(Damage.quantity_damaged * Damage.unit_cost),
+                func.count(Damage.id),
+            )
+            .where(Damage.damage_date >= start, Damage.damage_date <= end)
+            .group_by(Damage.damage_status)
+        )
+
+    @staticmethod
+    def _returns_query(start: date, end: date):
+        # Refunds at the price snapshotted on the sale line; each lookup is a
+        # probe of ix_sale_items_stock_id_sale_id
+        def line_value(column):
+            return (
+                select(column)
+                .where(
+                    SaleItem.stock_id == Return.stock_id,
+                    SaleItem.sale_id == Return.sale_id,
+                )
+                .limit(1)
+                .scalar_subquery()
+            )
+
+        return (
+            select(
+                Return.reason,
+                func.sum(Return.quantity * line_value(SaleItem.unit_price)),
+                func.sum(Return.quantity * line_value(SaleItem.unit_cost)),
+                func.count(Return.id),
+            )
+            .where(Return.return_date >= start, Return.return_date <= end)
+            .group_by(Return.reason)
+        )
+
+    @staticmethod
+    def _stock_query(start: date, end: date):
+        # Valuation is a snapshot of active stock now; the range does not apply
+        return (
+            select(
+                Stock.category,
+                func.sum(Stock.quantity * Stock.selling_price),
+                func.sum(Stock.quantity * Stock.cost_price),
+                func.count(Stock.id),
+            )
+            .where(Stock.is_active == True)
+            .group_by(Stock.category)
+        )
+
+    @staticmethod
+    def render_report_pdf(data: list[dict], start: date, end: date) -> bytes:
+        """Render the "report" list of generate_report as a PDF document."""
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(200, 800, "Business Report")
+        c.setFont("Helvetica", 10)
+        c.drawString(200, 785, f"{start:%Y-%m-%d} to {end:%Y-%m-%d}")
+        y = 750
+        for entry in data:
+            if y < 120:
+                c.showPage()
+                y = 800
+            c.setFont("Helvetica-Bold", 12)
+            c.drawString(50, y, entry["category"].upper())
+            y -= 20
+            c.setFont("Helvetica-Bold", 10)
+            headings = [(70, "Group"), (250, "Count"), (330, "Total"), (430, "Cost")]
+            for x, heading in headings:
+                c.drawString(x, y, heading)
+            y -= 15
+            c.setFont("Helvetica", 10)
+            rows = [
+                (
+                    g["group"].replace("_", " ").title(),
+                    g["count"],
+                    g["total"],
+                    g["cost"],
+                )
+                for g in entry["breakdown"]
+            ]
+            rows.append(("All", entry["count"], entry["total"], entry["cost"]))
+            for group, count, total, cost in rows:
+                if y < 50:
+                    c.showPage()
+                    c.setFont("Helvetica", 10)
+                    y = 800
+                c.drawString(70, y, group)
+                c.drawString(250, y, str(count))
+                c.drawString(330, y, f"{total:,.2f}")
+                c.drawString(430, y, f"{cost:,.2f}")
+                y -= 15
+            y -= 10
+        c.save()
+        return buffer.getvalue()
+
 
 # ==========================
 # DASHBOARD API
 # ==========================
+# Matches the ix_stocks_low_stock partial index predicate term for term, so
+# SQLite can answer low-stock queries from the index alone
+LOW_STOCK_SQL = "is_active = 1 AND quantity <= reorder_level"
+
+
 class DashboardAPI:
     """Dashboard API aligned with Dashboard UI."""
 
     @staticmethod
-    def get_kpis() -> dict[str, Any]:
+    def get_kpis(
+        period: str = "all",
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        Compute dashboard KPIs from the sales_daily rollup (net of returns).
+        period: "all", "today", "week", "month" or "custom" (uses start_date/end_date)
+        """
+        try:
+            start, end = _resolve_period(period, start_date, end_date)
+        except ValueError:
+            return {"success": False, "error": "Invalid period or date format"}
+
         try:
             with get_session() as session:
-                sales = session.exec(select(Sale)).all()
-                revenue = sum(s.amount_paid - s.change_given for s in sales)
-                transactions = len(sales)
-
-                sale_items = session.exec(select(SaleItem)).all()
-                gross_profit = sum(
-                    (
-                        session.get(Stock, item.stock_id).selling_price
-                        - session.get(Stock, item.stock_id).cost_price
-                    )
-                    * item.quantity_sold
-                    for item in sale_items
+                sales_query = select(
+                    func.coalesce(func.sum(SalesDaily.transactions), 0),
+                    func.coalesce(
+                        func.sum(
+                            SalesDaily.gross_total
+                            - SalesDaily.discount_total
+                            - SalesDaily.returns_total
+                        ),
+                        0,
+                    ),
+                    func.coalesce(
+                        func.sum(SalesDaily.gross_total - SalesDaily.returns_total), 0
+                    ),
+                    func.coalesce(
+                        func.sum(SalesDaily.cost_total - SalesDaily.returns_cost), 0
+                    ),
+                    func.coalesce(func.sum(SalesDaily.items_sold), 0),
+                    func.coalesce(func.sum(SalesDaily.items_returned), 0),
+                )
+                exp_query = select(func.coalesce(func.sum(Expenditure.amount), 0))
+                damage_query = select(
+                    func.coalesce(func.sum(Damage.quantity_damaged), 0)
                 )
 
-                expenditures = session.exec(select(Expenditure)).all()
-                net_profit = gross_profit - sum(e.amount for e in expenditures)
-
-                low_stock = session.exec(select(Stock).where(Stock.quantity < 10)).all()
+                if start:
+                    sales_query = sales_query.where(SalesDaily.day >= start)
+                    exp_query = exp_query.where(Expenditure.expense_date >= start)
+                    damage_query = damage_query.where(Damage.damage_date >= start)
+                if end:
+                    sales_query = sales_query.where(SalesDaily.day <= end)
+                    exp_query = exp_query.where(Expenditure.expense_date <= end)
+                    damage_query = damage_query.where(Damage.damage_date <= end)
+
+                (
+                    transactions,
+                    revenue,
+                    items_gross,
+                    cogs,
+                    items_sold,
+                    items_returned,
+                ) = session.exec(sales_query).one()
+                expenditure = session.exec(exp_query).one()
+                items_damaged = session.exec(damage_query).one()
+
+                low_stock_count = session.exec(
+                    text(f"SELECT COUNT(*) FROM stocks WHERE {LOW_STOCK_SQL}")
+                ).one()[0]
+
+                gross_profit = float(items_gross) - float(cogs)
 
                 return {
                     "success": True,
                     "kpis": DashboardKPIRead.model_validate(
                         {
                             "total_revenue": revenue,
-                            "total_profit": net_profit,
+                            "total_profit": gross_profit - float(expenditure),
                             "total_transactions": transactions,
-                            "low_stock_count": len(low_stock),
-                            "low_stock_items": [s.item_name for s in low_stock],
+                            "total_cogs": cogs,
+                            "total_expenditure": expenditure,
+                            "low_stock_count": low_stock_count,
+                            # Units returned / damaged per 100 units sold
+                            "return_rate": (
+                                100 * items_returned / items_sold if items_sold else 0
+                            ),
+                            "damage_rate": (
+                                100 * items_damaged / items_sold if items_sold else 0
+                            ),
                         }
                     ).model_dump(),
                 }
         except Exception as e:
             return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_low_stock_alerts(after: int | None = None, limit: int = 50) -> dict:
+        """
+        Page through active items at or below their reorder level, ordered by
+        id. Pass `next_cursor` back as `after` for the following page; reads
+        only the ix_stocks_low_stock partial index, never the whole catalog.
+        """
+        try:
+            with get_session() as session:
+                total = session.exec(
+                    text(f"SELECT COUNT(*) FROM stocks WHERE {LOW_STOCK_SQL}")
+                ).one()[0]
+                rows = session.exec(
+                    text(
+                        "SELECT id, item_name, quantity, reorder_level FROM stocks "
+                        f"WHERE {LOW_STOCK_SQL} AND id > :after "
+                        "ORDER BY id LIMIT :limit"
+                    ),
+                    params={"after": after or 0, "limit": limit + 1},
+                ).all()
+
+                alerts = [
+                    {
+                        "stock_id": row.id,
+                        "item_name": row.item_name,
+                        "quantity": row.quantity,
+                        "reorder_level": row.reorder_level,
+                    }
+                    for row in rows[:limit]
+                ]
+                return {
+                    "success": True,
+                    "alerts": alerts,
+                    "total": total,
+                    "next_cursor": alerts[-1]["stock_id"] if len(rows) > limit else None,
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_sales_series(days: int = 7) -> dict:
+        """
+        Daily net revenue and transactions for the last `days` days (today
+        included) from the sales_daily rollup; days without sales are 0.
+        """
+        try:
+            today = date.today()
+            start = today - timedelta(days=days - 1)
+            with get_session() as session:
+                rows = session.exec(
+                    select(
+                        SalesDaily.day,
+                        func.sum(
+                            SalesDaily.gross_total
+                            - SalesDaily.discount_total
+                            - SalesDaily.returns_total
+                        ),
+                        func.sum(SalesDaily.transactions),
+                    )
+                    .where(SalesDaily.day >= start, SalesDaily.day <= today)
+                    .group_by(SalesDaily.day)
+                ).all()
+
+            by_day = {day: (revenue, count) for day, revenue, count in rows}
+            series = []
+            for offset in range(days):
+                day = start + timedelta(days=offset)
+                revenue, transactions = by_day.get(day, (0.0, 0))
+                series.append(
+                    {
+                        "day": day,
+                        "revenue": float(revenue or 0),
+                        "transactions": int(transactions or 0),
+                    }
+                )
+            return {"success": True, "series": series}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def get_top_items(days: int = 30, k: int = 5, by: str = "quantity") -> dict:
+        """
+        Best sellers of the last `days` days, ranked by units sold or by
+        revenue at the snapshotted sale price: one GROUP BY stock_id over the
+        window's sale lines with ORDER BY ... LIMIT k.
+        """
+        try:
+            if by not in ("quantity", "revenue"):
+                return {
+                    "success": False,
+                    "error": "by must be 'quantity' or 'revenue'",
+                }
+            start = date.today() - timedelta(days=days - 1)
+            quantity = func.sum(SaleItem.quantity_sold).label("quantity")
+            revenue = func.sum(SaleItem.quantity_sold * SaleItem.unit_price).label(
+                "revenue"
+            )
+            top = (
+                select(SaleItem.stock_id, quantity, revenue)
+                .join(Sale, Sale.id == SaleItem.sale_id)
+                .where(Sale.sale_date >= start)
+                .group_by(SaleItem.stock_id)
+                .order_by((quantity if by == "quantity" else revenue).desc())
+                .limit(k)
+                .subquery()
+            )
+            with get_session() as session:
+                # Names are looked up for the k winners only
+                rows = session.exec(
+                    select(
+                        top.c.stock_id, Stock.item_name, top.c.quantity, top.c.revenue
+                    )
+                    .join(Stock, Stock.id == top.c.stock_id)
+                    .order_by(top.c[by].desc())
+                ).all()
+            return {
+                "success": True,
+                "items": [
+                    {
+                        "stock_id": stock_id,
+                        "item_name": item_name,
+                        "quantity": int(qty),
+                        "revenue": float(rev),
+                    }
+                    for stock_id, item_name, qty, rev in rows
+                ],
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+
+def _resolve_period(
+    period: str, start_date: str | None = None, end_date: str | None = None
+) -> tuple[date | None, date | None]:
+    """Translate a named period into an inclusive (start, end) date window."""
+    today = date.today()
+    if period == "all":
+        return None, None
+    if period == "today":
+        return today, today
+    if period == "week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "month":
+        return today.replace(day=1), today
+    if period == "custom":
+        start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+        return start, end
+    raise ValueError(f"Invalid period: {period}")
@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from backend.storage.models import (
     UserRole,
     EmployeeDesignation,
@@ -8,6 +8,8 @@ from backend.storage.models import (
     PaymentMethod,
     DamageStatus,
     ReturnReason,
+    MovementReason,
+    StocktakeStatus,
 )
 
 
@@ -54,11 +56,14 @@ class EmployeeRead(BaseModel):
 class StockRead(BaseModel):
     id: int
     item_name: str
+    barcode: str | None = None
     quantity: int
+    reorder_level: int = 0
     cost_price: float
     selling_price: float
     category: StockType
     expiry_date: date | None
+    is_active: bool = True
     created_at: datetime
     updated_at: datetime
 
@@ -67,6 +72,56 @@ class StockRead(BaseModel):
         use_enum_values = True
 
 
+class StockUpdate(BaseModel):
+    """One StockAPI.bulk_update patch; only the fields it sets are written."""
+
+    id: int
+    quantity: int | None = Field(default=None, ge=0)
+    cost_price: float | None = Field(default=None, ge=0)
+    selling_price: float | None = Field(default=None, ge=0)
+
+    class Config:
+        extra = "forbid"
+
+
+class StockLotRead(BaseModel):
+    id: int
+    stock_id: int
+    quantity: int
+    cost_price: float
+    expiry_date: date | None
+    received_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StockMovementRead(BaseModel):
+    id: int
+    stock_id: int
+    ts: datetime
+    change: int
+    balance: int
+    reason: MovementReason
+    ref_id: int | None = None
+
+    class Config:
+        from_attributes = True
+        use_enum_values = True
+
+
+class StocktakeRead(BaseModel):
+    id: int
+    note: str | None = None
+    status: StocktakeStatus
+    started_at: datetime
+    closed_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+        use_enum_values = True
+
+
 # ========================
 # EXPENDITURE
 # ========================
@@ -92,6 +147,8 @@ class SaleItemRead(BaseModel):
     sale_id: int
     stock_id: int
     quantity_sold: int
+    unit_price: float
+    unit_cost: float
 
     class Config:
         from_attributes = True
@@ -106,6 +163,9 @@ class SaleRead(BaseModel):
     change_given: float
     payment_method: PaymentMethod
     cashier_id: int
+    gross_total: float
+    cost_total: float
+    items_count: int
     created_at: datetime
 
     class Config:
@@ -153,8 +213,11 @@ class DashboardKPIRead(BaseModel):
     total_revenue: float
     total_profit: float
     total_transactions: int
+    total_cogs: float = 0.0
+    total_expenditure: float = 0.0
     low_stock_count: int
-    low_stock_items: list[str]
+    return_rate: float = 0.0
+    damage_rate: float = 0.0
 
     class Config:
         from_attributes = True
@@ -163,10 +226,19 @@ class DashboardKPIRead(BaseModel):
 # ========================
 # REPORT
 # ========================
+class ReportGroupRead(BaseModel):
+    group: str
+    total: float = 0.0
+    cost: float = 0.0
+    count: int = 0
+
+
 class ReportRead(BaseModel):
     category: str
     total: float | None = None
     count: int | None = None
+    cost: float | None = None
+    breakdown: list[ReportGroupRead] = []
 
     class Config:
         from_attributes = True
@@ -1,8 +1,18 @@
+import time
 from sqlmodel import create_engine, Session, SQLModel
-from typing import Generator
+from typing import Any, Callable, Generator
 from contextlib import contextmanager
+from functools import wraps
 from pathlib import Path
-from sqlalchemy import inspect, text  # Added text here
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from config import get_settings
+from backend.storage import models  # noqa: F401  (registers tables on the metadata)
+from backend.storage.migrations import (
+    LATEST_VERSION,
+    apply_migrations,
+    get_schema_version,
+)
 
 # ======================
 # Database Configuration
@@ -14,30 +24,46 @@ DATABASE_URL = f"sqlite:///{DB_PATH}"
 engine = create_engine(DATABASE_URL, echo=False)  # echo=True for SQL debug logs
 
 
+@event.listens_for(engine, "connect")
+def _apply_pragmas(dbapi_connection, connection_record) -> None:
+    """Apply the configured SQLite pragma profile to each new connection."""
+    settings = get_settings()
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    # Negative cache_size is expressed in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
 # ======================
 # Initialize Database
 # ======================
 def init_db() -> None:
-    """Initialize the database and create all tables if they don't exist."""
-    SQLModel.metadata.create_all(engine)
-    migrate_db()  # Call migration after creating tables
+    """
+    Initialize the database and bring its schema up to date.
+    Returns after a single version lookup when no migration is pending.
+    """
+    with engine.connect() as conn:
+        if get_schema_version(conn) >= LATEST_VERSION:
+            return
+    migrate_db()
 
 
-# NEW: Migration function to handle schema updates
 def migrate_db() -> None:
-    inspector = inspect(engine)
-    if inspector.has_table("stocks"):
-        columns = [col["name"] for col in inspector.get_columns("stocks")]
-        if "is_active" not in columns:
-            with engine.connect() as conn:
-                conn.execute(
-                    text("ALTER TABLE stocks ADD COLUMN is_active INTEGER DEFAULT 1")
-                )
-
-        # Fix category case for existing records (to match Enum)
-        with engine.connect() as conn:
-            conn.execute(text("UPDATE stocks SET category = LOWER(category)"))
-    # Add similar checks for other tables/columns if needed in the future
+    """Create missing tables and apply pending migrations in one transaction."""
+    with engine.connect() as conn:
+        # IMMEDIATE takes the write lock up front so DDL and data fixes commit
+        # together and two instances starting at once cannot both migrate.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        if get_schema_version(conn) < LATEST_VERSION:
+            SQLModel.metadata.create_all(conn)
+            apply_migrations(conn)
+        conn.commit()
 
 
 # ======================
@@ -58,3 +84,52 @@ def get_session() -> Generator[Session, None, None]:
         except Exception:
             session.rollback()
             raise
+
+
+# ======================
+# Lock Retry
+# ======================
+def _is_locked(message: str) -> bool:
+    return "database is locked" in message or "database is busy" in message
+
+
+def retry_on_locked(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Re-run a unit of work with exponential backoff while SQLite reports a lock.
+    Works for callables that raise OperationalError and for API methods that
+    return {"success": False, "error": "..."} dictionaries.
+
+    Each attempt may already block for busy_timeout, so no retry starts once
+    another attempt could push the call past sqlite_lock_max_wait_ms.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        settings = get_settings()
+        retries = max(0, settings.sqlite_lock_retries)
+        delay = settings.sqlite_lock_backoff_ms / 1000
+        attempt_budget = settings.sqlite_busy_timeout_ms / 1000
+        deadline = time.monotonic() + settings.sqlite_lock_max_wait_ms / 1000
+
+        def can_retry(attempt: int) -> bool:
+            # The next attempt sleeps first, then may block for busy_timeout
+            resume = time.monotonic() + delay * (2**attempt)
+            return attempt < retries and resume + attempt_budget <= deadline
+
+        for attempt in range(retries + 1):
+            try:
+                result = func(*args, **kwargs)
+            except OperationalError as e:
+                if not can_retry(attempt) or not _is_locked(str(e)):
+                    raise
+            else:
+                locked = (
+                    isinstance(result, dict)
+                    and result.get("success") is False
+                    and _is_locked(str(result.get("error", "")))
+                )
+                if not locked or not can_retry(attempt):
+                    return result
+            time.sleep(delay * (2**attempt))
+
+    return wrapper
@@ -0,0 +1,367 @@
+from datetime import datetime
+from typing import Callable
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from config import get_settings
+
+# ======================
+# Migration Helpers
+# ======================
+# Every migration must be idempotent: a fresh database gets its tables from
+# SQLModel.metadata.create_all() and then replays the full list below.
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    if column not in _columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+# ======================
+# Migrations
+# ======================
+def _m001_stock_is_active(conn: Connection) -> None:
+    _add_column(conn, "stocks", "is_active", "INTEGER DEFAULT 1")
+
+
+def _m002_stock_category_case(conn: Connection) -> None:
+    # Enum columns are persisted by member name (RETAIL / WHOLESALE)
+    conn.execute(
+        text(
+            "UPDATE stocks SET category = UPPER(category) "
+            "WHERE category <> UPPER(category)"
+        )
+    )
+
+
+def _m003_hot_path_indexes(conn: Connection) -> None:
+    # (sale_date, id) supersedes the single-column sale_date index
+    conn.execute(text("DROP INDEX IF EXISTS ix_sales_sale_date"))
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_sales_sale_date_id ON sales (sale_date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_sales_cashier_id ON sales (cashier_id)",
+        "CREATE INDEX IF NOT EXISTS ix_sale_items_sale_id ON sale_items (sale_id)",
+        "CREATE INDEX IF NOT EXISTS ix_sale_items_stock_id_sale_id "
+        "ON sale_items (stock_id, sale_id)",
+        "CREATE INDEX IF NOT EXISTS ix_damages_stock_id ON damages (stock_id)",
+        "CREATE INDEX IF NOT EXISTS ix_returns_sale_id ON returns (sale_id)",
+        "CREATE INDEX IF NOT EXISTS ix_returns_stock_id ON returns (stock_id)",
+    ):
+        conn.execute(text(statement))
+
+
+def _m004_sale_snapshots(conn: Connection) -> None:
+    _add_column(conn, "sale_items", "unit_price", "FLOAT NOT NULL DEFAULT 0")
+    _add_column(conn, "sale_items", "unit_cost", "FLOAT NOT NULL DEFAULT 0")
+    _add_column(conn, "sales", "gross_total", "FLOAT NOT NULL DEFAULT 0")
+    _add_column(conn, "sales", "cost_total", "FLOAT NOT NULL DEFAULT 0")
+    _add_column(conn, "sales", "items_count", "INTEGER NOT NULL DEFAULT 0")
+
+    # Best available history: the stock prices as they are today
+    conn.execute(
+        text(
+            "UPDATE sale_items SET "
+            "unit_price = COALESCE((SELECT selling_price FROM stocks "
+            "WHERE stocks.id = sale_items.stock_id), 0), "
+            "unit_cost = COALESCE((SELECT cost_price FROM stocks "
+            "WHERE stocks.id = sale_items.stock_id), 0) "
+            "WHERE unit_price = 0 AND unit_cost = 0"
+        )
+    )
+    conn.execute(
+        text(
+            "UPDATE sales SET "
+            "gross_total = COALESCE((SELECT SUM(unit_price * quantity_sold) "
+            "FROM sale_items WHERE sale_items.sale_id = sales.id), 0), "
+            "cost_total = COALESCE((SELECT SUM(unit_cost * quantity_sold) "
+            "FROM sale_items WHERE sale_items.sale_id = sales.id), 0), "
+            "items_count = COALESCE((SELECT SUM(quantity_sold) "
+            "FROM sale_items WHERE sale_items.sale_id = sales.id), 0)"
+        )
+    )
+
+
+def _m005_sales_daily(conn: Connection) -> None:
+    rebuild_sales_daily(conn)
+
+
+def _m006_stock_change_feed(conn: Connection) -> None:
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_stocks_updated_at ON stocks (updated_at)")
+    )
+    # Local time with microseconds, matching how SQLAlchemy stores datetimes
+    conn.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS trg_stocks_tombstone "
+            "AFTER DELETE ON stocks BEGIN "
+            "INSERT INTO stock_tombstones (stock_id, deleted_at) VALUES ("
+            "OLD.id, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') || '000'); "
+            "END"
+        )
+    )
+
+
+def _m007_stock_name_search(conn: Connection) -> None:
+    # External-content FTS5 index over stocks.item_name; the trigram tokenizer
+    # makes any 3+ character substring searchable. Builds of SQLite without
+    # FTS5/trigram skip it and StockAPI.search falls back to LIKE.
+    try:
+        with conn.begin_nested():
+            conn.execute(
+                text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS stocks_fts USING fts5("
+                    "item_name, content='stocks', content_rowid='id', "
+                    "tokenize='trigram')"
+                )
+            )
+    except OperationalError:
+        return
+    for statement in (
+        "CREATE TRIGGER IF NOT EXISTS trg_stocks_fts_ai AFTER INSERT ON stocks "
+        "BEGIN INSERT INTO stocks_fts (rowid, item_name) "
+        "VALUES (NEW.id, NEW.item_name); END",
+        "CREATE TRIGGER IF NOT EXISTS trg_stocks_fts_ad AFTER DELETE ON stocks "
+        "BEGIN INSERT INTO stocks_fts (stocks_fts, rowid, item_name) "
+        "VALUES ('delete', OLD.id, OLD.item_name); END",
+        "CREATE TRIGGER IF NOT EXISTS trg_stocks_fts_au "
+        "AFTER UPDATE OF item_name ON stocks "
+        "BEGIN INSERT INTO stocks_fts (stocks_fts, rowid, item_name) "
+        "VALUES ('delete', OLD.id, OLD.item_name); "
+        "INSERT INTO stocks_fts (rowid, item_name) "
+        "VALUES (NEW.id, NEW.item_name); END",
+        "INSERT INTO stocks_fts (stocks_fts) VALUES ('rebuild')",
+    ):
+        conn.execute(text(statement))
+
+
+def _m008_stock_barcode(conn: Connection) -> None:
+    _add_column(conn, "stocks", "barcode", "VARCHAR")
+    # NULLs don't collide, so items without a code are unaffected
+    conn.execute(
+        text("CREATE UNIQUE INDEX IF NOT EXISTS ix_stocks_barcode ON stocks (barcode)")
+    )
+
+
+def _m009_stock_reorder_level(conn: Connection) -> None:
+    default = int(get_settings().default_min_quantity_alert)
+    _add_column(
+        conn, "stocks", "reorder_level", f"INTEGER NOT NULL DEFAULT {default}"
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_stocks_low_stock ON stocks (id) "
+            "WHERE is_active = 1 AND quantity <= reorder_level"
+        )
+    )
+
+
+def _m010_stock_lots(conn: Connection) -> None:
+    # stock_lots itself comes from create_all(); give every item that already
+    # holds units an opening lot carrying its current cost and expiry
+    conn.execute(
+        text(
+            "INSERT INTO stock_lots (stock_id, quantity, cost_price, expiry_date, "
+            "received_at) "
+            "SELECT id, quantity, cost_price, expiry_date, created_at FROM stocks "
+            "WHERE quantity > 0 "
+            "AND id NOT IN (SELECT stock_id FROM stock_lots)"
+        )
+    )
+
+
+def _m011_stock_movements(conn: Connection) -> None:
+    # stock_movements comes from create_all(); open the ledger with each
+    # item's current quantity so balances as of today onwards are exact
+    conn.execute(
+        text(
+            "INSERT INTO stock_movements (stock_id, ts, change, balance, reason) "
+            "SELECT id, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') || '000', "
+            "quantity, quantity, 'OPENING' FROM stocks "
+            "WHERE quantity <> 0 "
+            "AND id NOT IN (SELECT stock_id FROM stock_movements)"
+        )
+    )
+
+
+def _m013_reconcile_stock_lots(conn: Connection) -> None:
+    # Voids, returns and manual edits used to change stocks.quantity without
+    # touching lots. Open a lot for any units no lot covers and drain lots
+    # holding more than the item has, earliest expiry first
+    conn.execute(
+        text(
+            "INSERT INTO stock_lots (stock_id, quantity, cost_price, expiry_date, "
+            "received_at) "
+            "SELECT s.id, s.quantity - COALESCE(SUM(l.quantity), 0), s.cost_price, "
+            "s.expiry_date, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') "
+            "|| '000' "
+            "FROM stocks s LEFT JOIN stock_lots l "
+            "ON l.stock_id = s.id AND l.quantity > 0 "
+            "GROUP BY s.id HAVING s.quantity > COALESCE(SUM(l.quantity), 0)"
+        )
+    )
+    excess = conn.execute(
+        text(
+            "SELECT s.id, SUM(l.quantity) - MAX(s.quantity, 0) "
+            "FROM stocks s JOIN stock_lots l ON l.stock_id = s.id "
+            "WHERE l.quantity > 0 "
+            "GROUP BY s.id HAVING SUM(l.quantity) > MAX(s.quantity, 0)"
+        )
+    ).all()
+    for stock_id, remaining in excess:
+        lots = conn.execute(
+            text(
+                "SELECT id, quantity FROM stock_lots "
+                "WHERE stock_id = :stock_id AND quantity > 0 "
+                "ORDER BY expiry_date IS NULL, expiry_date, id"
+            ),
+            {"stock_id": stock_id},
+        ).all()
+        for lot_id, quantity in lots:
+            if remaining <= 0:
+                break
+            taken = min(quantity, remaining)
+            conn.execute(
+                text(
+                    "UPDATE stock_lots SET quantity = quantity - :taken WHERE id = :id"
+                ),
+                {"taken": taken, "id": lot_id},
+            )
+            remaining -= taken
+
+
+
+def _m014_damage_snapshots(conn: Connection) -> None:
+    _add_column(conn, "damages", "unit_price", "FLOAT NOT NULL DEFAULT 0")
+    _add_column(conn, "damages", "unit_cost", "FLOAT NOT NULL DEFAULT 0")
+
+    # Best available history: the stock prices as they are today
+    conn.execute(
+        text(
+            "UPDATE damages SET "
+            "unit_price = COALESCE((SELECT selling_price FROM stocks "
+            "WHERE stocks.id = damages.stock_id), 0), "
+            "unit_cost = COALESCE((SELECT cost_price FROM stocks "
+            "WHERE stocks.id = damages.stock_id), 0) "
+            "WHERE unit_price = 0 AND unit_cost = 0"
+        )
+    )
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "add stocks.is_active", _m001_stock_is_active),
+    (2, "normalize stocks.category case", _m002_stock_category_case),
+    (3, "add foreign-key and hot-path indexes", _m003_hot_path_indexes),
+    (4, "snapshot sale prices and totals", _m004_sale_snapshots),
+    (5, "populate sales_daily rollup", _m005_sales_daily),
+    (6, "stock change feed index and tombstones", _m006_stock_change_feed),
+    (7, "stock name search index", _m007_stock_name_search),
+    (8, "add unique stocks.barcode", _m008_stock_barcode),
+    (9, "per-item reorder level and low-stock index", _m009_stock_reorder_level),
+    (10, "opening stock lots", _m010_stock_lots),
+    (11, "opening stock movements", _m011_stock_movements),
+    # 12 ("stocktake sessions") was a no-op: the stocktake tables come from
+    # create_all(). It is retired, and version numbers are never reused.
+    (13, "reconcile stock lots with quantities", _m013_reconcile_stock_lots),
+    (14, "snapshot damage prices", _m014_damage_snapshots),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ======================
+# Rollups
+# ======================
+def rebuild_sales_daily(conn: Connection) -> int:
+    """Regenerate the sales_daily rollup from raw sales and returns."""
+    conn.execute(text("DELETE FROM sales_daily"))
+    result = conn.execute(
+        text(
+            """
+            INSERT INTO sales_daily (
+                day, payment_method, cashier_id, transactions, gross_total,
+                discount_total, cost_total, items_sold, returns_total,
+                returns_cost, items_returned
+            )
+            SELECT day, payment_method, cashier_id, SUM(transactions),
+                   SUM(gross_total), SUM(discount_total), SUM(cost_total),
+                   SUM(items_sold), SUM(returns_total), SUM(returns_cost),
+                   SUM(items_returned)
+            FROM (
+                SELECT sale_date AS day, payment_method, cashier_id,
+                       COUNT(*) AS transactions,
+                       SUM(gross_total) AS gross_total,
+                       SUM(discount_amount) AS discount_total,
+                       SUM(cost_total) AS cost_total,
+                       SUM(items_count) AS items_sold,
+                       0 AS returns_total, 0 AS returns_cost, 0 AS items_returned
+                FROM sales
+                GROUP BY sale_date, payment_method, cashier_id
+                UNION ALL
+                SELECT r.return_date, s.payment_method, s.cashier_id,
+                       0, 0, 0, 0, 0,
+                       SUM(r.quantity * si.unit_price),
+                       SUM(r.quantity * si.unit_cost),
+                       SUM(r.quantity)
+                FROM returns r
+                JOIN sales s ON s.id = r.sale_id
+                JOIN sale_items si ON si.id = (
+                    SELECT id FROM sale_items
+                    WHERE stock_id = r.stock_id AND sale_id = r.sale_id
+                    LIMIT 1
+                )
+                GROUP BY r.return_date, s.payment_method, s.cashier_id
+            )
+            GROUP BY day, payment_method, cashier_id
+            """
+        )
+    )
+    return result.rowcount
+
+
+# ======================
+# Version Tracking
+# ======================
+def get_schema_version(conn: Connection) -> int:
+    """Return the applied schema version (0 for an unversioned database)."""
+    has_table = conn.execute(
+        text(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'schema_version'"
+        )
+    ).first()
+    if not has_table:
+        return 0
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def apply_migrations(conn: Connection) -> int:
+    """Apply every migration newer than the recorded version on `conn`."""
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER NOT NULL PRIMARY KEY, "
+            "description VARCHAR NOT NULL, "
+            "applied_at DATETIME NOT NULL)"
+        )
+    )
+    current = get_schema_version(conn)
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        migrate(conn)
+        conn.execute(
+            text(
+                "INSERT INTO schema_version (version, description, applied_at) "
+                "VALUES (:version, :description, :applied_at)"
+            ),
+            {
+                "version": version,
+                "description": description,
+                "applied_at": datetime.now(),
+            },
+        )
+    return LATEST_VERSION
@@ -1,7 +1,8 @@
 from datetime import datetime, date
 from sqlmodel import SQLModel, Field, Relationship
 from enum import Enum
-from sqlalchemy import Column, TEXT
+from sqlalchemy import Column, Index, TEXT, UniqueConstraint, text
+from config import get_settings
 
 
 class UserRole(str, Enum):
@@ -47,6 +48,25 @@ class ReturnReason(str, Enum):
     MIND_CHANGE = "mind_change"
 
 
+class MovementReason(str, Enum):
+    OPENING = "opening"
+    RECEIPT = "receipt"
+    SALE = "sale"
+    SALE_VOID = "sale_void"
+    RETURN = "return"
+    DAMAGE = "damage"
+    DAMAGE_VOID = "damage_void"
+    ADJUSTMENT = "adjustment"
+    IMPORT = "import"
+    STOCKTAKE = "stocktake"
+
+
+class StocktakeStatus(str, Enum):
+    OPEN = "open"
+    APPROVED = "approved"
+    CANCELLED = "cancelled"
+
+
 class Account(SQLModel, table=True):
     __tablename__ = "accounts"
 
@@ -77,19 +97,33 @@ class Employee(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.now)
 
 
+def _default_reorder_level() -> int:
+    return get_settings().default_min_quantity_alert
+
+
 class Stock(SQLModel, table=True):
     __tablename__ = "stocks"
+    # Low-stock alerts scan only the rows at or below their reorder level
+    __table_args__ = (
+        Index(
+            "ix_stocks_low_stock",
+            "id",
+            sqlite_where=text("is_active = 1 AND quantity <= reorder_level"),
+        ),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     item_name: str = Field(index=True)
+    barcode: str | None = Field(default=None, unique=True, index=True)
     quantity: int = Field(ge=0)
+    reorder_level: int = Field(default_factory=_default_reorder_level, ge=0)
     cost_price: float = Field(ge=0)
     selling_price: float = Field(ge=0)
     category: StockType = Field(default=StockType.RETAIL)
     expiry_date: date | None = None
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now, index=True)
 
     sale_items: list["SaleItem"] = Relationship(
         back_populates="stock"
@@ -118,17 +152,92 @@ class Stock(SQLModel, table=True):
         return self.quantity * self.profit_per_unit
 
 
+class StockLot(SQLModel, table=True):
+    """One delivery of a stock item; sales deplete lots first-expiry-first-out."""
+
+    __tablename__ = "stock_lots"
+    __table_args__ = (
+        # FEFO order within an item
+        Index("ix_stock_lots_stock_id_expiry", "stock_id", "expiry_date"),
+        # Expiry sweeps only look at lots that still hold units
+        Index(
+            "ix_stock_lots_open_expiry",
+            "expiry_date",
+            "id",
+            sqlite_where=text("quantity > 0"),
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    stock_id: int = Field(foreign_key="stocks.id")
+    quantity: int = Field(ge=0)
+    cost_price: float = Field(ge=0)
+    expiry_date: date | None = None
+    received_at: datetime = Field(default_factory=datetime.now)
+
+
+class StockMovement(SQLModel, table=True):
+    """
+    Append-only ledger of stock quantity changes, written in the same
+    transaction as the change; `balance` is the item's quantity afterwards.
+    """
+
+    __tablename__ = "stock_movements"
+    __table_args__ = (Index("ix_stock_movements_stock_id_ts", "stock_id", "ts"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    stock_id: int = Field(foreign_key="stocks.id")
+    ts: datetime = Field(default_factory=datetime.now, index=True)
+    change: int
+    balance: int
+    reason: MovementReason
+    ref_id: int | None = None  # sale, damage, return or lot id, by reason
+
+
+class Stocktake(SQLModel, table=True):
+    """A physical inventory count; its lines are staged until approval."""
+
+    __tablename__ = "stocktakes"
+
+    id: int | None = Field(default=None, primary_key=True)
+    note: str | None = None
+    status: StocktakeStatus = Field(default=StocktakeStatus.OPEN, index=True)
+    started_at: datetime = Field(default_factory=datetime.now)
+    closed_at: datetime | None = None
+
+
+class StocktakeLine(SQLModel, table=True):
+    __tablename__ = "stocktake_lines"
+    # One line per item per session; also the join key for variance
+    __table_args__ = (
+        UniqueConstraint(
+            "stocktake_id", "stock_id", name="uq_stocktake_lines_stocktake_stock"
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    stocktake_id: int = Field(foreign_key="stocktakes.id")
+    stock_id: int = Field(foreign_key="stocks.id", index=True)
+    counted: int = Field(ge=0)
+    counted_at: datetime = Field(default_factory=datetime.now)
+
+
 class Sale(SQLModel, table=True):
     __tablename__ = "sales"
+    __table_args__ = (Index("ix_sales_sale_date_id", "sale_date", "id"),)
 
     id: int | None = Field(default=None, primary_key=True)
-    sale_date: date = Field(default_factory=date.today, index=True)
+    sale_date: date = Field(default_factory=date.today)
     sale_time: datetime = Field(default_factory=datetime.now)
     discount_amount: float = Field(ge=0, default=0)
     amount_paid: float = Field(ge=0)
     change_given: float = Field(ge=0, default=0)
     payment_method: PaymentMethod = Field(default=PaymentMethod.CASH)
-    cashier_id: int = Field(foreign_key="accounts.id")
+    cashier_id: int = Field(foreign_key="accounts.id", index=True)
+    # Totals snapshotted at checkout so reports never join current stock prices
+    gross_total: float = Field(ge=0, default=0)
+    cost_total: float = Field(ge=0, default=0)
+    items_count: int = Field(ge=0, default=0)
     created_at: datetime = Field(default_factory=datetime.now)
 
     cashier: Account = Relationship(back_populates="sales")
@@ -136,6 +245,40 @@ class Sale(SQLModel, table=True):
     returned_items: list["Return"] = Relationship(back_populates="sale")
 
 
+class StockTombstone(SQLModel, table=True):
+    """Hard-deleted stock ids, written by a trigger for the change feed."""
+
+    __tablename__ = "stock_tombstones"
+
+    id: int | None = Field(default=None, primary_key=True)
+    stock_id: int
+    deleted_at: datetime = Field(default_factory=datetime.now, index=True)
+
+
+class SalesDaily(SQLModel, table=True):
+    """Per-day sales rollup, maintained in the same transaction as each sale."""
+
+    __tablename__ = "sales_daily"
+    __table_args__ = (
+        UniqueConstraint(
+            "day", "payment_method", "cashier_id", name="uq_sales_daily_key"
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    day: date
+    payment_method: PaymentMethod = Field(default=PaymentMethod.CASH)
+    cashier_id: int
+    transactions: int = 0
+    gross_total: float = 0.0
+    discount_total: float = 0.0
+    cost_total: float = 0.0
+    items_sold: int = 0
+    returns_total: float = 0.0
+    returns_cost: float = 0.0
+    items_returned: int = 0
+
+
 class Expenditure(SQLModel, table=True):
     __tablename__ = "expenditures"
 
@@ -158,11 +301,15 @@ class ExpenditureTotal(SQLModel, table=True):
 
 class SaleItem(SQLModel, table=True):
     __tablename__ = "sale_items"
+    # (stock_id, sale_id) also serves every lookup by stock_id alone
+    __table_args__ = (Index("ix_sale_items_stock_id_sale_id", "stock_id", "sale_id"),)
 
     id: int | None = Field(default=None, primary_key=True)
-    sale_id: int = Field(foreign_key="sales.id")
+    sale_id: int = Field(foreign_key="sales.id", index=True)
     stock_id: int = Field(foreign_key="stocks.id")
     quantity_sold: int = Field(ge=1)
+    unit_price: float = Field(ge=0, default=0)
+    unit_cost: float = Field(ge=0, default=0)
 
     sale: Sale = Relationship(back_populates="sale_items")
     stock: Stock = Relationship(back_populates="sale_items")
@@ -172,8 +319,11 @@ class Damage(SQLModel, table=True):
     __tablename__ = "damages"
 
     id: int | None = Field(default=None, primary_key=True)
-    stock_id: int = Field(foreign_key="stocks.id")
+    stock_id: int = Field(foreign_key="stocks.id", index=True)
     quantity_damaged: int = Field(ge=1)
+    # Prices snapshotted when the damage is recorded, as on sale lines
+    unit_price: float = Field(ge=0, default=0)
+    unit_cost: float = Field(ge=0, default=0)
     damage_status: DamageStatus = Field(default=DamageStatus.BROKEN)
     damage_date: date = Field(default_factory=date.today, index=True)
     created_at: datetime = Field(default_factory=datetime.now)
@@ -185,8 +335,8 @@ class Return(SQLModel, table=True):
     __tablename__ = "returns"
 
     id: int | None = Field(default=None, primary_key=True)
-    sale_id: int = Field(foreign_key="sales.id")
-    stock_id: int = Field(foreign_key="stocks.id")
+    sale_id: int = Field(foreign_key="sales.id", index=True)
+    stock_id: int = Field(foreign_key="stocks.id", index=True)
     quantity: int = Field(ge=1)
     reason: ReturnReason = Field(default=ReturnReason.DEFECTIVE)
     return_date: date = Field(default_factory=date.today, index=True)
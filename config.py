@@ -11,6 +11,20 @@ class Settings:
     default_min_quantity_alert: int = int(os.getenv("DEFAULT_MIN_QUANTITY_ALERT", 5))
     default_category: str = os.getenv("DEFAULT_CATEGORY", "general")
     date_format: str = "%Y-%m-%d %H:%M:%S"
+    # Dashboard KPI/chart refresh interval; 0 turns periodic refresh off
+    dashboard_refresh_seconds: int = int(os.getenv("DASHBOARD_REFRESH_SECONDS", 60))
+
+    # SQLite connection profile (applied to every new connection)
+    sqlite_journal_mode: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    sqlite_cache_size_kb: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", 20000))
+    sqlite_mmap_size: int = int(os.getenv("SQLITE_MMAP_SIZE", 268435456))
+    sqlite_lock_retries: int = int(os.getenv("SQLITE_LOCK_RETRIES", 2))
+    sqlite_lock_backoff_ms: int = int(os.getenv("SQLITE_LOCK_BACKOFF_MS", 50))
+    # Cap on the total time retry_on_locked spends on one call, busy_timeout
+    # waits included; writes run on the GUI thread
+    sqlite_lock_max_wait_ms: int = int(os.getenv("SQLITE_LOCK_MAX_WAIT_MS", 8000))
 
 
 @lru_cache
@@ -3,8 +3,8 @@ from typing import Optional
 from PySide6 import QtCore, QtWidgets
 from PySide6.QtWidgets import QMessageBox, QPushButton
 from PySide6.QtGui import QIntValidator, QIcon
-from backend.apis import StockAPI, DamageAPI
-from controllers.stockController import stock_events
+from backend.apis import DamageAPI
+from controllers.stock_catalog import stock_catalog, stock_events
 
 DELETE_ICON_PATH = os.path.join("assets", "icons", "delete.png")
 
@@ -59,14 +59,14 @@ class DamageController:
 
     # ---------------- Stock items ----------------
     def load_stock_items(self):
-        resp = StockAPI.get_all()
+        resp = stock_catalog.load()
         if not resp.get("success"):
             QMessageBox.warning(
                 self.page, "Error", resp.get("error", "Failed to load stock")
             )
             return
 
-        self._stock_items = [s for s in resp["items"] if s.get("is_active", True)]
+        self._stock_items = stock_catalog.items()
         names = [s["item_name"] for s in self._stock_items]
 
         self._completer = QtWidgets.QCompleter(names, self.ui.damage_item_name)
@@ -74,11 +74,12 @@ class DamageController:
         self._completer.setFilterMode(QtCore.Qt.MatchContains)
         self.ui.damage_item_name.setCompleter(self._completer)
 
+    def refresh_table(self):
+        # Called when the page is revisited; redraws only if stock changed
+        stock_catalog.sync()
+
     def find_stock_by_name(self, name: str):
-        return next(
-            (s for s in self._stock_items if s["item_name"].lower() == name.lower()),
-            None,
-        )
+        return stock_catalog.find_by_name(name)
 
     # ---------------- Damage table ----------------
     def load_damage_table(self):
@@ -244,7 +245,7 @@ class DamageController:
 
         # refresh UI and auto-clear back to Add mode
         self.load_damage_table()
-        stock_events.stock_changed.emit()
+        stock_events.notify([stock["id"]])
         self.clear_inputs()
 
     # ---------------- Delete ----------------
@@ -295,7 +296,7 @@ class DamageController:
             return
         QMessageBox.information(self.page, "Deleted", resp.get("message", "Deleted"))
         self.load_damage_table()
-        stock_events.stock_changed.emit()
+        stock_events.notify([resp.get("stock_id")] if resp.get("stock_id") else None)
 
     # ---------------- Double-click to edit ----------------
     def table_row_double_clicked(self, row: int, column: int):
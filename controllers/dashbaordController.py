@@ -1,34 +1,122 @@
-from PySide6.QtWidgets import QMessageBox
-from backend.apis import DashboardAPI
+import logging
+from PySide6 import QtCore
+from backend.apis import DashboardAPI, StockAPI
+from config import get_settings
+from controllers.stock_catalog import stock_events
+from controllers.workers import Worker, start_worker
+
+logger = logging.getLogger("DashboardController")
 
 
 class DashboardController:
-    def __init__(self, ui):
+    ALERT_PAGE_SIZE = 50
+    EXPIRY_WINDOW_DAYS = 30
+    TREND_DAYS = 7
+    TOP_ITEMS_DAYS = 30
+    TOP_ITEMS_COUNT = 5
+    DEBOUNCE_MS = 500
+
+    def __init__(self, ui, page):
         self.ui = ui
-        self.load_kpis()
+        self.page = page
+        self.ui.fetch_alerts = lambda after: DashboardAPI.get_low_stock_alerts(
+            after, self.ALERT_PAGE_SIZE
+        )
+        self.refresh_worker = None
+        self.refresh_thread = None
+        self.refresh_pending = False
+
+        # A checkout burst fires stock_changed per sale; refresh once it settles
+        self.debounce_timer = QtCore.QTimer(page)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.refresh)
+        stock_events.stock_changed.connect(lambda: self.debounce_timer.start())
+
+        # Periodic refresh picks up writes made outside this window
+        self.interval_timer = QtCore.QTimer(page)
+        seconds = get_settings().dashboard_refresh_seconds
+        if seconds > 0:
+            self.interval_timer.setInterval(seconds * 1000)
+            self.interval_timer.timeout.connect(self.refresh)
+            self.interval_timer.start()
+
+        self.refresh()
+
+    def refresh_table(self):
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reload KPIs and charts on a worker thread. The labels keep their last
+        values until the new ones arrive; a request made while a refresh is
+        running is folded into one follow-up refresh.
+        """
+        if self.refresh_worker is not None:
+            self.refresh_pending = True
+            return
+        self.refresh_pending = False
+
+        self.refresh_worker = Worker(self.fetch_dashboard)
+        self.refresh_worker.finished.connect(self.on_refreshed)
+        self.refresh_worker.failed.connect(
+            lambda error: self.on_refreshed({"error": error})
+        )
+        self.refresh_thread = start_worker(self.refresh_worker, self.page)
 
-        # Connect refresh button
-        self.ui.btnRefreshDashboard.clicked.connect(self.load_kpis)
+    def fetch_dashboard(self, task):
+        """Runs on the worker thread; only reads, so sales never wait on it."""
+        return {
+            "kpis": DashboardAPI.get_kpis(),
+            "expiring": StockAPI.get_expiring(self.EXPIRY_WINDOW_DAYS, limit=1),
+            "series": DashboardAPI.get_sales_series(self.TREND_DAYS),
+            "top": DashboardAPI.get_top_items(
+                self.TOP_ITEMS_DAYS, self.TOP_ITEMS_COUNT
+            ),
+        }
 
-    def load_kpis(self):
-        """Load dashboard KPIs and display them."""
-        resp = DashboardAPI.get_kpis()
+    def on_refreshed(self, result):
+        self.refresh_worker = None
+        self.refresh_thread = None
+
+        if "error" in result:
+            logger.error("Dashboard refresh failed: %s", result["error"])
+        else:
+            self.show_kpis(result["kpis"], result["expiring"])
+            self.show_charts(result["series"], result["top"])
+
+        if self.refresh_pending:
+            self.refresh()
+
+    def show_kpis(self, resp, expiring):
         if not resp.get("success"):
-            QMessageBox.warning(
-                self.ui, "Error", resp.get("error", "Failed to load dashboard data")
-            )
+            logger.error("Failed to load dashboard KPIs: %s", resp.get("error"))
             return
 
         kpis = resp["kpis"]
 
         # Update UI labels with KPI values
-        self.ui.lblRevenue.setText(f"{kpis['total_revenue']:.2f}")
-        self.ui.lblProfit.setText(f"{kpis['total_profit']:.2f}")
-        self.ui.lblTransactions.setText(str(kpis["total_transactions"]))
+        self.ui.lblTotalSales.setText(f"GHS {kpis['total_revenue']:,.2f}")
+        self.ui.lblTotalProfit.setText(f"GHS {kpis['total_profit']:,.2f}")
+        self.ui.lblReturnRate.setText(f"{kpis['return_rate']:.1f}%")
+        self.ui.lblDamageRate.setText(f"{kpis['damage_rate']:.1f}%")
         self.ui.lblLowStock.setText(str(kpis["low_stock_count"]))
 
-        # Show list of low stock items
-        low_items = (
-            ", ".join(kpis["low_stock_items"]) if kpis["low_stock_items"] else "None"
-        )
-        self.ui.lblLowStockItems.setText(low_items)
+        # The bell lists the items themselves, a page at a time
+        self.ui.set_alert_count(kpis["low_stock_count"])
+
+        if expiring.get("success"):
+            self.ui.lblExpiringSoon.setText(str(expiring["total"]))
+
+    def show_charts(self, series, top):
+        if series.get("success"):
+            self.ui.set_sales_trend(
+                [point["day"].strftime("%a") for point in series["series"]],
+                [point["revenue"] for point in series["series"]],
+            )
+
+        if top.get("success"):
+            self.ui.set_top_items(
+                [item["item_name"] for item in top["items"]],
+                [item["quantity"] for item in top["items"]],
+            )
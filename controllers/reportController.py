@@ -0,0 +1,109 @@
+import logging
+from PySide6 import QtCore, QtGui
+from PySide6.QtWidgets import QMessageBox
+from PySide6.QtPdf import QPdfDocument
+from PySide6.QtPdfWidgets import QPdfView
+from PySide6.QtPrintSupport import QPrinter, QPrintDialog
+from backend.apis import ReportAPI
+
+logger = logging.getLogger("ReportController")
+
+
+class ReportController:
+    def __init__(self, ui, page):
+        """
+        ui: the Ui_Report object; page: the QWidget used as dialog parent.
+        One generate_report call feeds both the LCDs and the PDF preview.
+        """
+        self.ui = ui
+        self.page = page
+        self.pdf_buffer = None
+        self.pdf_document = QPdfDocument(page)
+        self.ui.pdf_viewer.setDocument(self.pdf_document)
+        self.ui.pdf_viewer.setPageMode(QPdfView.PageMode.MultiPage)
+
+        self.ui.btn_generate_report.clicked.connect(self.generate_report)
+        self.ui.btn_clear_report.clicked.connect(self.clear_report)
+        self.ui.btn_print_report.clicked.connect(self.print_report)
+
+        self.clear_report()
+
+    # ------------------ GENERATE ------------------
+    def generate_report(self):
+        start = self.ui.report_date_from.date()
+        end = self.ui.report_date_to.date()
+        if start > end:
+            QMessageBox.warning(self.page, "Report", "'From' must not be after 'To'")
+            return
+
+        result = ReportAPI.generate_report(
+            start.toString("yyyy-MM-dd"),
+            end.toString("yyyy-MM-dd"),
+            self.ui.report_category.currentText().lower(),
+        )
+        if not result.get("success"):
+            logger.error("Report failed: %s", result.get("error"))
+            QMessageBox.warning(
+                self.page, "Error", result.get("error", "Failed to generate report")
+            )
+            return
+
+        self.show_totals(result["report"])
+        self.show_pdf(
+            ReportAPI.render_report_pdf(
+                result["report"], start.toPython(), end.toPython()
+            )
+        )
+
+    def show_totals(self, report):
+        """Fill the LCDs from the categories present; others show a dash."""
+        entries = {entry["category"]: entry for entry in report}
+        sales = entries.get("sales")
+        expenditures = entries.get("expenditures")
+
+        self.ui.lcd_revenue.display(f"{sales['total']:.2f}" if sales else "-")
+        self.ui.lcd_expenditures.display(
+            f"{expenditures['total']:.2f}" if expenditures else "-"
+        )
+        if sales and expenditures:
+            profit = sales["total"] - sales["cost"] - expenditures["total"]
+            self.ui.lcd_profit.display(f"{profit:.2f}")
+        else:
+            self.ui.lcd_profit.display("-")
+
+    def show_pdf(self, pdf_bytes):
+        # QPdfDocument reads from the device lazily, so the buffer must outlive it
+        self.pdf_document.close()
+        self.pdf_buffer = QtCore.QBuffer(self.page)
+        self.pdf_buffer.setData(QtCore.QByteArray(pdf_bytes))
+        self.pdf_buffer.open(QtCore.QIODevice.ReadOnly)
+        self.pdf_document.load(self.pdf_buffer)
+
+    # ------------------ CLEAR / PRINT ------------------
+    def clear_report(self):
+        self.pdf_document.close()
+        self.pdf_buffer = None
+        for lcd in [
+            self.ui.lcd_revenue,
+            self.ui.lcd_expenditures,
+            self.ui.lcd_profit,
+        ]:
+            lcd.display(0)
+
+    def print_report(self):
+        if self.pdf_document.pageCount() == 0:
+            QMessageBox.information(self.page, "Report", "Generate a report first")
+            return
+
+        printer = QPrinter(QPrinter.HighResolution)
+        if QPrintDialog(printer, self.page).exec() != QPrintDialog.Accepted:
+            return
+
+        painter = QtGui.QPainter(printer)
+        target = painter.viewport()
+        for index in range(self.pdf_document.pageCount()):
+            if index:
+                printer.newPage()
+            image = self.pdf_document.render(index, target.size())
+            painter.drawImage(target, image)
+        painter.end()
@@ -1,6 +1,7 @@
 from PySide6 import QtWidgets
 from PySide6.QtWidgets import QMessageBox
 from backend.apis import ReturnAPI
+from controllers.stock_catalog import stock_events
 
 
 class ReturnController:
@@ -59,5 +60,6 @@ class ReturnController:
             )
             return
 
+        stock_events.notify([stock_id])
         QMessageBox.information(self.ui, "Success", "Return processed successfully")
         self.load_returns()
@@ -6,8 +6,8 @@ from PySide6.QtGui import QDoubleValidator
 from PySide6.QtWidgets import QMessageBox, QPushButton, QInputDialog
 from backend.apis import StockAPI, SaleAPI
 
-# Import the global stock_events from stockController to listen for changes
-from controllers.stockController import stock_events
+# Shared stock cache and the global stock_events used to keep it current
+from controllers.stock_catalog import stock_catalog, stock_events
 from controllers.sales_history_controller import HistoryController
 
 
@@ -28,8 +28,17 @@ class SalesController:
         # Load stock items into the left item table
         self.load_items()
 
+        # Search once typing pauses instead of on every keystroke
+        self.search_timer = QtCore.QTimer(page)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(
+            lambda: self.filter_items(self.ui.inputSearchItem.text())
+        )
+
         # Live connections
-        self.ui.inputSearchItem.textChanged.connect(self.filter_items)
+        self.ui.inputSearchItem.textChanged.connect(self.search_timer.start)
+        self.ui.inputScanCode.returnPressed.connect(self.scan_to_cart)
         self.ui.inputDiscount.textChanged.connect(self.update_lcds)
         self.ui.inputAmountPaid.textChanged.connect(self.update_lcds)
 
@@ -76,15 +85,15 @@ class SalesController:
 
     # ------------------ Load Stock Items ------------------
     def load_items(self):
-        resp = StockAPI.get_all()
+        resp = stock_catalog.load()
         if not resp.get("success"):
             QMessageBox.warning(
                 self.page, "Error", resp.get("error", "Failed to load stock")
             )
             return
 
-        self.items = [i for i in resp["items"] if i.get("is_active", True)]
-        self.display_items(self.items)
+        self.items = stock_catalog.items()
+        self.filter_items(self.ui.inputSearchItem.text())
 
         try:
             try:
@@ -101,26 +110,39 @@ class SalesController:
                 lambda it: self.display_item_details(it.row(), 0)
             )
 
+    def refresh_table(self):
+        # Called when the page is revisited; redraws only if stock changed
+        stock_catalog.sync()
+
     def display_items(self, items):
         self.ui.tableItemList.setRowCount(0)
         for row, item in enumerate(items):
             self.ui.tableItemList.insertRow(row)
-            self.ui.tableItemList.setItem(
-                row, 0, QtWidgets.QTableWidgetItem(item["item_name"])
-            )
+            cell = QtWidgets.QTableWidgetItem(item["item_name"])
+            cell.setData(QtCore.Qt.UserRole, item["id"])
+            self.ui.tableItemList.setItem(row, 0, cell)
 
     def filter_items(self, text):
-        filtered = [i for i in self.items if text.lower() in i["item_name"].lower()]
-        self.display_items(filtered)
+        if not text.strip():
+            self.display_items(self.items)
+            return
+        resp = StockAPI.search(text, limit=200)
+        if resp.get("success"):
+            self.display_items(resp["items"])
+
+    def selected_item(self, row):
+        """
+        Catalog entry behind a row of the item list (rows carry the stock id).
+        Search hits may not be cached yet (e.g. added on another terminal), so
+        a miss is read from the database.
+        """
+        cell = self.ui.tableItemList.item(row, 0) if row >= 0 else None
+        if not cell:
+            return None
+        return stock_catalog.fetch(cell.data(QtCore.Qt.UserRole))
 
     def display_item_details(self, row, column):
-        if row < 0:
-            return
-        name_item = self.ui.tableItemList.item(row, 0)
-        if not name_item:
-            return
-        name = name_item.text()
-        item = next((i for i in self.items if i["item_name"] == name), None)
+        item = self.selected_item(row)
         if item:
             self.ui.inputQtyInStock.setText(str(item["quantity"]))
             self.ui.inputStockPrice.setText(str(item["selling_price"]))
@@ -135,17 +157,11 @@ class SalesController:
     # ------------------ Add to Cart ------------------
     def add_to_cart(self):
         row = self.ui.tableItemList.currentRow()
-        if row < 0:
-            QMessageBox.warning(self.page, "Error", "Select an item first")
-            return
-
-        name_item = self.ui.tableItemList.item(row, 0)
-        if not name_item:
+        if row < 0 or not self.ui.tableItemList.item(row, 0):
             QMessageBox.warning(self.page, "Error", "Select an item first")
             return
 
-        name = name_item.text()
-        item = next((i for i in self.items if i["item_name"] == name), None)
+        item = self.selected_item(row)
         if not item:
             QMessageBox.warning(self.page, "Error", "Item not found")
             return
@@ -155,36 +171,66 @@ class SalesController:
             QMessageBox.warning(self.page, "Error", "Quantity must be at least 1")
             return
 
+        if self.add_item_to_cart(item, qty_to_add):
+            self.reset_inputs()
+
+    def scan_to_cart(self):
+        """Add one unit of the scanned barcode/SKU straight to the cart."""
+        code = self.ui.inputScanCode.text().strip()
+        self.ui.inputScanCode.clear()
+        if not code:
+            return
+
+        item = stock_catalog.find_by_code(code)
+        if not item:
+            # Not cached yet (e.g. added on another terminal)
+            resp = StockAPI.get_by_code(code)
+            if not resp.get("success"):
+                QMessageBox.warning(
+                    self.page, "Error", resp.get("error", "Item not found")
+                )
+                return
+            item = resp["item"]
+
+        self.add_item_to_cart(item, 1)
+        self.ui.inputScanCode.setFocus()
+
+    def cart_row_for(self, stock_id):
         for r in range(self.ui.tableCheckoutCart.rowCount()):
             cell_item = self.ui.tableCheckoutCart.item(r, 0)
-            if cell_item and cell_item.text() == name:
-                existing_qty = int(self.ui.tableCheckoutCart.item(r, 2).text())
-                new_qty = existing_qty + qty_to_add
-                if new_qty > item["quantity"]:
-                    QMessageBox.warning(
-                        self.page, "Error", "Insufficient stock for requested increase"
-                    )
-                    return
-                self.ui.tableCheckoutCart.item(r, 2).setText(str(new_qty))
-                price = float(self.ui.tableCheckoutCart.item(r, 3).text())
-                new_total = new_qty * price
-                self.ui.tableCheckoutCart.item(r, 4).setText(f"{new_total:.2f}")
-                QtCore.QTimer.singleShot(0, self.update_lcds)
-                self.reset_inputs()
-                return
+            if cell_item and cell_item.data(QtCore.Qt.UserRole) == stock_id:
+                return r
+        return None
+
+    def add_item_to_cart(self, item, qty_to_add) -> bool:
+        r = self.cart_row_for(item["id"])
+        if r is not None:
+            existing_qty = int(self.ui.tableCheckoutCart.item(r, 2).text())
+            new_qty = existing_qty + qty_to_add
+            if new_qty > item["quantity"]:
+                QMessageBox.warning(
+                    self.page, "Error", "Insufficient stock for requested increase"
+                )
+                return False
+            self.ui.tableCheckoutCart.item(r, 2).setText(str(new_qty))
+            price = float(self.ui.tableCheckoutCart.item(r, 3).text())
+            new_total = new_qty * price
+            self.ui.tableCheckoutCart.item(r, 4).setText(f"{new_total:.2f}")
+            QtCore.QTimer.singleShot(0, self.update_lcds)
+            return True
 
         if qty_to_add > item["quantity"]:
             QMessageBox.warning(self.page, "Error", "Insufficient stock")
-            return
+            return False
 
         price = float(item["selling_price"])
         total = qty_to_add * price
 
         r = self.ui.tableCheckoutCart.rowCount()
         self.ui.tableCheckoutCart.insertRow(r)
-        self.ui.tableCheckoutCart.setItem(
-            r, 0, QtWidgets.QTableWidgetItem(item["item_name"])
-        )
+        name_cell = QtWidgets.QTableWidgetItem(item["item_name"])
+        name_cell.setData(QtCore.Qt.UserRole, item["id"])
+        self.ui.tableCheckoutCart.setItem(r, 0, name_cell)
         self.ui.tableCheckoutCart.setItem(
             r, 1, QtWidgets.QTableWidgetItem(item["category"])
         )
@@ -210,7 +256,7 @@ class SalesController:
         self.ui.tableCheckoutCart.setCellWidget(r, 5, btn_delete)
 
         QtCore.QTimer.singleShot(0, self.update_lcds)
-        self.reset_inputs()
+        return True
 
     def delete_cart_row(self, btn):
         index = self.ui.tableCheckoutCart.indexAt(btn.pos())
@@ -225,9 +271,10 @@ class SalesController:
             return
 
         row = item.row()
-        name = self.ui.tableCheckoutCart.item(row, 0).text()
+        name_cell = self.ui.tableCheckoutCart.item(row, 0)
+        name = name_cell.text()
         current_qty = int(item.text())
-        stock_item = next((i for i in self.items if i["item_name"] == name), None)
+        stock_item = stock_catalog.get(name_cell.data(QtCore.Qt.UserRole))
         max_allowed = stock_item["quantity"] if stock_item else 999999
 
         new_qty, ok = QInputDialog.getInt(
@@ -342,11 +389,8 @@ class SalesController:
     def create_sale(self, print_receipt=False):
         sale_items = []
         for r in range(self.ui.tableCheckoutCart.rowCount()):
-            name = self.ui.tableCheckoutCart.item(r, 0).text()
+            stock_id = self.ui.tableCheckoutCart.item(r, 0).data(QtCore.Qt.UserRole)
             qty = int(self.ui.tableCheckoutCart.item(r, 2).text())
-            stock_id = next(
-                (i["id"] for i in self.items if i["item_name"] == name), None
-            )
             if stock_id:
                 sale_items.append({"stock_id": stock_id, "quantity_sold": qty})
 
@@ -376,7 +420,7 @@ class SalesController:
         # --- REFRESH DAILY TOTALS FROM DATABASE ---
         self.load_today_totals()  # now lcdItemsSold, lcdDailySales, lcdDailyProfit are all DB-based
 
-        stock_events.stock_changed.emit()
+        stock_events.notify([i["stock_id"] for i in sale_items])
 
         msg = (
             "Sale completed & receipt printed"
@@ -386,7 +430,6 @@ class SalesController:
         QMessageBox.information(self.page, "Success", msg)
 
         self.clear_all()
-        self.load_items()
 
     def on_cart_cell_changed(self, row, column):
         if column in (2, 3):
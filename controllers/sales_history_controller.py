@@ -1,14 +1,46 @@
+import csv
 import logging
+import os
 from datetime import date
 from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6.QtPrintSupport import QPrinter, QPrintPreviewDialog
 from PySide6.QtGui import QTextDocument
 from backend.apis import SaleAPI
 from ui.sales_history_ui import Ui_SalesHistory
+from controllers.stock_catalog import stock_events
+from controllers.workers import Worker, start_worker
 
 logger = logging.getLogger("HistoryController")
 
 
+# -------------------- CSV Export Task --------------------
+def write_sales_csv(task, path: str, start_date: str, end_date: str) -> int | None:
+    """Stream sale line items for the range into `path`; None if cancelled."""
+    counted = SaleAPI.count_export_lines(start_date, end_date)
+    if not counted["success"]:
+        raise ValueError(counted.get("error", "Unknown error"))
+    total = counted["count"]
+    task.progress.emit(0, total)
+
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SaleAPI.EXPORT_HEADERS)
+        for row in SaleAPI.iter_export_lines(start_date, end_date):
+            writer.writerow(row)
+            written += 1
+            if written % 500 == 0:
+                if task.is_cancelled():
+                    break
+                task.progress.emit(written, total)
+
+    if task.is_cancelled():
+        os.remove(path)
+        return None
+    task.progress.emit(written, total)
+    return written
+
+
 # -------------------- Custom Delegate for Actions Column --------------------
 class ActionsDelegate(QtWidgets.QStyledItemDelegate):
     def __init__(self, controller, parent=None):
@@ -72,18 +104,31 @@ class SalesHistoryModel(QtCore.QAbstractTableModel):
         "Date",
         "Amount",
         "Pay Method",
-        "Daily Sales",
+        "Gross",
         "Profit",
-        "Items Sold",
+        "Items",
         "Actions",
     ]
 
-    def __init__(self, data=None, parent=None):
+    PAGE_SIZE = 200
+    # Pages held at once: the visible stretch plus a prefetch buffer. Pages
+    # that fall outside are dropped and refetched by cursor on scroll-back.
+    MAX_PAGES = 5
+
+    # Emitted with the row count when pages are dropped from the top
+    head_trimmed = QtCore.Signal(int)
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self._data = data or []
+        self._data = []
+        self._page_cursors = [None]  # `after` cursor of every page seen so far
+        self._page_sizes = []  # rows of each loaded page, from _first_page on
+        self._first_page = 0
+        self._search = None
+        self._day = None
 
     def rowCount(self, parent=QtCore.QModelIndex()):
-        return len(self._data)
+        return 0 if parent.isValid() else len(self._data)
 
     def columnCount(self, parent=QtCore.QModelIndex()):
         return len(self.HEADERS)
@@ -104,56 +149,129 @@ class SalesHistoryModel(QtCore.QAbstractTableModel):
             return (
                 self.HEADERS[section]
                 if orientation == QtCore.Qt.Horizontal
-                else section + 1
+                else self.first_row() + section + 1
             )
         return None
 
-    def set_data(self, data):
+    # -------------------- Paging --------------------
+    def set_query(self, search: str | None = None, day: str | None = None):
+        """Drop the loaded rows and load the first page for the new filters."""
         self.beginResetModel()
-        self._data = data
+        self._data = []
+        self._page_cursors = [None]
+        self._page_sizes = []
+        self._first_page = 0
+        self._search = search or None
+        self._day = day
         self.endResetModel()
+        self._fetch_page()
 
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self.has_more()
 
-# -------------------- Proxy Model --------------------
-class SalesHistoryProxyModel(QtCore.QSortFilterProxyModel):
-    def __init__(self):
-        super().__init__()
-        self.date_filter_str = None
-        self.search_text = ""
-
-    def set_search_text(self, text: str):
-        self.search_text = text.lower()
-        self.invalidateFilter()
-
-    def set_date_filter(self, date_str: str | None):
-        self.date_filter_str = date_str
-        self.invalidateFilter()
-
-    def filterAcceptsRow(self, source_row, source_parent):
-        model = self.sourceModel()
-        if self.date_filter_str:
-            date_value = model.data(model.index(source_row, 2), QtCore.Qt.DisplayRole)
-            if date_value != self.date_filter_str:
-                return False
-
-        if self.search_text:
-            invoice_value = (
-                model.data(model.index(source_row, 0), QtCore.Qt.DisplayRole) or ""
-            )
-            customer_value = (
-                model.data(model.index(source_row, 1), QtCore.Qt.DisplayRole) or ""
-            )
-            if (
-                self.search_text not in invoice_value.lower()
-                and self.search_text not in customer_value.lower()
-            ):
-                return False
-
-        return True
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not self.has_more():
+            return
+        try:
+            self._fetch_page()
+        except Exception as e:
+            logger.error("Error loading more sales: %s", e)
+
+    def can_fetch_previous(self) -> bool:
+        return self._first_page > 0
+
+    def fetch_previous(self) -> int:
+        """Reload the page above the window, dropping the bottom page if the
+        window is full. Returns the number of rows inserted at the top."""
+        if not self.can_fetch_previous():
+            return 0
+        page = self._first_page - 1
+        rows = self._query_page(page)
+        if rows:
+            self.beginInsertRows(QtCore.QModelIndex(), 0, len(rows) - 1)
+            self._data[:0] = rows
+            self.endInsertRows()
+        self._page_sizes.insert(0, len(rows))
+        self._first_page = page
+
+        if len(self._page_sizes) > self.MAX_PAGES:
+            count = self._page_sizes.pop()
+            first = len(self._data) - count
+            self.beginRemoveRows(QtCore.QModelIndex(), first, len(self._data) - 1)
+            del self._data[first:]
+            self.endRemoveRows()
+        return len(rows)
+
+    def _fetch_page(self):
+        page = self._first_page + len(self._page_sizes)
+        rows = self._query_page(page)
+        if rows:
+            first = len(self._data)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(rows) - 1)
+            self._data.extend(rows)
+            self.endInsertRows()
+        self._page_sizes.append(len(rows))
+
+        if len(self._page_sizes) > self.MAX_PAGES:
+            count = self._page_sizes.pop(0)
+            self._first_page += 1
+            if count:
+                self.beginRemoveRows(QtCore.QModelIndex(), 0, count - 1)
+                del self._data[:count]
+                self.endRemoveRows()
+                self.head_trimmed.emit(count)
+
+    def _query_page(self, page: int) -> list:
+        result = SaleAPI.get_invoice_history(
+            start_date=self._day,
+            end_date=self._day,
+            search=self._search,
+            after=self._page_cursors[page],
+            limit=self.PAGE_SIZE,
+        )
+        if not result["success"]:
+            raise ValueError(result.get("error", "Unknown error"))
+
+        sales = result["sales"]
+        if page + 1 < len(self._page_cursors):
+            # A refetched page stops where the next page starts, even if
+            # sales were deleted in between
+            end = self._page_cursors[page + 1]
+            sales = [s for s in sales if (s["sale_date"], s["id"]) >= end]
+        elif result["next_cursor"] is not None:
+            self._page_cursors.append(result["next_cursor"])
+        return [self._format(s) for s in sales]
+
+    def first_row(self) -> int:
+        """Position of the window's first row among all matching sales."""
+        return self._first_page * self.PAGE_SIZE
+
+    def has_more(self) -> bool:
+        return self._first_page + len(self._page_sizes) < len(self._page_cursors)
+
+    @staticmethod
+    def _format(s: dict) -> list:
+        return [
+            f"INV-{s['id']:05d}",
+            s.get("customer_name", "N/A"),
+            (
+                s["sale_date"].strftime("%Y-%m-%d")
+                if isinstance(s["sale_date"], date)
+                else s["sale_date"]
+            ),
+            f"{s['amount_paid']:.2f}",
+            s.get("payment_method", "N/A"),
+            f"{s['gross']:.2f}",
+            f"{s['profit']:.2f}",
+            str(s["items_sold"]),
+            "",
+        ]
 
 
 # -------------------- Main Controller --------------------
 class HistoryController(QtWidgets.QDialog, Ui_SalesHistory):
+    EXPORT_CANCEL_WAIT_MS = 2000
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setupUi(self)
@@ -171,10 +289,15 @@ class HistoryController(QtWidgets.QDialog, Ui_SalesHistory):
         self.status_label = self.labelStatus
 
         # --- Model ---
-        self.model = SalesHistoryModel([])
-        self.proxy_model = SalesHistoryProxyModel()
+        self.model = SalesHistoryModel()
+        # Filtering happens in SQL (see SalesHistoryModel.set_query); the
+        # proxy only sorts the rows fetched so far
+        self.proxy_model = QtCore.QSortFilterProxyModel()
         self.proxy_model.setSourceModel(self.model)
         self.table_view.setModel(self.proxy_model)
+        self.date_filter_str = None
+        self.export_worker = None
+        self.export_thread = None
 
         # --- Actions column ---
         actions_col = self.model.columnCount() - 1
@@ -182,71 +305,151 @@ class HistoryController(QtWidgets.QDialog, Ui_SalesHistory):
             actions_col, ActionsDelegate(controller=self, parent=self.table_view)
         )
 
+        # Re-query once typing pauses instead of on every keystroke
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.load_sales)
+
         # --- Signals ---
         self.refresh_btn.clicked.connect(self.load_sales)
         self.export_btn.clicked.connect(self.export_csv)
-        self.search_box.textChanged.connect(self.proxy_model.set_search_text)
-        self.date_filter.dateChanged.connect(
-            lambda qdate: self.proxy_model.set_date_filter(qdate.toString("yyyy-MM-dd"))
-        )
+        self.search_box.textChanged.connect(self.search_timer.start)
+        self.date_filter.dateChanged.connect(self.set_date_filter)
+        self.model.rowsInserted.connect(self.update_status)
+        self.model.rowsRemoved.connect(self.update_status)
+        self.model.head_trimmed.connect(lambda count: self.shift_scroll(-count))
+        self.table_view.verticalScrollBar().valueChanged.connect(self.on_scrolled)
         self.table_view.doubleClicked.connect(self.show_sale_items)
 
         self.load_sales()
 
     # -------------------- Load Sales --------------------
+    def set_date_filter(self, qdate: QtCore.QDate):
+        self.date_filter_str = qdate.toString("yyyy-MM-dd")
+        self.load_sales()
+
     def load_sales(self):
         try:
-            result = SaleAPI.get_all_sales()
-            if not result["success"]:
-                raise ValueError(result.get("error", "Unknown error"))
-
-            formatted = []
-            for s in result["sales"]:
-                totals = SaleAPI.get_totals_by_date(s["sale_date"])
-                formatted.append(
-                    [
-                        f"INV-{s['id']:05d}",
-                        s.get("customer_name", "N/A"),
-                        (
-                            s["sale_date"].strftime("%Y-%m-%d")
-                            if isinstance(s["sale_date"], date)
-                            else s["sale_date"]
-                        ),
-                        f"{s['amount_paid']:.2f}",
-                        s.get("payment_method", "N/A"),
-                        f"{totals.get('gross', 0):.2f}",
-                        f"{totals.get('profit', 0):.2f}",
-                        str(totals.get("items_sold", 0)),
-                        "",
-                    ]
-                )
-
-            self.model.set_data(formatted)
-            self.status_label.setText(f"Loaded {len(formatted)} records.")
+            self.model.set_query(
+                search=self.search_box.text().strip(), day=self.date_filter_str
+            )
+            self.update_status()
         except Exception as e:
             logger.error("Error loading sales: %s", e)
             self.status_label.setText("Error loading sales!")
 
+    def on_scrolled(self, value: int):
+        # fetchMore only grows the bottom; pages dropped from the top come
+        # back when the user scrolls up to the window's first row
+        scroll_bar = self.table_view.verticalScrollBar()
+        if value == scroll_bar.minimum() and self.model.can_fetch_previous():
+            try:
+                self.shift_scroll(self.model.fetch_previous())
+            except Exception as e:
+                logger.error("Error loading previous sales: %s", e)
+
+    def shift_scroll(self, rows: int):
+        """Keep the same sales in view after rows are added or dropped above them."""
+        view = self.table_view
+        if view.verticalScrollMode() == QtWidgets.QAbstractItemView.ScrollPerPixel:
+            rows *= view.verticalHeader().defaultSectionSize()
+        view.verticalScrollBar().setValue(view.verticalScrollBar().value() + rows)
+
+    def update_status(self, *args):
+        count = self.model.rowCount()
+        first = self.model.first_row()
+        more = " (scroll for more)" if self.model.has_more() else ""
+        self.status_label.setText(
+            f"Showing records {first + 1 if count else 0}-{first + count}{more}."
+        )
+
     # -------------------- Export CSV --------------------
+    def ask_export_range(self) -> tuple[str, str] | None:
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Export Sales")
+        form = QtWidgets.QFormLayout(dialog)
+
+        date_from = QtWidgets.QDateEdit(dialog)
+        date_from.setCalendarPopup(True)
+        date_from.setDisplayFormat("yyyy-MM-dd")
+        date_from.setDate(QtCore.QDate.currentDate().addMonths(-1))
+        date_to = QtWidgets.QDateEdit(dialog)
+        date_to.setCalendarPopup(True)
+        date_to.setDisplayFormat("yyyy-MM-dd")
+        date_to.setDate(QtCore.QDate.currentDate())
+        form.addRow("From:", date_from)
+        form.addRow("To:", date_to)
+
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel
+        )
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+
+        if dialog.exec() != QtWidgets.QDialog.Accepted:
+            return None
+        start, end = sorted([date_from.date(), date_to.date()])
+        return start.toString("yyyy-MM-dd"), end.toString("yyyy-MM-dd")
+
     def export_csv(self):
+        if self.export_worker:
+            self.status_label.setText("An export is already running.")
+            return
+        date_range = self.ask_export_range()
+        if not date_range:
+            return
         path, _ = QtWidgets.QFileDialog.getSaveFileName(
             self, "Save CSV", "", "CSV Files (*.csv)"
         )
         if not path:
             return
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(",".join(SalesHistoryModel.HEADERS) + "\n")
-                for row in range(self.proxy_model.rowCount()):
-                    row_data = [
-                        self.proxy_model.data(self.proxy_model.index(row, col))
-                        for col in range(self.proxy_model.columnCount())
-                    ]
-                    f.write(",".join(row_data) + "\n")
-            self.status_label.setText(f"Exported to {path}")
-        except Exception as e:
-            logger.error("Export failed: %s", e)
-            self.status_label.setText("Export failed!")
+
+        self.export_progress = QtWidgets.QProgressDialog(
+            "Exporting sales...", "Cancel", 0, 0, self
+        )
+        self.export_progress.setWindowModality(QtCore.Qt.WindowModal)
+        self.export_progress.setMinimumDuration(0)
+
+        self.export_worker = Worker(write_sales_csv, path, *date_range)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.finished.connect(
+            lambda written: self.on_export_done(path, written)
+        )
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_progress.canceled.connect(self.export_worker.cancel)
+        self.export_thread = start_worker(self.export_worker, self)
+
+    def on_export_progress(self, done: int, total: int):
+        self.export_progress.setMaximum(total)
+        self.export_progress.setValue(done)
+
+    def on_export_done(self, path: str, written: int | None):
+        self.finish_export()
+        if written is None:
+            self.status_label.setText("Export cancelled.")
+        else:
+            self.status_label.setText(f"Exported {written} lines to {path}")
+
+    def on_export_failed(self, error: str):
+        self.finish_export()
+        logger.error("Export failed: %s", error)
+        self.status_label.setText("Export failed!")
+
+    def finish_export(self):
+        self.export_progress.reset()
+        self.export_worker = None
+        self.export_thread = None
+
+    def closeEvent(self, event):
+        # The export loop polls the cancel flag every 500 rows and the thread
+        # quits itself when the task returns, so a bounded wait is enough. On
+        # timeout the (hidden, not deleted) dialog keeps the thread alive.
+        if self.export_worker:
+            self.export_worker.cancel()
+            self.export_thread.wait(self.EXPORT_CANCEL_WAIT_MS)
+        super().closeEvent(event)
 
     # -------------------- Delete Action --------------------
     def delete_sale(self, row: int):
@@ -266,6 +469,7 @@ class HistoryController(QtWidgets.QDialog, Ui_SalesHistory):
                         self, "Deleted", f"{invoice} deleted successfully!"
                     )
                     self.load_sales()
+                    stock_events.notify(result.get("stock_ids"))
                 else:
                     QtWidgets.QMessageBox.warning(
                         self, "Error", result.get("error", "Delete failed")
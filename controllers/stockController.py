@@ -1,20 +1,19 @@
 from PySide6 import QtCore, QtGui, QtWidgets
 from backend.apis import StockAPI
+from controllers.stock_catalog import stock_catalog, stock_events
+from controllers.stocktakeController import StocktakeController
+from controllers.workers import Worker, start_worker
 from datetime import datetime, date
 
 
-class StockEvents(QtCore.QObject):
-    stock_changed = QtCore.Signal()  # global signal for stock updates
-
-
-stock_events = StockEvents()
-
-
 class StockController:
     def __init__(self, ui, page):
         self.ui = ui
         self.page = page
         self.selected_stock_id = None
+        self.import_worker = None
+        self.import_thread = None
+        self.valuation_cache = {}  # filter text -> get_valuation_summary result
         self.setup_validators()
         self.setup_connections()
         self.load_stocks()
@@ -26,6 +25,7 @@ class StockController:
         double_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
 
         self.ui.inputRetailQty.setValidator(int_validator)
+        self.ui.inputRetailReorder.setValidator(int_validator)
         self.ui.inputRetailCost.setValidator(double_validator)
         self.ui.inputRetailSelling.setValidator(double_validator)
 
@@ -35,22 +35,34 @@ class StockController:
         self.ui.btnRetailEdit.clicked.connect(self.update_stock)
         self.ui.btnRetailDelete.clicked.connect(self.delete_stock)
         self.ui.btnRetailClear.clicked.connect(self.clear_inputs)
+        self.ui.btnRetailImport.clicked.connect(self.import_csv)
+        self.ui.btnRetailReprice.clicked.connect(self.bulk_update)
+        self.ui.btnRetailStocktake.clicked.connect(self.open_stocktake)
         self.ui.btnRetailFilter.clicked.connect(self.filter_stocks)
-        self.ui.inputRetailFilter.textChanged.connect(self.filter_stocks)
+        # Search once typing pauses instead of on every keystroke
+        self.filter_timer = QtCore.QTimer(self.page)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(300)
+        self.filter_timer.timeout.connect(self.filter_stocks)
+        self.ui.inputRetailFilter.textChanged.connect(self.filter_timer.start)
         self.ui.table_stock.doubleClicked.connect(self.load_row_to_inputs)
-        # Connect to global stock changed signal to refresh table on external changes
+        # Connect to global stock changed signal to refresh table on external changes;
+        # the valuation cache is dropped first so the reload recomputes the LCDs
+        stock_events.stock_changed.connect(self.valuation_cache.clear)
         stock_events.stock_changed.connect(self.load_stocks)
 
     # ------------------ LOAD STOCKS ------------------
     def load_stocks(self):
-        result = StockAPI.get_all()
+        result = stock_catalog.load()
         if result["success"]:
-            active_items = [s for s in result["items"] if s.get("is_active", True)]
-            self.populate_stock_table(active_items)
-            self.update_lcds(active_items)
+            self.filter_stocks()
         else:
             self.show_error(result["error"])
 
+    def refresh_table(self):
+        # Called when the page is revisited; redraws only if stock changed
+        stock_catalog.sync()
+
     # ------------------ POPULATE TABLE ------------------
     def populate_stock_table(self, stocks):
         model = QtGui.QStandardItemModel()
@@ -62,6 +74,8 @@ class StockController:
             "Selling Price",
             "Category",
             "Expiry Date",
+            "Barcode",
+            "Reorder Level",
         ]
         model.setHorizontalHeaderLabels(headers)
 
@@ -84,6 +98,8 @@ class StockController:
                 QtGui.QStandardItem(f"{stock['selling_price']:.2f}"),
                 QtGui.QStandardItem(stock["category"]),
                 QtGui.QStandardItem(expiry),
+                QtGui.QStandardItem(stock.get("barcode") or ""),
+                QtGui.QStandardItem(str(stock["reorder_level"])),
             ]
             model.appendRow(row)
 
@@ -94,13 +110,17 @@ class StockController:
 
     # ------------------ FILTER ------------------
     def filter_stocks(self):
-        text = self.ui.inputRetailFilter.text().strip().lower()
-        result = StockAPI.get_all()
-        if result["success"]:
-            active_items = [s for s in result["items"] if s.get("is_active", True)]
-            filtered = [s for s in active_items if text in s["item_name"].lower()]
-            self.populate_stock_table(filtered)
-            self.update_lcds(filtered)
+        text = self.ui.inputRetailFilter.text().strip()
+        if text:
+            result = StockAPI.search(text, limit=500)
+            if not result["success"]:
+                self.show_error(result["error"])
+                return
+            filtered = result["items"]
+        else:
+            filtered = stock_catalog.items()
+        self.populate_stock_table(filtered)
+        self.update_lcds(text)
 
     # ------------------ ADD STOCK ------------------
     def add_stock(self):
@@ -114,18 +134,26 @@ class StockController:
             if self.ui.checkRetailExpiry.isChecked()
             else None
         )
+        barcode = self.ui.inputRetailBarcode.text().strip() or None
+        reorder = self.ui.inputRetailReorder.text().strip()
 
         if not name or not qty or not cost or not selling:
             self.show_error("All fields are required!")
             return
 
         result = StockAPI.create_stock(
-            name, int(qty), float(cost), float(selling), category, expiry
+            name,
+            int(qty),
+            float(cost),
+            float(selling),
+            category,
+            expiry,
+            barcode,
+            int(reorder) if reorder else None,
         )
         if result["success"]:
-            self.load_stocks()
             self.clear_inputs()
-            stock_events.stock_changed.emit()
+            stock_events.notify([result["stock"]["id"]])
         else:
             self.show_error(result["error"])
 
@@ -145,6 +173,8 @@ class StockController:
             if self.ui.checkRetailExpiry.isChecked()
             else None
         )
+        barcode = self.ui.inputRetailBarcode.text().strip() or None
+        reorder = self.ui.inputRetailReorder.text().strip()
 
         result = StockAPI.update_stock(
             self.selected_stock_id,
@@ -154,16 +184,22 @@ class StockController:
             float(selling),
             category,
             expiry,
+            barcode,
+            int(reorder) if reorder else None,
         )
         if result["success"]:
-            self.load_stocks()
+            stock_id = self.selected_stock_id
             self.clear_inputs()
-            stock_events.stock_changed.emit()
+            stock_events.notify([stock_id])
         else:
             self.show_error(result["error"])
 
     # ------------------ DELETE STOCK ------------------
     def delete_stock(self):
+        selected_ids = self.selected_row_ids()
+        if len(selected_ids) > 1:
+            self.delete_stocks(selected_ids)
+            return
         if not self.selected_stock_id:
             self.show_error("Select a stock to delete")
             return
@@ -177,12 +213,170 @@ class StockController:
         if confirm == QtWidgets.QMessageBox.Yes:
             result = StockAPI.delete_stock(self.selected_stock_id)
             if result["success"]:
-                self.load_stocks()
+                stock_id = self.selected_stock_id
                 self.clear_inputs()
-                stock_events.stock_changed.emit()
+                stock_events.notify([stock_id])
             else:
                 self.show_error(result["error"])
 
+    def delete_stocks(self, stock_ids):
+        confirm = QtWidgets.QMessageBox.warning(
+            self.page,
+            "Confirm Delete",
+            f"Are you sure you want to delete/archive {len(stock_ids)} stock items?",
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+        )
+        if confirm != QtWidgets.QMessageBox.Yes:
+            return
+        result = StockAPI.delete_stocks(stock_ids)
+        if result["success"]:
+            self.clear_inputs()
+            stock_events.notify(stock_ids)
+        else:
+            self.show_error(result["error"])
+
+    def selected_row_ids(self):
+        model = self.ui.table_stock.model()
+        if model is None:
+            return []
+        return [
+            int(model.item(index.row(), 0).text())
+            for index in self.ui.table_stock.selectionModel().selectedRows()
+        ]
+
+    # ------------------ BULK UPDATE ------------------
+    def bulk_update(self):
+        dialog = QtWidgets.QDialog(self.page)
+        dialog.setWindowTitle("Bulk Update Stock")
+        form = QtWidgets.QFormLayout(dialog)
+
+        category = QtWidgets.QComboBox(dialog)
+        category.addItems(["All", "Retail", "Wholesale"])
+        field = QtWidgets.QComboBox(dialog)
+        field.addItem("Selling Price", "selling_price")
+        field.addItem("Cost Price", "cost_price")
+        field.addItem("Quantity", "quantity")
+        op = QtWidgets.QComboBox(dialog)
+        op.addItem("Change by %", "percent")
+        op.addItem("Add amount", "add")
+        op.addItem("Set to", "set")
+        value = QtWidgets.QDoubleSpinBox(dialog)
+        value.setRange(-999999.99, 999999.99)
+        value.setDecimals(2)
+
+        form.addRow("Category:", category)
+        form.addRow("Field:", field)
+        form.addRow("Change:", op)
+        form.addRow("Value:", value)
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel
+        )
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+
+        if dialog.exec() != QtWidgets.QDialog.Accepted:
+            return
+
+        rule = {
+            "field": field.currentData(),
+            "op": op.currentData(),
+            "value": value.value(),
+        }
+        if category.currentText() != "All":
+            rule["category"] = category.currentText().lower()
+
+        confirm = QtWidgets.QMessageBox.question(
+            self.page,
+            "Confirm Bulk Update",
+            f"Apply '{op.currentText()} {value.value():g}' to "
+            f"{field.currentText()} for {category.currentText()} items?",
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+        )
+        if confirm != QtWidgets.QMessageBox.Yes:
+            return
+
+        result = StockAPI.bulk_update(rule=rule)
+        if not result["success"]:
+            self.show_error(result["error"])
+            return
+        stock_events.notify(result["stock_ids"])
+        QtWidgets.QMessageBox.information(
+            self.page, "Bulk Update", f"Updated {result['updated']} items."
+        )
+
+    # ------------------ STOCKTAKE ------------------
+    def open_stocktake(self):
+        StocktakeController(self.page).open()
+
+    # ------------------ CSV IMPORT ------------------
+    def import_csv(self):
+        if self.import_worker:
+            return
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self.page, "Import Stock CSV", "", "CSV Files (*.csv)"
+        )
+        if not path:
+            return
+
+        self.import_progress = QtWidgets.QProgressDialog(
+            "Importing stock...", "Cancel", 0, 0, self.page
+        )
+        self.import_progress.setWindowModality(QtCore.Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+
+        self.import_worker = Worker(
+            lambda task: StockAPI.import_csv(
+                path,
+                progress=task.progress.emit,
+                is_cancelled=task.is_cancelled,
+            )
+        )
+        self.import_worker.progress.connect(self.on_import_progress)
+        self.import_worker.finished.connect(self.on_import_done)
+        self.import_worker.failed.connect(
+            lambda error: self.on_import_done({"success": False, "error": error})
+        )
+        self.import_progress.canceled.connect(self.import_worker.cancel)
+        self.import_thread = start_worker(self.import_worker, self.page)
+
+    def on_import_progress(self, done, total):
+        self.import_progress.setMaximum(total)
+        self.import_progress.setValue(done)
+
+    def on_import_done(self, result):
+        self.import_progress.reset()
+        self.import_worker = None
+        self.import_thread = None
+        if not result.get("success"):
+            self.show_error(result.get("error", "Import failed"))
+            return
+
+        # Thousands of rows may have changed; let the catalog pull the feed
+        stock_events.notify()
+
+        errors = result["errors"]
+        summary = (
+            f"Created {result['created']} and updated {result['updated']} items."
+        )
+        if result["cancelled"]:
+            summary += "\nImport cancelled; rows before that point were saved."
+        if errors:
+            summary += f"\n{len(errors)} rows were skipped."
+
+        box = QtWidgets.QMessageBox(
+            QtWidgets.QMessageBox.Warning if errors else QtWidgets.QMessageBox.Information,
+            "Import Complete",
+            summary,
+            QtWidgets.QMessageBox.Ok,
+            self.page,
+        )
+        if errors:
+            box.setDetailedText(
+                "\n".join(f"Line {e['line']}: {e['error']}" for e in errors)
+            )
+        box.exec()
+
     # ------------------ ROW TO INPUTS ------------------
     def load_row_to_inputs(self, index):
         row = index.row()
@@ -201,6 +395,8 @@ class StockController:
             )
         else:
             self.ui.checkRetailExpiry.setChecked(False)
+        self.ui.inputRetailBarcode.setText(model.item(row, 7).text())
+        self.ui.inputRetailReorder.setText(model.item(row, 8).text())
 
     # ------------------ CLEAR INPUTS ------------------
     def clear_inputs(self):
@@ -209,42 +405,29 @@ class StockController:
         self.ui.inputRetailQty.clear()
         self.ui.inputRetailCost.clear()
         self.ui.inputRetailSelling.clear()
+        self.ui.inputRetailBarcode.clear()
+        self.ui.inputRetailReorder.clear()
         self.ui.checkRetailExpiry.setChecked(False)
         self.ui.inputRetailFilter.clear()
 
     # ------------------ LCD UPDATES ------------------
-    def update_lcds(self, stocks):
-        retail_items = sum(
-            s["quantity"] for s in stocks if s["category"].lower() == "retail"
-        )
-        wholesale_items = sum(
-            s["quantity"] for s in stocks if s["category"].lower() == "wholesale"
-        )
-
-        retail_cost = sum(
-            s["cost_price"] * s["quantity"]
-            for s in stocks
-            if s["category"].lower() == "retail"
-        )
-        wholesale_cost = sum(
-            s["cost_price"] * s["quantity"]
-            for s in stocks
-            if s["category"].lower() == "wholesale"
-        )
-
-        retail_value = sum(
-            s["selling_price"] * s["quantity"]
-            for s in stocks
-            if s["category"].lower() == "retail"
-        )
-        wholesale_value = sum(
-            s["selling_price"] * s["quantity"]
-            for s in stocks
-            if s["category"].lower() == "wholesale"
-        )
+    def update_lcds(self, text=""):
+        summary = self.valuation_cache.get(text)
+        if summary is None:
+            summary = StockAPI.get_valuation_summary(text or None)
+            if not summary["success"]:
+                self.show_error(summary["error"])
+                return
+            self.valuation_cache[text] = summary
 
-        retail_profit = retail_value - retail_cost
-        wholesale_profit = wholesale_value - wholesale_cost
+        retail_items = summary["retail_items"]
+        wholesale_items = summary["wholesale_items"]
+        retail_cost = summary["retail_cost"]
+        wholesale_cost = summary["wholesale_cost"]
+        retail_value = summary["retail_value"]
+        wholesale_value = summary["wholesale_value"]
+        retail_profit = summary["retail_profit"]
+        wholesale_profit = summary["wholesale_profit"]
 
         self.ui.lcdRetailItems.display(retail_items)
         self.ui.lcdsWholesaleItems.display(wholesale_items)
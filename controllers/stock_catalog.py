@@ -0,0 +1,145 @@
+from PySide6 import QtCore
+from backend.apis import StockAPI
+
+
+class StockEvents(QtCore.QObject):
+    stock_changed = QtCore.Signal()  # global signal for stock updates
+    stock_written = QtCore.Signal(list)  # ids touched by a write ([] = unknown)
+
+    def notify(self, stock_ids=None):
+        """Report a stock write; pass the ids it touched when they are known."""
+        self.stock_written.emit(list(stock_ids or []))
+
+
+stock_events = StockEvents()
+
+
+class StockCatalog:
+    """
+    Process-wide cache of active stock rows shared by the Sales, Stock and
+    Damage pages, indexed by id, by lowercased item name and by barcode.
+
+    Writes report the ids they touched through `stock_events.notify`; only
+    those rows are re-read before `stock_changed` tells the pages to redraw.
+    `sync()` pulls everything else (e.g. other terminals) from the change feed.
+    """
+
+    def __init__(self):
+        self._by_id: dict[int, dict] = {}
+        self._by_name: dict[str, dict] = {}
+        self._by_code: dict[str, dict] = {}
+        self._loaded = False
+        self._watermark = None
+        stock_events.stock_written.connect(self.on_stock_written)
+
+    # ------------------ Loading ------------------
+    def load(self) -> dict:
+        """Fill the cache on first use; later calls are free."""
+        if self._loaded:
+            return {"success": True}
+        return self.reload()
+
+    def reload(self) -> dict:
+        resp = StockAPI.get_changed_since(None)
+        if resp.get("success"):
+            self._by_id = {}
+            self._by_name = {}
+            self._by_code = {}
+            # The feed is ordered by updated_at; pages list items by id
+            for item in sorted(resp["items"], key=lambda i: i["id"]):
+                self._put(item)
+            self._watermark = resp["watermark"]
+            self._loaded = True
+        return resp
+
+    def sync(self) -> dict:
+        """
+        Apply rows changed since the last sync, including writes made by other
+        terminals; emits stock_changed only when something changed.
+        """
+        if not self._loaded:
+            return self.load()
+        resp = StockAPI.get_changed_since(self._watermark)
+        if not resp.get("success"):
+            return resp
+        changed = False
+        # SQLite may reuse a deleted id, so apply deletes before upserts
+        for stock_id in resp["deleted_ids"]:
+            changed |= self._drop(stock_id)
+        for item in resp["items"]:
+            # The feed repeats rows stamped at the watermark
+            if self._by_id.get(item["id"]) != item:
+                self._put(item)
+                changed = True
+        for stock_id in resp["archived_ids"]:
+            changed |= self._drop(stock_id)
+        self._watermark = resp["watermark"]
+        if changed:
+            stock_events.stock_changed.emit()
+        return resp
+
+    def patch(self, stock_ids) -> dict:
+        resp = StockAPI.get_by_ids(list(stock_ids))
+        if not resp.get("success"):
+            return resp
+        fresh = {item["id"]: item for item in resp["items"]}
+        for stock_id in stock_ids:
+            item = fresh.get(stock_id)
+            if item and item.get("is_active", True):
+                self._put(item)
+            else:
+                self._drop(stock_id)  # archived or permanently deleted
+        return resp
+
+    def on_stock_written(self, stock_ids: list):
+        if not self._loaded:
+            # Nothing cached yet; the next load() reads fresh rows anyway
+            stock_events.stock_changed.emit()
+        elif stock_ids:
+            self.patch(stock_ids)
+            stock_events.stock_changed.emit()
+        else:
+            self.sync()
+
+    # ------------------ Lookups ------------------
+    def items(self) -> list[dict]:
+        return list(self._by_id.values())
+
+    def get(self, stock_id: int) -> dict | None:
+        return self._by_id.get(stock_id)
+
+    def fetch(self, stock_id: int) -> dict | None:
+        """get(), reading the row from the database if it isn't cached yet."""
+        if stock_id not in self._by_id:
+            self.patch([stock_id])
+        return self._by_id.get(stock_id)
+
+    def find_by_name(self, name: str) -> dict | None:
+        return self._by_name.get(name.strip().lower())
+
+    def find_by_code(self, code: str) -> dict | None:
+        return self._by_code.get(code.strip())
+
+    # ------------------ Internals ------------------
+    def _put(self, item: dict):
+        self._unindex(self._by_id.get(item["id"]))
+        self._by_id[item["id"]] = item
+        self._by_name[item["item_name"].lower()] = item
+        if item.get("barcode"):
+            self._by_code[item["barcode"]] = item
+
+    def _drop(self, stock_id: int) -> bool:
+        old = self._by_id.pop(stock_id, None)
+        self._unindex(old)
+        return old is not None
+
+    def _unindex(self, old: dict | None):
+        if not old:
+            return
+        if self._by_name.get(old["item_name"].lower()) is old:
+            del self._by_name[old["item_name"].lower()]
+        if old.get("barcode") and self._by_code.get(old["barcode"]) is old:
+            del self._by_code[old["barcode"]]
+
+
+stock_catalog = StockCatalog()
@@ -0,0 +1,195 @@
+from PySide6 import QtGui, QtWidgets
+from backend.apis import StocktakeAPI
+from controllers.stock_catalog import stock_catalog, stock_events
+
+
+class StocktakeController:
+    """
+    Stocktake dialog opened from the Stock page. Scans and typed counts are
+    staged on the open session as they are entered; stock only changes when
+    the session is approved.
+    """
+
+    PAGE_SIZE = 500
+
+    def __init__(self, page):
+        self.page = page
+        self.stocktake_id = None
+        self.next_cursor = None
+        self.build_dialog()
+
+    # ------------------ DIALOG ------------------
+    def build_dialog(self):
+        self.dialog = QtWidgets.QDialog(self.page)
+        self.dialog.setWindowTitle("Stocktake")
+        self.dialog.resize(800, 600)
+        layout = QtWidgets.QVBoxLayout(self.dialog)
+
+        entry_h = QtWidgets.QHBoxLayout()
+        self.inputCode = QtWidgets.QLineEdit()
+        self.inputCode.setPlaceholderText("Scan barcode or type exact item name")
+        self.inputCount = QtWidgets.QSpinBox()
+        self.inputCount.setRange(0, 999999)
+        self.inputCount.setValue(1)
+        self.inputMode = QtWidgets.QComboBox()
+        self.inputMode.addItem("Add to count", "add")
+        self.inputMode.addItem("Set count", "set")
+        self.btnRecord = QtWidgets.QPushButton("RECORD")
+        entry_h.addWidget(self.inputCode, stretch=1)
+        entry_h.addWidget(self.inputCount)
+        entry_h.addWidget(self.inputMode)
+        entry_h.addWidget(self.btnRecord)
+        layout.addLayout(entry_h)
+
+        self.labelSummary = QtWidgets.QLabel()
+        layout.addWidget(self.labelSummary)
+
+        self.table = QtWidgets.QTableView()
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.model = QtGui.QStandardItemModel()
+        self.table.setModel(self.model)
+        layout.addWidget(self.table, stretch=1)
+
+        btn_h = QtWidgets.QHBoxLayout()
+        self.btnMore = QtWidgets.QPushButton("LOAD MORE")
+        self.btnApprove = QtWidgets.QPushButton("APPROVE")
+        self.btnCancel = QtWidgets.QPushButton("CANCEL STOCKTAKE")
+        self.btnClose = QtWidgets.QPushButton("CLOSE")
+        for btn in [self.btnMore, self.btnApprove, self.btnCancel, self.btnClose]:
+            btn_h.addWidget(btn)
+        layout.addLayout(btn_h)
+
+        self.inputCode.returnPressed.connect(self.record_count)
+        self.btnRecord.clicked.connect(self.record_count)
+        self.btnMore.clicked.connect(self.load_more)
+        self.btnApprove.clicked.connect(self.approve)
+        self.btnCancel.clicked.connect(self.cancel)
+        self.btnClose.clicked.connect(self.dialog.accept)
+
+    def open(self):
+        """Resume the open stocktake, or start one, and show the dialog."""
+        resp = StocktakeAPI.get_stocktakes("open")
+        if not resp["success"]:
+            self.show_error(resp["error"])
+            return
+        if resp["stocktakes"]:
+            self.stocktake_id = resp["stocktakes"][0]["id"]
+        else:
+            started = StocktakeAPI.start()
+            if not started["success"]:
+                self.show_error(started["error"])
+                return
+            self.stocktake_id = started["stocktake"]["id"]
+        stock_catalog.load()
+        self.load_variance()
+        self.inputCode.setFocus()
+        self.dialog.exec()
+
+    # ------------------ COUNTS ------------------
+    def record_count(self):
+        code = self.inputCode.text().strip()
+        if not code:
+            return
+        item = stock_catalog.find_by_code(code) or stock_catalog.find_by_name(code)
+        if not item:
+            self.show_error(f"No active item matches '{code}'")
+            return
+
+        result = StocktakeAPI.record_counts(
+            self.stocktake_id,
+            [{"stock_id": item["id"], "counted": self.inputCount.value()}],
+            self.inputMode.currentData(),
+        )
+        if not result["success"]:
+            self.show_error(result["error"])
+            return
+        self.inputCode.clear()
+        self.load_variance()
+
+    # ------------------ VARIANCE ------------------
+    def load_variance(self):
+        self.model.clear()
+        self.model.setHorizontalHeaderLabels(
+            ["ID", "Item Name", "On Hand", "Counted", "Variance", "Variance Cost"]
+        )
+        self.table.horizontalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Stretch
+        )
+        self.next_cursor = None
+        self.fetch_page()
+
+    def load_more(self):
+        if self.next_cursor is not None:
+            self.fetch_page()
+
+    def fetch_page(self):
+        resp = StocktakeAPI.get_variance(
+            self.stocktake_id, after=self.next_cursor, limit=self.PAGE_SIZE
+        )
+        if not resp["success"]:
+            self.show_error(resp["error"])
+            return
+        for line in resp["lines"]:
+            self.model.appendRow(
+                [
+                    QtGui.QStandardItem(str(line["stock_id"])),
+                    QtGui.QStandardItem(line["item_name"]),
+                    QtGui.QStandardItem(str(line["expected"])),
+                    QtGui.QStandardItem(str(line["counted"])),
+                    QtGui.QStandardItem(f"{line['variance']:+d}"),
+                    QtGui.QStandardItem(f"{line['variance_cost']:+.2f}"),
+                ]
+            )
+        self.next_cursor = resp["next_cursor"]
+        self.btnMore.setEnabled(self.next_cursor is not None)
+
+        summary = resp["summary"]
+        self.labelSummary.setText(
+            f"Stocktake #{self.stocktake_id}: {summary['counted_items']} items counted, "
+            f"{summary['differing_items']} differ, net {summary['net_units']:+d} units "
+            f"({summary['net_cost']:+.2f} at cost)"
+        )
+
+    # ------------------ CLOSE SESSION ------------------
+    def approve(self):
+        confirm = QtWidgets.QMessageBox.question(
+            self.dialog,
+            "Approve Stocktake",
+            "Set every counted item to its counted quantity?",
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+        )
+        if confirm != QtWidgets.QMessageBox.Yes:
+            return
+        result = StocktakeAPI.approve(self.stocktake_id)
+        if not result["success"]:
+            self.show_error(result["error"])
+            return
+        # One event for the whole count, naming only the items it adjusted
+        # ([] would mean "unknown" and force a full sync)
+        if result["stock_ids"]:
+            stock_events.notify(result["stock_ids"])
+        QtWidgets.QMessageBox.information(
+            self.dialog, "Stocktake", f"Adjusted {result['adjusted']} items."
+        )
+        self.dialog.accept()
+
+    def cancel(self):
+        confirm = QtWidgets.QMessageBox.question(
+            self.dialog,
+            "Cancel Stocktake",
+            "Discard this stocktake without changing stock?",
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+        )
+        if confirm != QtWidgets.QMessageBox.Yes:
+            return
+        result = StocktakeAPI.cancel(self.stocktake_id)
+        if not result["success"]:
+            self.show_error(result["error"])
+            return
+        self.dialog.accept()
+
+    # ------------------ ERROR POPUP ------------------
+    def show_error(self, message):
+        QtWidgets.QMessageBox.critical(self.dialog, "Error", message)
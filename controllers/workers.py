@@ -0,0 +1,88 @@
+import logging
+from PySide6 import QtCore
+
+logger = logging.getLogger("Workers")
+
+
+# -------------------- Background Worker --------------------
+class _Task(QtCore.QObject):
+    """Runs the worker's function on the background thread."""
+
+    progress = QtCore.Signal(int, int)
+    finished = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+
+    def __init__(self, worker: "Worker"):
+        super().__init__()
+        self.worker = worker
+
+    def is_cancelled(self) -> bool:
+        return self.worker.is_cancelled()
+
+    @QtCore.Slot()
+    def run(self):
+        worker = self.worker
+        try:
+            result = worker.fn(self, *worker.args, **worker.kwargs)
+        except Exception as e:
+            logger.error("Background task failed: %s", e)
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(result)
+
+
+class Worker(QtCore.QObject):
+    """
+    Runs `fn(task, *args, **kwargs)` on a QThread.
+
+    The task object lets `fn` report `task.progress.emit(done, total)` and
+    poll `task.is_cancelled()`; the return value arrives through `finished`.
+    The worker itself stays on the thread that created it, so its signals
+    reach plain Python callables (lambdas, controller methods) on that
+    thread rather than on the background one.
+    """
+
+    progress = QtCore.Signal(int, int)  # done, total
+    finished = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self._cancelled = False
+        self._task = None
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+
+def start_worker(worker: Worker, parent: QtCore.QObject | None = None) -> QtCore.QThread:
+    """Run `worker` on a new thread, cleaning the thread up when it is done.
+
+    Callers must keep a reference to the worker and the returned thread until
+    `finished` or `failed` fires.
+    """
+    thread = QtCore.QThread(parent)
+    task = _Task(worker)
+    task.moveToThread(thread)
+    worker._task = task
+
+    # Signal-to-signal hops are queued onto the worker's (GUI) thread
+    task.progress.connect(worker.progress)
+    task.finished.connect(worker.finished)
+    task.failed.connect(worker.failed)
+
+    thread.started.connect(task.run)
+    # QThread.quit is thread-safe; calling it directly stops the thread even
+    # while the GUI thread is blocked in wait()
+    task.finished.connect(thread.quit, QtCore.Qt.DirectConnection)
+    task.failed.connect(thread.quit, QtCore.Qt.DirectConnection)
+    thread.finished.connect(task.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread
@@ -0,0 +1,10 @@
+from backend.storage.database import init_db
+from backend.apis import SaleAPI
+
+init_db()
+result = SaleAPI.rebuild_sales_daily()
+
+if result['success']:
+    print(f"Rebuilt sales_daily ({result['rows']} rows)")
+else:
+    print(result['error'])
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+from backend.storage import database
+from backend.storage.migrations import apply_migrations
+from backend.storage.models import Account
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """A fresh in-memory database (create_all + apply_migrations) for the APIs."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    with engine.begin() as conn:
+        SQLModel.metadata.create_all(conn)
+        apply_migrations(conn)
+    monkeypatch.setattr(database, "engine", engine)
+    return engine
+
+
+@pytest.fixture
+def cashier_id(engine):
+    with Session(engine) as session:
+        cashier = Account(
+            name="Cashier", phone="0200000000", email="c@example.com", password="x"
+        )
+        session.add(cashier)
+        session.commit()
+        return cashier.id
@@ -0,0 +1,219 @@
+"""
+Hot-path queries must be answered from indexes.
+
+Each API call below runs against a fresh in-memory database built by
+create_all + apply_migrations. Every statement it issues is re-run under
+EXPLAIN QUERY PLAN, and no plan row may be a full `SCAN <table>` or sort
+rows in a temp b-tree. Paged reads may walk the one index a test names in
+`walks`: an ordering index the LIMIT stops early, or a partial index.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from backend.apis import (
+    AccountAPI,
+    DamageAPI,
+    DashboardAPI,
+    ReturnAPI,
+    SaleAPI,
+    StockAPI,
+)
+
+
+@pytest.fixture
+def seeded(engine, cashier_id):
+    """One cashier, two items, a sale with a return and a damage record."""
+    sold = StockAPI.create_stock(
+        "Sold Item", 50, 1.0, 2.0, "retail", expiry_date=str(date.today())
+    )["stock"]["id"]
+    # Never held stock, so no ledger rows: the only kind of item deleted outright
+    idle = StockAPI.create_stock("Idle Item", 0, 1.0, 2.0, "retail")["stock"]["id"]
+    sale = SaleAPI.create_sale(
+        cashier_id, [{"stock_id": sold, "quantity_sold": 3}], amount_paid=6.0
+    )
+    sale_id = sale["sale"]["id"]
+    returned = SaleAPI.create_sale(
+        cashier_id, [{"stock_id": sold, "quantity_sold": 1}], amount_paid=2.0
+    )
+    assert ReturnAPI.process_return(returned["sale"]["id"], sold, 1)["success"]
+    assert DamageAPI.record_damage(sold, 1)["success"]
+    return {
+        "cashier_id": cashier_id,
+        "sale_id": sale_id,
+        "returned_sale_id": returned["sale"]["id"],
+        "sold_id": sold,
+        "idle_id": idle,
+    }
+
+
+def explain(engine, call, walks=()):
+    """Run `call`; return its result and the full-table SCANs of what it issued."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb in ("SELECT", "UPDATE", "DELETE", "INSERT"):
+            if executemany:
+                parameters = parameters[0]
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        result = call()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    scans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            ).all()
+            for row in plan:
+                detail = row[-1]
+                # SCAN CONSTANT ROW is a VALUES clause, not a table
+                scan = detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW"
+                if scan and any(detail.endswith(f"INDEX {index}") for index in walks):
+                    continue
+                if scan or "TEMP B-TREE" in detail:
+                    scans.append(f"{detail}\n    {statement}")
+    return result, scans
+
+
+def test_today_totals(engine, seeded):
+    result, scans = explain(engine, SaleAPI.get_today_totals)
+    assert result["success"]
+    assert scans == []
+
+
+def test_totals_by_date(engine, seeded):
+    result, scans = explain(engine, lambda: SaleAPI.get_totals_by_date("2024-01-01"))
+    assert "error" not in result
+    assert scans == []
+
+
+def test_sale_by_id(engine, seeded):
+    result, scans = explain(engine, lambda: SaleAPI.get_sale_by_id(seeded["sale_id"]))
+    assert result["success"]
+    assert scans == []
+
+
+def test_delete_sale_lookups(engine, seeded):
+    result, scans = explain(engine, lambda: SaleAPI.delete_sale(seeded["sale_id"]))
+    assert result["success"]
+    assert scans == []
+
+
+def test_delete_sale_return_probe(engine, seeded):
+    # Refused because of the return; only the lookups run
+    result, scans = explain(
+        engine, lambda: SaleAPI.delete_sale(seeded["returned_sale_id"])
+    )
+    assert not result["success"]
+    assert scans == []
+
+
+def test_cashier_lookup(engine, seeded):
+    # Refused because the cashier has sales
+    result, scans = explain(
+        engine, lambda: AccountAPI.delete_account(seeded["cashier_id"])
+    )
+    assert not result["success"]
+    assert scans == []
+
+
+@pytest.mark.parametrize("stock_key", ["sold_id", "idle_id"])
+def test_damage_and_return_lookups(engine, seeded, stock_key):
+    # Sold stock is archived after the history probes; idle stock falls
+    # through every probe and is deleted
+    result, scans = explain(engine, lambda: StockAPI.delete_stock(seeded[stock_key]))
+    assert result["success"]
+    assert result["archived"] == (stock_key == "sold_id")
+    assert scans == []
+
+
+def test_invoice_history_pages(engine, seeded):
+    # The first page walks (sale_date, id) newest first and stops at the limit
+    first, scans = explain(
+        engine,
+        lambda: SaleAPI.get_invoice_history(limit=1),
+        walks=["ix_sales_sale_date_id"],
+    )
+    assert first["next_cursor"] is not None
+    assert scans == []
+
+    # Later pages seek past the cursor
+    result, scans = explain(
+        engine,
+        lambda: SaleAPI.get_invoice_history(after=first["next_cursor"], limit=1),
+    )
+    assert [s["id"] for s in result["sales"]] != [s["id"] for s in first["sales"]]
+    assert scans == []
+
+
+@pytest.mark.parametrize(
+    "search, walks",
+    [
+        (str(date.today()), []),
+        (f"{date.today():%Y-%m}", []),
+        ("INV-0000", ["ix_sales_sale_date_id"]),
+    ],
+)
+def test_invoice_history_search(engine, seeded, search, walks):
+    result, scans = explain(
+        engine,
+        lambda: SaleAPI.get_invoice_history(search=search, limit=50),
+        walks=walks,
+    )
+    assert result["sales"]
+    assert scans == []
+
+
+def test_invoice_history_range(engine, seeded):
+    today = str(date.today())
+    result, scans = explain(
+        engine, lambda: SaleAPI.get_invoice_history(today, today, limit=50)
+    )
+    assert result["sales"]
+    assert scans == []
+
+
+def test_totals_by_range(engine, seeded):
+    result, scans = explain(
+        engine,
+        lambda: SaleAPI.get_totals_by_range(
+            date.today() - timedelta(days=30), date.today()
+        ),
+    )
+    assert result["items_sold"] == 4
+    assert scans == []
+
+
+def test_changed_since(engine, seeded):
+    # The first load reads the whole catalog by design; syncs seek by time
+    result, scans = explain(
+        engine,
+        lambda: StockAPI.get_changed_since(date.today() - timedelta(days=1)),
+    )
+    assert result["success"] and result["items"]
+    assert scans == []
+
+
+def test_low_stock_alerts(engine, seeded):
+    # Only rows in the low-stock partial index are read
+    result, scans = explain(
+        engine,
+        DashboardAPI.get_low_stock_alerts,
+        walks=["ix_stocks_low_stock"],
+    )
+    assert [a["stock_id"] for a in result["alerts"]] == [seeded["idle_id"]]
+    assert scans == []
+
+
+def test_expiring(engine, seeded):
+    result, scans = explain(engine, lambda: StockAPI.get_expiring(30))
+    assert {lot["stock_id"] for lot in result["lots"]} == {seeded["sold_id"]}
+    assert scans == []
@@ -0,0 +1,113 @@
+"""
+SalesHistoryModel keeps at most MAX_PAGES pages loaded.
+
+Scrolling down drops pages from the top and scrolling back up refetches them
+by cursor. At every step the window must be one contiguous run of the
+matching sales: nothing duplicated, nothing skipped.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from controllers import sales_history_controller
+from controllers.sales_history_controller import SalesHistoryModel
+
+PAGE_SIZE = 4
+MAX_PAGES = 3
+
+
+@pytest.fixture
+def sales(monkeypatch):
+    """23 sales over 6 days, newest first, served like get_invoice_history."""
+    rows = [
+        {
+            "id": sale_id,
+            "sale_date": date(2024, 1, 1) + timedelta(days=sale_id // 4),
+            "amount_paid": 1.0,
+            "payment_method": "Cash",
+            "gross": 1.0,
+            "profit": 0.5,
+            "items_sold": 1,
+        }
+        for sale_id in range(1, 24)
+    ]
+    rows.sort(key=lambda s: (s["sale_date"], s["id"]), reverse=True)
+
+    def get_invoice_history(
+        start_date=None, end_date=None, search=None, after=None, limit=None
+    ):
+        matching = [
+            s for s in rows if after is None or (s["sale_date"], s["id"]) < after
+        ]
+        page = matching[:limit]
+        more = len(matching) > limit
+        return {
+            "success": True,
+            "sales": page,
+            "next_cursor": (page[-1]["sale_date"], page[-1]["id"]) if more else None,
+        }
+
+    monkeypatch.setattr(
+        sales_history_controller.SaleAPI, "get_invoice_history", get_invoice_history
+    )
+    monkeypatch.setattr(SalesHistoryModel, "PAGE_SIZE", PAGE_SIZE)
+    monkeypatch.setattr(SalesHistoryModel, "MAX_PAGES", MAX_PAGES)
+    return rows
+
+
+def window(model):
+    return [
+        int(model.data(model.index(row, 0)).removeprefix("INV-"))
+        for row in range(model.rowCount())
+    ]
+
+
+def assert_contiguous(model, rows):
+    ids = [s["id"] for s in rows]
+    first = ids.index(window(model)[0])
+    assert window(model) == ids[first : first + model.rowCount()]
+    assert model.rowCount() <= PAGE_SIZE * MAX_PAGES
+
+
+def test_scroll_down_and_back_up(sales):
+    model = SalesHistoryModel()
+    trimmed = []
+    model.head_trimmed.connect(trimmed.append)
+    model.set_query()
+
+    seen = window(model)
+    while model.canFetchMore():
+        before = model.rowCount()
+        model.fetchMore()
+        seen.extend(window(model)[before - (trimmed[-1] if trimmed else 0) :])
+        assert_contiguous(model, sales)
+        trimmed.clear()
+
+    # Every sale came into view exactly once, in order
+    assert seen == [s["id"] for s in sales]
+    assert model.first_row() > 0
+
+    while model.can_fetch_previous():
+        model.fetch_previous()
+        assert_contiguous(model, sales)
+
+    assert model.first_row() == 0
+    assert window(model) == [s["id"] for s in sales[: PAGE_SIZE * MAX_PAGES]]
+
+
+def test_scroll_back_after_delete(sales):
+    model = SalesHistoryModel()
+    model.set_query()
+    while model.canFetchMore():
+        model.fetchMore()
+
+    # A sale on a dropped page is deleted before the user scrolls back to it
+    del sales[1]
+    while model.can_fetch_previous():
+        model.fetch_previous()
+        assert_contiguous(model, sales)
+
+    assert window(model) == [s["id"] for s in sales[: model.rowCount()]]
@@ -0,0 +1,113 @@
+"""
+Stock lots must always sum to stocks.quantity.
+
+Every API that moves units is run in turn against a fresh in-memory
+database, and after each step each item's open lots are compared with its
+quantity.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from backend.apis import DamageAPI, ReturnAPI, SaleAPI, StockAPI, StocktakeAPI
+
+
+def drift(engine):
+    """Items whose lots do not add up to their quantity: {id: (qty, lots)}."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT id, quantity, (SELECT COALESCE(SUM(quantity), 0) "
+                "FROM stock_lots WHERE stock_id = stocks.id) FROM stocks"
+            )
+        ).all()
+    return {sid: (qty, lots) for sid, qty, lots in rows if qty != lots}
+
+
+@pytest.fixture
+def items(engine):
+    first = StockAPI.create_stock(
+        "First", 10, 1.0, 2.0, "retail", expiry_date="2030-01-01"
+    )["stock"]["id"]
+    second = StockAPI.create_stock("Second", 20, 1.0, 2.0, "retail")["stock"]["id"]
+    assert StockAPI.receive_lot(first, 5, 1.5, "2029-06-01")["success"]
+    return first, second
+
+
+def test_lots_follow_every_quantity_change(engine, cashier_id, items, tmp_path):
+    first, second = items
+
+    def check(result):
+        assert result["success"], result
+        assert drift(engine) == {}
+
+    sale = SaleAPI.create_sale(
+        cashier_id,
+        [
+            {"stock_id": first, "quantity_sold": 7},
+            {"stock_id": second, "quantity_sold": 4},
+        ],
+        amount_paid=100.0,
+    )
+    check(sale)
+    check(ReturnAPI.process_return(sale["sale"]["id"], first, 2))
+
+    voided = SaleAPI.create_sale(
+        cashier_id, [{"stock_id": second, "quantity_sold": 3}], amount_paid=100.0
+    )
+    check(voided)
+    check(SaleAPI.delete_sale(voided["sale"]["id"]))
+
+    damage = DamageAPI.record_damage(first, 2)
+    check(damage)
+    damage_id = damage["damage"]["id"]
+    check(DamageAPI.update_damage(damage_id, 4, "broken"))
+    check(DamageAPI.update_damage(damage_id, 1, "broken"))
+    check(DamageAPI.delete_damage(damage_id))
+
+    check(StockAPI.update_stock(first, "First", 30, 1.0, 2.0, "retail"))
+    check(StockAPI.update_stock(first, "First", 12, 1.0, 2.0, "retail"))
+
+    check(StockAPI.bulk_update(patches=[{"id": second, "quantity": 25}]))
+    check(
+        StockAPI.bulk_update(
+            rule={"field": "quantity", "op": "add", "value": -6, "ids": [second]}
+        )
+    )
+
+    stocktake = StocktakeAPI.start()["stocktake"]["id"]
+    check(
+        StocktakeAPI.record_counts(
+            stocktake,
+            [{"stock_id": first, "counted": 3}, {"stock_id": second, "counted": 40}],
+        )
+    )
+    check(StocktakeAPI.approve(stocktake))
+
+    path = tmp_path / "stock.csv"
+    path.write_text(
+        "item_name,quantity,cost_price,selling_price\n"
+        "First,8,1,2\n"
+        "Second,50,1,2\n"
+        "Third,6,1,2\n"
+    )
+    result = StockAPI.import_csv(str(path))
+    check(result)
+    assert (result["created"], result["updated"]) == (1, 2)
+
+
+def test_lot_shortfall_is_refused(engine, cashier_id, items):
+    first, _ = items
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE stock_lots SET quantity = 0 WHERE stock_id = :id"),
+            {"id": first},
+        )
+
+    sale = SaleAPI.create_sale(
+        cashier_id, [{"stock_id": first, "quantity_sold": 1}], amount_paid=10.0
+    )
+    assert not sale["success"]
+    assert "out of step" in sale["error"]
+    # The refused sale left the quantity alone
+    assert StockAPI.get_by_ids([first])["items"][0]["quantity"] == 15
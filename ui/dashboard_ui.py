@@ -2,9 +2,9 @@ from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6.QtCharts import (
     QChart,
     QChartView,
+    QBarCategoryAxis,
     QBarSeries,
     QBarSet,
-    QCategoryAxis,
     QValueAxis,
     QPieSeries,
     QPieSlice,
@@ -82,16 +82,29 @@ class Ui_Dashboard(object):
 
             card_layout.addWidget(title_label)
             card_layout.addWidget(value_label)
+            card.value_label = value_label
 
             return card
 
-        # Sample KPIs
-        kpi_layout.addWidget(create_kpi_card("Total Sales", "GHS 15,240", "#00c2ff"))
-        kpi_layout.addWidget(create_kpi_card("Total Profit", "GHS 4,560", "#19db33"))
-        kpi_layout.addWidget(create_kpi_card("Return rate", "23%", "#e610b7"))
-        kpi_layout.addWidget(create_kpi_card("Damage rate", "18%", "#f01f1f"))
-        kpi_layout.addWidget(create_kpi_card("Low Items", "12", "#f07523"))
-        kpi_layout.addWidget(create_kpi_card("Expiring Soon", "5", "#f3c808"))
+        # KPI cards; values arrive with the first dashboard refresh
+        cards = [
+            create_kpi_card("Total Sales", "—", "#00c2ff"),
+            create_kpi_card("Total Profit", "—", "#19db33"),
+            create_kpi_card("Return rate", "—", "#e610b7"),
+            create_kpi_card("Damage rate", "—", "#f01f1f"),
+            create_kpi_card("Low Items", "—", "#f07523"),
+            create_kpi_card("Expiring Soon", "—", "#f3c808"),
+        ]
+        for card in cards:
+            kpi_layout.addWidget(card)
+        (
+            self.lblTotalSales,
+            self.lblTotalProfit,
+            self.lblReturnRate,
+            self.lblDamageRate,
+            self.lblLowStock,
+            self.lblExpiringSoon,
+        ) = (card.value_label for card in cards)
 
         dashboard_layout.addLayout(kpi_layout)
 
@@ -120,7 +133,7 @@ class Ui_Dashboard(object):
         icon = QtGui.QIcon("alert.png")
         if not icon.isNull():
             self.tray_icon.setIcon(icon)
-        self.tray_icon.setToolTip("Expiring Soon Alert")
+        self.tray_icon.setToolTip("Stock Alerts")
         self.tray_icon.activated.connect(
             lambda reason: (
                 self.show_notification_ui()
@@ -130,39 +143,69 @@ class Ui_Dashboard(object):
         )
         self.tray_icon.show()
 
-        # Expiring Items (sample)
-        self.expiring_items = ["a", "b", "c", "d", "e"]
-        items_list = ", ".join(self.expiring_items)
-
-        # Show tray notification if expiring items > 0
-        if len(self.expiring_items) > 0:
-            self.tray_icon.showMessage("Expiring Soon", f"items({items_list})")
-
-            # Animate alert icon
-            self.opacity_effect = QGraphicsOpacityEffect()
-            self.alert_button.setGraphicsEffect(self.opacity_effect)
-            self.animation = QtCore.QPropertyAnimation(self.opacity_effect, b"opacity")
-            self.animation.setDuration(1000)
-            self.animation.setStartValue(1.0)
-            self.animation.setEndValue(0.2)
-            self.animation.setLoopCount(-1)
-            self.animation.setEasingCurve(QtCore.QEasingCurve.InOutSine)
+        # Alert icon pulses while there are alerts
+        self.opacity_effect = QGraphicsOpacityEffect()
+        self.alert_button.setGraphicsEffect(self.opacity_effect)
+        self.animation = QtCore.QPropertyAnimation(self.opacity_effect, b"opacity")
+        self.animation.setDuration(1000)
+        self.animation.setStartValue(1.0)
+        self.animation.setEndValue(0.2)
+        self.animation.setLoopCount(-1)
+        self.animation.setEasingCurve(QtCore.QEasingCurve.InOutSine)
+
+        # Set by the controller: fetch_alerts(after) -> {"success", "alerts",
+        # "total", "next_cursor"}; the bell dialog pages through it
+        self.fetch_alerts = None
+        self.alert_count = 0
+
+    def set_alert_count(self, count):
+        if count > self.alert_count:
+            self.tray_icon.showMessage("Stock Alerts", f"{count} item(s) need attention")
+        self.alert_count = count
+        self.alert_button.setToolTip(f"{count} alert(s)")
+        if count:
             self.animation.start()
+        else:
+            self.animation.stop()
+            self.opacity_effect.setOpacity(1.0)
 
     def show_notification_ui(self):
         dialog = QDialog()
-        dialog.setWindowTitle("Expiring Soon Items")
+        dialog.setWindowTitle("Stock Alerts")
         layout = QtWidgets.QVBoxLayout(dialog)
 
         list_widget = QListWidget()
-        for item in self.expiring_items:
-            list_widget.addItem(item)
         layout.addWidget(list_widget)
+        status_label = QtWidgets.QLabel()
+        layout.addWidget(status_label)
 
+        more_button = QtWidgets.QPushButton("Load More")
+        layout.addWidget(more_button)
         ok_button = QtWidgets.QPushButton("OK")
         ok_button.clicked.connect(dialog.accept)
         layout.addWidget(ok_button)
 
+        cursor = {"after": None}
+
+        def load_page():
+            resp = self.fetch_alerts(cursor["after"]) if self.fetch_alerts else None
+            if not resp or not resp.get("success"):
+                status_label.setText("Alerts unavailable")
+                more_button.setEnabled(False)
+                return
+            for alert in resp["alerts"]:
+                list_widget.addItem(
+                    f"{alert['item_name']}: {alert['quantity']} left "
+                    f"(reorder at {alert['reorder_level']})"
+                )
+            cursor["after"] = resp["next_cursor"]
+            more_button.setEnabled(resp["next_cursor"] is not None)
+            status_label.setText(
+                f"Showing {list_widget.count()} of {resp['total']} alert(s)"
+            )
+
+        more_button.clicked.connect(load_page)
+        load_page()
         dialog.exec()
 
     def create_sales_trend_chart(self):
@@ -170,33 +213,30 @@ class Ui_Dashboard(object):
         chart.setTitle("Sales Trend (Last 7 Days)")
         chart.setAnimationOptions(QChart.SeriesAnimations)
 
+        # Filled in by set_sales_trend once the data has loaded
         series = QBarSeries()
-        set0 = QBarSet("Sales")
-        # Sample data
-        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        sales = [1200, 1500, 1300, 1800, 1600, 2000, 1520]
-        for val in sales:
-            set0.append(val)
-        series.append(set0)
+        self.sales_set = QBarSet("Sales")
+        series.append(self.sales_set)
         chart.addSeries(series)
+        self.sales_days = []
 
-        axisX = QCategoryAxis()
-        for i, day in enumerate(days):
-            axisX.append(day, i)
-        chart.addAxis(axisX, QtCore.Qt.AlignBottom)
-        series.attachAxis(axisX)
+        self.sales_axis_x = QBarCategoryAxis()
+        chart.addAxis(self.sales_axis_x, QtCore.Qt.AlignBottom)
+        series.attachAxis(self.sales_axis_x)
 
-        axisY = QValueAxis()
-        axisY.setLabelFormat("%i")
-        axisY.setTitleText("Sales (GHS)")
-        chart.addAxis(axisY, QtCore.Qt.AlignLeft)
-        series.attachAxis(axisY)
+        self.sales_axis_y = QValueAxis()
+        self.sales_axis_y.setLabelFormat("%i")
+        self.sales_axis_y.setTitleText("Sales (GHS)")
+        chart.addAxis(self.sales_axis_y, QtCore.Qt.AlignLeft)
+        series.attachAxis(self.sales_axis_y)
 
         def on_bar_hover(status, index, barset):
             if status:
-                day = days[index]
+                day = self.sales_days[index]
                 value = barset.at(index)
-                QtWidgets.QToolTip.showText(QtGui.QCursor.pos(), f"{day}: {value} GHS")
+                QtWidgets.QToolTip.showText(
+                    QtGui.QCursor.pos(), f"{day}: {value:.2f} GHS"
+                )
             else:
                 QtWidgets.QToolTip.hideText()
 
@@ -223,12 +263,9 @@ class Ui_Dashboard(object):
         chart.setTitle("Top Selling Items")
         chart.setAnimationOptions(QChart.SeriesAnimations)
 
+        # Filled in by set_top_items once the data has loaded
         series = QPieSeries()
-        # Sample data
-        items = ["Item A", "Item B", "Item C", "Item D", "Item E"]
-        quantities = [500, 400, 300, 250, 200]
-        for item, q in zip(items, quantities):
-            series.append(item, q)
+        self.top_items_series = series
         chart.addSeries(series)
 
         def on_slice_hover(pie_slice, state):
@@ -255,4 +292,19 @@ class Ui_Dashboard(object):
             }
             """
         )
-        return chart_view
\ No newline at end of file
+        return chart_view
+
+    def set_sales_trend(self, days, values):
+        """Replace the Sales Trend bars: day labels with one value each."""
+        self.sales_days = list(days)
+        self.sales_set.remove(0, self.sales_set.count())
+        self.sales_set.append([float(v) for v in values])
+        self.sales_axis_x.clear()
+        self.sales_axis_x.append(self.sales_days)
+        self.sales_axis_y.setRange(0, max([*values, 1]) * 1.1)
+
+    def set_top_items(self, names, quantities):
+        """Replace the Top Selling Items slices."""
+        self.top_items_series.clear()
+        for name, qty in zip(names, quantities):
+            self.top_items_series.append(name, qty)
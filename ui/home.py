@@ -11,11 +11,13 @@ from ui.expenditure_ui import Ui_Expenditure
 from ui.account_ui import Ui_Account
 from ui.settings_ui import Ui_Settings
 from controllers.accountController import AccountController
+from controllers.dashbaordController import DashboardController
 from controllers.employeeController import EmployeesController
 from controllers.stockController import StockController
 from controllers.salesController import SalesController
 from controllers.damageController import DamageController
 from controllers.expenditureController import ExpenditureController
+from controllers.reportController import ReportController
 
 import logging
 
@@ -46,12 +48,14 @@ class HomePage(QtWidgets.QMainWindow):
         self.pages = {}
 
         self.current_button = None
+        self.dashboard_controller = None
         self.account_controller = None
         self.employees_controller = None
         self.stock_controller = None
         self.sales_controller = None
         self.damage_controller = None
         self.expenditure_controller = None
+        self.report_controller = None
 
         self.setupUi(self)
         self.setup_connections()
@@ -268,6 +272,16 @@ class HomePage(QtWidgets.QMainWindow):
             ui_instance = getattr(self, f"ui_{attr_name.split('_')[1]}", None)
             page = getattr(self, attr_name, None)
 
+            # Dashboard controller
+            if attr_name == "page_dashboard":
+                if self.dashboard_controller is None:
+                    self.dashboard_controller = DashboardController(ui_instance, page)
+                    home_logger.debug("DashboardController instantiated")
+                else:
+                    if hasattr(self.dashboard_controller, "refresh_table"):
+                        self.dashboard_controller.refresh_table()
+                        home_logger.debug("DashboardController refreshed")
+
             # account controller
             if attr_name == "page_account":
                 if self.account_controller is None:
@@ -328,6 +342,12 @@ class HomePage(QtWidgets.QMainWindow):
                         self.expenditure_controller.refresh_table()
                         home_logger.debug("ExpenditureController refreshed")
 
+            # Report controller
+            if attr_name == "page_report":
+                if self.report_controller is None:
+                    self.report_controller = ReportController(ui_instance, page)
+                    home_logger.debug("ReportController instantiated")
+
             # Highlight buttons
             if self.current_button:
                 self.current_button.setProperty("active", False)
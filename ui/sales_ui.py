@@ -12,6 +12,20 @@ class Ui_Sales(object):
         left_col = QtWidgets.QVBoxLayout()
         left_col.setSpacing(1)
 
+        lbl_scan = QtWidgets.QLabel("Scan Barcode:")
+        lbl_scan.setObjectName("labelScanCode")
+        lbl_scan.setStyleSheet("color: black; font-weight: bold;")
+        self.inputScanCode = QtWidgets.QLineEdit()
+        self.inputScanCode.setObjectName("inputScanCode")
+        self.inputScanCode.setPlaceholderText("Scan or type code, then Enter...")
+        self.inputScanCode.setMinimumHeight(40)
+        self.inputScanCode.setSizePolicy(
+            QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed
+        )
+
+        left_col.addWidget(lbl_scan)
+        left_col.addWidget(self.inputScanCode)
+
         lbl_search = QtWidgets.QLabel("Search Item:")
         lbl_search.setObjectName("labelSearchItem")
         lbl_search.setStyleSheet("color: black; font-weight: bold;")
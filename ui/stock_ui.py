@@ -94,6 +94,20 @@ class Ui_Stock(object):
         self.inputRetailCategory.addItems(["Retail", "Wholesale"])
         form_layout.addWidget(vfield("Category:", self.inputRetailCategory), 2, 0)
 
+        # Barcode / SKU
+        self.inputRetailBarcode = QtWidgets.QLineEdit()
+        self.inputRetailBarcode.setPlaceholderText("Scan or enter barcode (optional)")
+        self.inputRetailBarcode.setObjectName("inputRetailBarcode")
+        self.inputRetailBarcode.setFixedHeight(40)
+        form_layout.addWidget(vfield("Barcode:", self.inputRetailBarcode), 2, 1)
+
+        # Reorder Level
+        self.inputRetailReorder = QtWidgets.QLineEdit()
+        self.inputRetailReorder.setPlaceholderText("Alert at or below (blank = default)")
+        self.inputRetailReorder.setObjectName("inputRetailReorder")
+        self.inputRetailReorder.setFixedHeight(40)
+        form_layout.addWidget(vfield("Reorder Level:", self.inputRetailReorder), 2, 2)
+
         # --- Action Buttons ---
         btn_container = QtWidgets.QWidget()
         btn_h = QtWidgets.QHBoxLayout(btn_container)
@@ -112,16 +126,28 @@ class Ui_Stock(object):
         self.btnRetailClear = QtWidgets.QPushButton("CLEAR")
         self.btnRetailClear.setObjectName("btnRetailClear")
 
+        self.btnRetailImport = QtWidgets.QPushButton("IMPORT CSV")
+        self.btnRetailImport.setObjectName("btnRetailImport")
+
+        self.btnRetailReprice = QtWidgets.QPushButton("BULK UPDATE")
+        self.btnRetailReprice.setObjectName("btnRetailReprice")
+
+        self.btnRetailStocktake = QtWidgets.QPushButton("STOCKTAKE")
+        self.btnRetailStocktake.setObjectName("btnRetailStocktake")
+
         for btn in [
             self.btnRetailAdd,
             self.btnRetailEdit,
             self.btnRetailDelete,
             self.btnRetailClear,
+            self.btnRetailImport,
+            self.btnRetailReprice,
+            self.btnRetailStocktake,
         ]:
             btn.setMinimumWidth(90)
             btn_h.addWidget(btn)
 
-        form_layout.addWidget(btn_container, 2, 1, 1, 2)
+        form_layout.addWidget(btn_container, 3, 0, 1, 3)
 
         # ------------------- CONTENT CONTAINER -------------------
         content_container = QtWidgets.QWidget()
@@ -155,6 +181,9 @@ class Ui_Stock(object):
         )
         self.table_stock.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.table_stock.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table_stock.setSelectionMode(
+            QtWidgets.QAbstractItemView.ExtendedSelection
+        )
         self.table_stock.setAlternatingRowColors(True)
         self.table_stock.verticalHeader().setVisible(False)
         self.table_stock.setMinimumHeight(300)